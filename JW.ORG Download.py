@@ -1,27 +1,43 @@
 import os
 import re
-import requests
-import time
+import argparse
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.common.exceptions import (
     ElementClickInterceptedException,
     NoSuchElementException,
     TimeoutException,
-    SessionNotCreatedException
+    WebDriverException
 )
+from jw_browser import DriverPool, load_page, wait_until_settled, wait_until_unobstructed
+from jw_download import DownloadEngine, format_stats, parse_rate
+from jw_manifest import Manifest, link_or_copy
+import jw_http
+import jw_jobs
+import jw_metrics
+from jw_media import ResolverCache
 
 # Configuration - use environment variables or defaults
 DATA_DIR = os.environ.get('JW_DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
 URLS_FILE = os.environ.get('JW_URLS_FILE', os.path.join(DATA_DIR, 'urls_and_titles.txt'))
 TARGET_DIRECTORY = os.environ.get('JW_DOWNLOAD_DIR', os.path.join(os.path.expanduser('~'), 'JW.ORG'))
 MAX_RETRIES = 3
+DOWNLOAD_WORKERS = int(os.environ.get('JW_DOWNLOAD_WORKERS', '3'))
+BROWSER_WORKERS = int(os.environ.get('JW_BROWSER_WORKERS', '2'))  # Warm Chrome sessions processing categories
+BANDWIDTH_LIMIT = parse_rate(os.environ.get('JW_BANDWIDTH_LIMIT'))  # e.g. "2M" bytes/s for all downloads
+MEDIA_CACHE_FILE = os.environ.get('JW_MEDIA_CACHE_FILE', os.path.join(DATA_DIR, 'media_cache.json'))
+MANIFEST_FILE = os.environ.get('JW_MANIFEST_FILE', os.path.join(TARGET_DIRECTORY, 'manifest.jsonl'))
+JOBS_FILE = os.environ.get('JW_JOBS_FILE', os.path.join(DATA_DIR, 'download_jobs.jsonl'))
+PER_HOST_LIMIT = int(os.environ.get('JW_PER_HOST_LIMIT', '3'))  # Concurrent downloads from one server
+
+# Downloads queued this run, by media key, so a video in several categories is fetched once
+_in_flight = {}
+_in_flight_lock = threading.Lock()
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -34,42 +50,14 @@ def sanitize_folder_name(name):
 def get_unique_identifier_for_url(url):
     return sanitize_folder_name(url.split("/")[-1] or url.split("/")[-2])
 
-def setup_driver(url, max_retries=3):
-    driver = None
-    retries = 0
-    while retries < max_retries:
-        try:
-            driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()))
-            driver.get(url)
-            try:
-                cookie_button = WebDriverWait(driver, 20).until(
-                    EC.element_to_be_clickable((By.CLASS_NAME, "lnc-acceptCookiesButton"))
-                )
-                cookie_button.click()
-            except Exception as e:
-                logging.error("Error clicking the cookie bar button: %s", e)
-            return driver  # Return the driver if successful
-        except SessionNotCreatedException as e:
-            retries += 1
-            logging.warning("Chrome session not created. Retrying... (%d/%d)", retries, max_retries)
-            time.sleep(2)  # Wait before retrying
-            if driver:
-                driver.quit()  # Close the driver if partially opened
-        except Exception as e:
-            logging.error("An unexpected error occurred while setting up the driver: %s", e)
-            if driver:
-                driver.quit()
-            break  # Break the loop on unexpected errors
-
-    logging.error("Failed to create a Chrome session after %d attempts. Exiting...", max_retries)
-    return None  # Return None if all retries fail
-
 def scrape_video_titles(driver, url):
-    driver.get(url)
-    time.sleep(5)
+    load_page(driver, url)
+    # Read the list once it stops growing; scrolling makes lazily loaded categories render
+    wait_until_settled(driver, 'div.syn-body.lss', page=get_unique_identifier_for_url(url))
     html = driver.page_source
-    soup = BeautifulSoup(html, 'html.parser')
-    return [link.text.strip() for link in soup.find_all("div", {"class": "syn-body lss"})]
+    with jw_metrics.span('parse', profile=True):
+        soup = BeautifulSoup(html, 'html.parser')
+        return [link.text.strip() for link in soup.find_all("div", {"class": "syn-body lss"})]
 
 def get_page_title(driver):
     try:
@@ -81,32 +69,101 @@ def get_page_title(driver):
         logging.error("Error getting page title: %s", e)
         return "UnknownTitle"
 
-def process_video(driver, title, target_folder, session, max_retries):
+def queue_download(engine, manifest, url, dest, key=None, title='', checksum=None, on_done=None):
+    """Queue url for dest unless the manifest already has it, linking known files instead.
+
+    on_done(ok) is called once the file is in place or has failed.
+    """
+    on_done = on_done or (lambda ok: None)
+    file_name = os.path.basename(dest)
+    record = manifest.find(key=key, url=url)
+    if record is not None:
+        how = manifest.place(record, dest)
+        if how:
+            logging.info("%s already downloaded to %s; %s it", file_name, record['path'], how)
+        engine.stats.skip_file()
+        on_done(True)
+        return
+
+    if os.path.isfile(dest):
+        # Downloaded before the manifest existed
+        manifest.record(dest, key=key, url=url, title=title)
+        engine.stats.skip_file()
+        logging.info("%s already exists. Skipping download...", file_name)
+        on_done(True)
+        return
+
+    with _in_flight_lock:
+        first = _in_flight.get(key or url)
+        future = None
+        if first is None:
+            future = engine.submit(url, dest)
+            if future is not None:
+                _in_flight[key or url] = (future, dest)
+    if first is not None:
+        first_future, first_dest = first
+        engine.stats.skip_file()
+
+        def link_duplicate(f):
+            # Same video in another category: link it once the first copy lands
+            ok = f.result() and os.path.isfile(first_dest)
+            if ok and first_dest != dest and not os.path.exists(dest):
+                link_or_copy(first_dest, dest)
+            on_done(bool(ok))
+
+        first_future.add_done_callback(link_duplicate)
+        return
+    if future is None:
+        on_done(os.path.isfile(dest))
+        return
+
+    def finished(f):
+        ok = f.result()
+        if ok and not manifest.verify(dest, checksum):
+            os.remove(dest)
+            ok = False
+        if ok:
+            manifest.record(dest, key=key, url=url, title=title, checksum=checksum)
+        on_done(ok)
+
+    future.add_done_callback(finished)
+
+def item_callback(jobs, url, key):
+    """on_done callback that checkpoints an item's outcome."""
+    return lambda ok: jobs.set_item(url, key, jw_jobs.DONE if ok else jw_jobs.FAILED)
+
+def process_video(driver, title, target_folder, engine, manifest, max_retries, on_done=None):
+    on_done = on_done or (lambda ok: None)
     try:
         element = WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.LINK_TEXT, title)))
     except (NoSuchElementException, TimeoutException):
         logging.warning("Element with title '%s' not found on the page. Skipping...", title)
+        on_done(False)
         return  # Skip to the next URL after logging the warning
 
     driver.execute_script("arguments[0].scrollIntoView();", element)
     click_element_with_retry(driver, element, title, max_retries)
 
+    try:
+        # The download button appears once the video's details have loaded
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, 'a.secondaryButton')))
+    except TimeoutException:
+        pass
     html = driver.page_source
     soup = BeautifulSoup(html, 'html.parser')
 
     file = soup.find('a', {'class': 'secondaryButton'})
     if file is None:
         logging.warning("Video file link not found for '%s'. Skipping...", title)
+        on_done(False)
         return  # Skip to the next URL after logging the warning
 
     file_link = file["href"]
     file_name = file_link.split("/")[-1]
     
     complete_file_path = os.path.join(target_folder, file_name)
-    if not os.path.isfile(complete_file_path):
-        download_file_with_retry(session, file_link, complete_file_path, file_name, max_retries)
-    else:
-        logging.info("%s already exists. Skipping download...", file_name)
+    # Queued on the engine; the browser moves on to the next title meanwhile
+    queue_download(engine, manifest, file_link, complete_file_path, title=title, on_done=on_done)
 
 def click_element_with_retry(driver, element, title, max_retries):
     success = False
@@ -119,31 +176,99 @@ def click_element_with_retry(driver, element, title, max_retries):
             retries += 1
             logging.warning("Click intercepted for title '%s'. Retrying (%d/%d)...", title, retries, max_retries)
             driver.execute_script("window.scrollBy(0, 100);")  # Scroll to try again
-            time.sleep(2)
+            wait_until_unobstructed(driver, element)
 
     if not success:
         logging.error("Max retries reached for video '%s'. Skipping this video.", title)
 
-def download_file_with_retry(session, file_link, complete_file_path, file_name, max_retries):
-    success = False
-    retries = 0
-    while not success and retries < max_retries:
-        try:
-            r = session.get(file_link, allow_redirects=True)
-            r.raise_for_status()
-            with open(complete_file_path, 'wb') as f:
-                f.write(r.content)
-            logging.info("Successfully downloaded %s", file_name)
-            success = True
-        except requests.exceptions.RequestException:
-            retries += 1
-            if retries < max_retries:
-                logging.warning("Download failed for %s. Retrying (%d/%d)...", file_name, retries, max_retries)
-            else:
-                logging.error("Download failed for %s. Skipping after %d retries.", file_name, max_retries)
+def category_folder(url):
+    return os.path.join(TARGET_DIRECTORY, sanitize_folder_name(url.split('/')[-1]))
+
+def process_category_direct(url, cache, engine, manifest, jobs):
+    """Queue a category's downloads from the media API. Returns False if it needs the browser."""
+    # Items left unfinished by a browser run are keyed by title and have no URL; resolving replaces them
+    known = jobs.items(url)
+    if not known or not all('url' in item for _, item in jobs.pending_items(url)):
+        with jw_metrics.span('resolve', profile=True):
+            items = cache.resolve(url, session=engine.session)
+        if not items:
+            return False
+        jobs.resolve(url, items)
+
+    # Folders are created by the downloads themselves, only for categories that get files
+    target_folder = category_folder(url)
+    pending = jobs.pending_items(url)
+    if not pending:
+        jobs.set_state(url, jw_jobs.DONE)
+        return True
+    jobs.set_state(url, jw_jobs.DOWNLOADING)
+    for key, item in pending:
+        file_name = item['url'].split("/")[-1]
+        complete_file_path = os.path.join(target_folder, file_name)
+        jobs.set_item(url, key, jw_jobs.DOWNLOADING)
+        queue_download(engine, manifest, item['url'], complete_file_path,
+                       key=key, title=item.get('title', ''), checksum=item.get('checksum'),
+                       on_done=item_callback(jobs, url, key))
+
+    logging.info("Queued %d of %d videos in %s without the browser",
+                 len(pending), len(jobs.items(url)), os.path.basename(target_folder))
+    return True
+
+def process_category(driver, url, engine, manifest, jobs):
+    video_titles = scrape_video_titles(driver, url)
+    if not video_titles:
+        logging.warning("No video titles found at URL: %s", url)
+        jobs.set_state(url, jw_jobs.FAILED, error="no video titles found")
+        return
 
-def main():
-    session = requests.Session()
+    target_folder = category_folder(url)
+    page_title = os.path.basename(target_folder)
+    jobs.resolve(url, [{'key': title, 'title': title} for title in video_titles])
+    jobs.set_state(url, jw_jobs.DOWNLOADING)
+
+    for title, _ in jobs.pending_items(url):
+        on_done = item_callback(jobs, url, title)
+        # Files are named after the download link, not the title, so ask the manifest
+        record = manifest.find(title=title)
+        if record is not None:
+            manifest.place(record, os.path.join(target_folder, os.path.basename(record['path'])))
+            engine.stats.skip_file()
+            logging.info("%s already downloaded. Skipping this video...", title)
+            on_done(True)
+            continue  # Skip to the next video
+
+        jobs.set_item(url, title, jw_jobs.DOWNLOADING)
+        process_video(driver, title, target_folder, engine, manifest, MAX_RETRIES, on_done)
+
+    logging.info("Finished %s. Progress: %s", page_title, format_stats(engine.stats.snapshot()))
+
+def process_category_with_pool(pool, url, engine, manifest, jobs, max_retries=2):
+    for attempt in range(1, max_retries + 1):
+        with pool.driver() as driver:
+            try:
+                process_category(driver, url, engine, manifest, jobs)
+                return
+            except WebDriverException as e:
+                # The pool replaces the driver on release if its session died
+                logging.warning("Browser error on %s (attempt %d/%d): %s", url, attempt, max_retries, e)
+            except Exception as e:
+                logging.error("Unexpected error processing %s: %s", url, e)
+                jobs.set_state(url, jw_jobs.FAILED, error=str(e))
+                return
+    logging.error("Giving up on URL after %d attempts: %s", max_retries, url)
+    jobs.set_state(url, jw_jobs.FAILED, error="browser errors")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download JW.ORG videos by category")
+    parser.add_argument('--fresh', action='store_true',
+                        help="forget the checkpointed progress and start the URL list over")
+    parser.add_argument('--profile', action='store_true',
+                        help="profile category resolution and page parsing with cProfile")
+    parser.add_argument('--http-cache', choices=jw_http.CACHE_MODES,
+                        help="response cache mode for media API lookups (on, off, record, replay)")
+    args = parser.parse_args(argv)
+    if args.http_cache:
+        jw_http.configure_cache(args.http_cache)
 
     with open(URLS_FILE, 'r') as file:
         urls = [line.strip() for line in file if line.strip()]
@@ -152,33 +277,70 @@ def main():
         logging.error("No URLs found in the file. Exiting...")
         return
 
-    for url in urls:
-        driver = setup_driver(url)
-        if not driver:
-            logging.error("Skipping URL due to failure to initialize Chrome session: %s", url)
-            continue
+    run = jw_metrics.start_run('download', profile=args.profile)
+    with jw_metrics.span('jobs_load'):
+        jobs = jw_jobs.JobStore(JOBS_FILE)
+    if args.fresh:
+        jobs.reset()
+    jobs.sync(urls)
+    remaining = [url for url in urls if jobs.state(url) != jw_jobs.DONE]
+    if len(remaining) < len(urls):
+        logging.info("Resuming: %d of %d categories already done", len(urls) - len(remaining), len(urls))
+    urls = remaining
+    if not urls:
+        logging.info("Every category is done. Use --fresh to start over.")
+        return
 
-        video_titles = scrape_video_titles(driver, url)
-        if not video_titles:
-            logging.warning("No video titles found at URL: %s", url)
-            driver.quit()
-            continue
+    engine = DownloadEngine(workers=DOWNLOAD_WORKERS, bandwidth=BANDWIDTH_LIMIT, max_retries=MAX_RETRIES,
+                            per_host=PER_HOST_LIMIT)
+    os.makedirs(os.path.dirname(os.path.abspath(MANIFEST_FILE)), exist_ok=True)
+    with jw_metrics.span('manifest_load'):
+        manifest = Manifest(MANIFEST_FILE)
+    logging.info("Manifest lists %d downloaded videos", len(manifest))
 
-        page_title = sanitize_folder_name(url.split('/')[-1])
-        target_folder = os.path.join(TARGET_DIRECTORY, page_title)
-        os.makedirs(target_folder, exist_ok=True)
+    # One API request per category; the browser is only started for categories it cannot resolve
+    cache = ResolverCache(MEDIA_CACHE_FILE)
+    with jw_metrics.span('resolve_all'), ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as workers:
+        resolved = list(workers.map(lambda url: process_category_direct(url, cache, engine, manifest, jobs), urls))
+    cache.save()
+    fallback_urls = [url for url, ok in zip(urls, resolved) if not ok]
+
+    if fallback_urls:
+        logging.info("Falling back to the browser for %d categories", len(fallback_urls))
+        try:
+            pool = DriverPool(min(BROWSER_WORKERS, len(fallback_urls)), warm_url=fallback_urls[0])
+        except RuntimeError as e:
+            logging.error("%s. Skipping browser fallback...", e)
+            for url in fallback_urls:
+                jobs.set_state(url, jw_jobs.FAILED, error="could not be resolved")
+            pool = None
 
-        for title in video_titles:
-            complete_file_path = os.path.join(target_folder, title + ".mp4")  # Assuming .mp4 extension
-            if os.path.exists(complete_file_path):
-                logging.info("%s already exists. Skipping this video...", title)
-                continue  # Skip to the next video
+        if pool is not None:
+            with pool, jw_metrics.span('browser_fallback'), ThreadPoolExecutor(max_workers=pool.size) as workers:
+                for future in [workers.submit(process_category_with_pool, pool, url, engine, manifest, jobs) for url in fallback_urls]:
+                    future.result()
 
-            process_video(driver, title, target_folder, session, MAX_RETRIES)
+            if pool.recycled:
+                logging.info("Replaced %d crashed browser sessions", pool.recycled)
 
-        driver.quit()  # Ensure the driver quits after processing videos for each URL
+    logging.info("Waiting for remaining downloads...")
+    with jw_metrics.span('download_wait'):
+        stats = engine.wait()
+    engine.close()
+    with jw_metrics.span('state_save'):
+        manifest.compact()
+        jobs.compact()
+    logging.info("Done! %s", format_stats(stats))
+    summary = jobs.summary()
+    logging.info("Categories: %s; videos: %s", summary['categories'], summary['items'])
 
-    logging.info("Done!")
+    for name in ('files_done', 'files_failed', 'files_skipped', 'bytes_downloaded', 'bytes_resumed', 'retries'):
+        run.count(name, stats[name])
+    run.count('categories_browser', len(fallback_urls))
+    run.gauge('throughput_bps', round(stats['throughput_bps']))
+    record = run.finish('error' if stats['files_failed'] else 'ok')
+    if 'profile' in record:
+        logging.info("Profile written to %s\n%s", record['profile'], run.profile_summary())
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,90 @@
+"""
+Feed Archive Benchmark
+
+Builds an item store of 10k and 100k synthetic items, then simulates feed
+runs that each add a few new items. Every run is timed twice: as an archive
+run (load the store, seal any filled page, write the bounded head) and as the
+unbounded feed that keeps every item and rewrites the whole document. Reports
+time and bytes written per run.
+
+    python benchmarks/bench_archive.py --sizes 10000,100000 --runs 20
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from bench_feed_writer import CHANNEL, synthetic_items
+from results import record
+
+import jw_news_parser
+from jw_feed_writer import write_feeds, write_rss
+
+NEW_PER_RUN = 3
+
+
+def written_bytes(paths):
+    return sum(os.path.getsize(path) for path in paths)
+
+
+def archive_run(config, items, archive):
+    """One archive-mode run. Returns (seconds, bytes written, archive record)."""
+    start = time.perf_counter()
+    head, archive, pages = jw_news_parser.update_archive(config, items, archive)
+    outputs = jw_news_parser.feed_outputs(config, formats=['rss'], categories=[], archive=archive)
+    write_feeds(outputs, head)
+    elapsed = time.perf_counter() - start
+    return elapsed, written_bytes([output.path for output in outputs] + pages), archive
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000')
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    jw_news_parser.FEED_FORMATS = ['rss']
+    print(f"{'items':>8} {'mode':<10} {'ms/run':>8} {'KB/run':>9}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        items = synthetic_items(size + args.runs * NEW_PER_RUN)
+        items.reverse()  # Oldest first, so each run's slice ends with the newest items
+        with tempfile.TemporaryDirectory() as tmp:
+            config = {
+                'locale': 'en',
+                'url': CHANNEL['link'],
+                'output_file': os.path.join(tmp, 'jw_feed.xml'),
+                'feed_url': CHANNEL['self_url'],
+                'item_store_file': os.path.join(tmp, 'feed_items.jsonl'),
+            }
+            # Seed the store (and seal its pages) as a long-running archive would have
+            _, _, archive = archive_run(config, items[size - 1::-1], None)
+
+            archive_s = archive_bytes = full_s = full_bytes = 0
+            full_path = os.path.join(tmp, 'full.xml')
+            for run in range(args.runs):
+                end = size + (run + 1) * NEW_PER_RUN
+                scraped = items[end - 25:end][::-1]  # What's New shows the newest page
+                elapsed, written, archive = archive_run(config, scraped, archive)
+                archive_s += elapsed
+                archive_bytes += written
+
+                start = time.perf_counter()
+                write_rss(full_path, CHANNEL, (items[i] for i in range(end - 1, -1, -1)))
+                full_s += time.perf_counter() - start
+                full_bytes += os.path.getsize(full_path)
+
+            for mode, seconds, written in (('archive', archive_s, archive_bytes), ('full', full_s, full_bytes)):
+                ms = seconds / args.runs * 1000
+                kb = written / args.runs / 1024
+                print(f"{size:>8} {mode:<10} {ms:>8.1f} {kb:>9.0f}")
+                record('archive', f'{size}/{mode}', ms=ms, kb_written=kb)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Backfill Benchmark
+
+Serves a paginated What's New listing from the local stand-in (with simulated
+latency) and backfills it from a history that last saw the item at the top of
+page --known-page, comparing different page concurrency caps.
+
+    python benchmarks/bench_backfill.py --pages 40 --known-page 12 --delay 0.2
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from results import record
+from standin import StandinServer, paged_item_link, paged_whats_new_routes
+
+PER_PAGE = 25
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=40)
+    parser.add_argument('--known-page', type=int, default=12)
+    parser.add_argument('--delay', type=float, default=0.2)
+    parser.add_argument('--workers', default='1,4,8')
+    args = parser.parse_args()
+
+    routes = paged_whats_new_routes(args.pages, PER_PAGE)
+    with tempfile.TemporaryDirectory() as tmp, StandinServer(routes, delay=args.delay) as server:
+        os.environ.update(JW_DATA_DIR=tmp, JW_OUTPUT_DIR=tmp, JW_FETCH_MODE='http')
+        import jw_news_parser as jnp
+        from jw_history import HistoryStore
+
+        url = server.url('/en/whats-new/')
+        first_known = (args.known_page - 1) * PER_PAGE
+        print(f"{'workers':>7} {'pages':>6} {'items':>6} {'new':>5} {'seconds':>8}")
+        for workers in (int(w) for w in args.workers.split(',')):
+            history = HistoryStore(os.path.join(tmp, f'history_{workers}.jsonl'))
+            history.add(paged_item_link(first_known))
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                html, _ = jnp.fetch_whats_new_http(url=url)
+                items, new_count = jnp.parse_whats_new(html, history)
+                items, older_new, pages = jnp.backfill_whats_new(
+                    url, history, items, max_pages=args.pages, workers=workers)
+                elapsed = time.perf_counter() - start
+
+            path = os.path.join(tmp, f'archive_{workers}.xml')
+            jnp.generate_rss_feed(items, path)
+            print(f'{workers:>7} {pages:>6} {len(items):>6} {new_count + older_new:>5} {elapsed:>8.3f}')
+            record('backfill', f'workers={workers}', seconds=elapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Browser Profile Benchmark
+
+Loads What's New as a browser sees it (item images, a web font, a video and a
+third-party analytics script, all served by the local stand-in) in Chrome
+with the full profile the scrapers used before and with the lean scraping
+profile from jw_browser. Reports driver start time, page load time and the
+bytes and requests the stand-in served per load. The full profile runs
+headless too, so both can run in CI.
+
+    python benchmarks/bench_browser.py --repeat 5
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from results import record
+from standin import StandinServer, full_page_routes
+
+PATH = '/en/whats-new/'
+
+
+def bench_profile(server, block, repeat):
+    """Start Chrome and load the page repeat times. Returns (start s, median load ms, bytes, requests) per load."""
+    import jw_browser
+
+    start = time.perf_counter()
+    # Only the page's own host is allowed, so the script on localhost counts as third-party
+    driver = jw_browser.create_driver(headless=True, block=block, allowed_hosts=['127.0.0.1'])
+    started = time.perf_counter() - start
+    try:
+        driver.execute_cdp_cmd('Network.setCacheDisabled', {'cacheDisabled': True})
+        loads, served, requests = [], 0, 0
+        for _ in range(repeat):
+            bytes_before, hits_before = server.bytes_sent, sum(server.hits.values())
+            stats = jw_browser.load_page(driver, server.url(PATH))
+            loads.append(stats['load_ms'])
+            served += server.bytes_sent - bytes_before
+            requests += sum(server.hits.values()) - hits_before
+    finally:
+        driver.quit()
+    return started, statistics.median(loads), served / repeat, requests / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--images', type=int, default=25)
+    args = parser.parse_args()
+
+    if not shutil.which('chromedriver') and not shutil.which('google-chrome'):
+        print("skipped (Chrome not found)")
+        return
+
+    with StandinServer({}) as server:
+        for path, (body, content_type) in full_page_routes(f'http://localhost:{server.port}', args.images).items():
+            server.set_route(path, body, content_type)
+        print(f"{'profile':<8} {'start s':>8} {'load ms':>8} {'KB/load':>8} {'requests':>9}")
+        for name, block in (('full', False), ('lean', True)):
+            started, load_ms, served, requests = bench_profile(server, block, args.repeat)
+            print(f"{name:<8} {started:>8.2f} {load_ms:>8.0f} {served / 1024:>8.0f} {requests:>9.0f}")
+            record('browser', name, start_s=started, load_ms=load_ms, kb_per_load=served / 1024)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Conditional Fetch Benchmark
+
+Runs jw_news_parser.main() repeatedly against the local stand-in and reports
+how long each run takes and whether it touched the disk:
+
+- cold: empty data directory, full scrape and write
+- 304: server honours If-None-Match/If-Modified-Since
+- same content: server sends no validators, item hash short-circuits
+- changed: upstream content changed, only the feeds containing the changed
+  item are rewritten
+
+Exits non-zero if the 304 or same content run writes a feed, history or
+state file.
+
+    python benchmarks/bench_conditional.py
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from results import record
+from standin import StandinServer, load_fixture
+
+
+def snapshot(directory):
+    """Map each file in a directory to its (mtime_ns, size)."""
+    result = {}
+    for entry in os.scandir(directory):
+        if entry.is_file():
+            st = entry.stat()
+            result[entry.name] = (st.st_mtime_ns, st.st_size)
+    return result
+
+
+def timed_run(parser, directory):
+    """Run the parser once. Returns (milliseconds, files written)."""
+    before = snapshot(directory)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser.main([])
+    elapsed = (time.perf_counter() - start) * 1000
+    after = snapshot(directory)
+    written = sorted(name for name in after if before.get(name) != after[name])
+    return elapsed, written
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(JW_DATA_DIR=tmp, JW_OUTPUT_DIR=tmp, JW_FETCH_MODE='http')
+        import jw_news_parser as parser
+
+        page = load_fixture('whats_new.html')
+        # One server, so the feed's channel link stays the same across scenarios
+        with StandinServer(conditional=True) as server:
+            # (name, server sends validators, new page body, must write nothing)
+            scenarios = [
+                ('cold', True, None, False),
+                ('304', True, None, True),
+                ('same content', False, None, True),
+                ('changed', True, page.replace(b'Doomsday Clock', b'Doomsday Clock Update'), False),
+            ]
+            failed = []
+            parser.WHATS_NEW_URL = server.url('/en/whats-new/')
+            print(f"{'scenario':<14} {'ms':>9}  files written")
+            for name, conditional, new_body, unchanged in scenarios:
+                server.conditional = conditional
+                if new_body is not None:
+                    server.set_route('/en/whats-new/', new_body)
+                elapsed, written = timed_run(parser, tmp)
+                print(f"{name:<14} {elapsed:>9.2f}  {', '.join(written) or '-'}")
+                record('conditional', name, ms=elapsed)
+                if unchanged and written:
+                    failed.append(f"{name} run wrote {', '.join(written)}")
+    if failed:
+        sys.exit('\n'.join(failed))
+
+
+if __name__ == '__main__':
+    main()
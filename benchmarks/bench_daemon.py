@@ -0,0 +1,124 @@
+"""
+Daemon Polling Benchmark
+
+Runs the feed watcher against the local stand-in while the What's New page
+changes on a schedule: bursts of new items a short gap apart, separated by
+quiet periods. Each polling policy watches the same schedule; reports how
+long new items took to reach the feed (mean and worst), and how many requests
+and feed updates it cost upstream.
+
+- adaptive: the daemon's interval, minimum after a change, backing off to the maximum
+- fixed min: polling at the minimum interval throughout
+- fixed max: polling at the maximum interval throughout
+
+    python benchmarks/bench_daemon.py --bursts 3 --burst 3 --gap 1 --quiet 20 --min 0.5 --max 8
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from results import record
+from standin import StandinServer, whats_new_timeline
+
+PATH = '/en/whats-new/'
+
+
+def schedule_gaps(bursts, burst, gap, quiet):
+    """Seconds between successive page versions: each burst starts after a quiet period."""
+    gaps = []
+    for _ in range(bursts):
+        gaps += [quiet] + [gap] * (burst - 1)
+    return gaps
+
+
+def watch(jw_watch, directory, interval, gaps):
+    """Watch one schedule to the end. Returns (change times, detection times, page requests, polls)."""
+    import jw_news_parser
+
+    os.makedirs(directory)
+    with StandinServer(conditional=True) as server:
+        config = dict(jw_news_parser.locale_config('en', server.url(PATH)),
+                      output_file=os.path.join(directory, 'jw_feed.xml'),
+                      history_file=os.path.join(directory, 'history.jsonl'),
+                      state_file=os.path.join(directory, 'feed_state.json'),
+                      item_store_file=os.path.join(directory, 'feed_items.jsonl'))
+        server.schedule(PATH, whats_new_timeline(len(gaps)), gaps)
+        watcher = jw_watch.Watcher([config], interval)
+        detections = []
+        poll = watcher.poll
+
+        def timed_poll():
+            results = poll()
+            if any(r['new'] for r in results):
+                detections.append(time.time())
+            return results
+
+        watcher.poll = timed_poll
+        with contextlib.redirect_stdout(io.StringIO()):
+            thread = threading.Thread(target=watcher.run)
+            thread.start()
+            # Long enough for the last change to be picked up at the longest interval
+            time.sleep(sum(gaps) + interval.maximum * 1.5)
+            watcher.stop()
+            thread.join()
+            watcher.close()
+        return server.changes, detections, server.hits.get(PATH, 0), watcher.status['polls']
+
+
+def latencies(changes, detections):
+    """Seconds from each change to the first poll after it that found new items."""
+    result = []
+    for change in changes:
+        later = [d for d in detections if d >= change]
+        if later:
+            result.append(later[0] - change)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bursts', type=int, default=3)
+    parser.add_argument('--burst', type=int, default=3, help='new items per burst')
+    parser.add_argument('--gap', type=float, default=1, help='seconds between items within a burst')
+    parser.add_argument('--quiet', type=float, default=20, help='seconds before each burst')
+    parser.add_argument('--min', type=float, default=0.5, help='shortest poll interval in seconds')
+    parser.add_argument('--max', type=float, default=8, help='longest poll interval in seconds')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The response cache stays on, as in a real daemon: polls must get past it to see changes
+        os.environ.update(JW_DATA_DIR=tmp, JW_OUTPUT_DIR=tmp, JW_METRICS_DIR=os.path.join(tmp, 'metrics'),
+                          JW_FETCH_MODE='http', JW_HTTP_CACHE='on')
+        import jw_watch
+
+        gaps = schedule_gaps(args.bursts, args.burst, args.gap, args.quiet)
+        policies = [
+            ('adaptive', jw_watch.AdaptiveInterval(args.min, args.max, jitter=0)),
+            ('fixed min', jw_watch.AdaptiveInterval(args.min, args.min, jitter=0)),
+            ('fixed max', jw_watch.AdaptiveInterval(args.max, args.max, jitter=0)),
+        ]
+        print(f"{len(gaps)} changes in {args.bursts} bursts, polling every {args.min:g}-{args.max:g}s")
+        print(f"{'policy':<10} {'mean s':>7} {'worst s':>8} {'detected':>9} {'requests':>9} {'polls':>6}")
+        for name, interval in policies:
+            changes, detections, requests, polls = watch(jw_watch, os.path.join(tmp, name.replace(' ', '_')),
+                                                         interval, gaps)
+            delays = latencies(changes, detections)
+            mean = sum(delays) / len(delays) if delays else None
+            worst = max(delays) if delays else None
+            print(f"{name:<10} {mean or 0:>7.2f} {worst or 0:>8.2f} {f'{len(delays)}/{len(changes)}':>9} "
+                  f"{requests:>9} {polls:>6}")
+            record('daemon', name, latency_s=mean, worst_latency_s=worst, requests=requests)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Daily Text Prefetch Benchmark
+
+Serves a month of dated daily text pages from the local stand-in with
+simulated upstream latency and compares fetching one page per day in turn
+with text_bible.prefetch() at several concurrency caps, then times
+get_daily_text() cache hits through the process-wide cache.
+
+    python benchmarks/bench_daily_text.py --days 30 --delay 0.2 --workers 1,4,8
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from results import record
+from standin import StandinServer, daily_text_routes
+
+import text_bible
+
+START = datetime.date(2024, 1, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--delay', type=float, default=0.2, help='simulated upstream latency in seconds')
+    parser.add_argument('--workers', default='1,4,8')
+    args = parser.parse_args()
+
+    # Pages one day either side of the range so every neighbour tab exists
+    routes = daily_text_routes(START - datetime.timedelta(days=1), args.days + 2)
+    with StandinServer(routes, delay=args.delay) as server, tempfile.TemporaryDirectory() as tmp:
+        text_bible.DAILY_TEXT_URL_TEMPLATE = server.url('/en/wol/dt/r1/lp-e/{year}/{month}/{day}')
+        dates = [START + datetime.timedelta(days=i) for i in range(args.days)]
+
+        print(f"{args.days} days, {args.delay * 1000:.0f} ms upstream latency")
+        print(f"{'mode':<22} {'seconds':>8} {'requests':>8} {'cached':>6}")
+
+        cache = text_bible.DailyTextCache(os.path.join(tmp, 'per_day.jsonl'))
+        start = time.perf_counter()
+        for date in dates:
+            cache.put_many(text_bible.fetch_daily_texts(date))
+        elapsed = time.perf_counter() - start
+        print(f"{'one page per day':<22} {elapsed:>8.2f} {args.days:>8} {len(cache):>6}")
+        record('daily_text', 'one page per day', seconds=elapsed)
+
+        for workers in (int(w) for w in args.workers.split(',')):
+            cache = text_bible.DailyTextCache(os.path.join(tmp, f'prefetch_{workers}.jsonl'))
+            start = time.perf_counter()
+            _, pages = text_bible.prefetch(START, args.days, cache, workers=workers)
+            elapsed = time.perf_counter() - start
+            print(f"{f'prefetch x{workers}':<22} {elapsed:>8.2f} {pages:>8} {len(cache):>6}")
+            record('daily_text', f'prefetch x{workers}', seconds=elapsed)
+
+        # Callers that pass no cache share one, loaded from disk on the first call
+        text_bible.CACHE_FILE = cache.path
+        rounds = 10000
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(rounds):
+                text_bible.get_daily_text(dates[i % len(dates)])
+        per_call = (time.perf_counter() - start) / rounds * 1e6
+        print(f"cache hit: {per_call:.1f} µs per get_daily_text() call")
+        record('daily_text', 'cache hit', us=per_call)
+
+
+if __name__ == '__main__':
+    main()
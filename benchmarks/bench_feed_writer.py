@@ -0,0 +1,136 @@
+"""
+Feed Serializer Benchmark
+
+Builds feeds of 100, 10k and 100k synthetic items and compares the streaming
+writer used by generate_rss_feed with the previous ElementTree + minidom
+round-trip, then renders all nine documents the parser writes by default (RSS,
+Atom and JSON Feed, each for all items, videos and articles) in one pass
+against one pass per document. Reports wall time and peak Python heap
+(tracemalloc).
+
+    python benchmarks/bench_feed_writer.py --sizes 100,10000,100000
+"""
+
+import argparse
+import datetime
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from xml.dom import minidom
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from jw_feed_writer import FORMATS, FeedOutput, write_feeds, write_rss
+from results import record
+
+CHANNEL = {
+    'title': "JW.ORG What's New",
+    'link': 'https://www.jw.org/en/whats-new/',
+    'description': 'Latest updates from JW.ORG',
+    'language': 'en',
+    'self_url': 'https://example.com/jw_feed.xml',
+}
+
+
+def synthetic_items(count):
+    """Items shaped like scrape_whats_new output, with characters that need escaping."""
+    items = []
+    for i in range(count):
+        video = i % 3 == 0
+        title = f'Item {i}: “Quotes” & <Brackets> — Part {i % 7}'
+        items.append({
+            'title': title,
+            'link': f'https://www.jw.org/finder?locale=en&lank=pub-jwb-{i}_VIDEO&docid={1000000 + i}',
+            'image': f'https://cms-imgp.jw-cdn.org/img/p/jwb-{i}/univ/art/jwb-{i}_univ_lss_lg.jpg',
+            'category': 'Video' if video else 'Article',
+            'description': f'Video (12:34): {title}' if video else title,
+            'pub_date': 'Mon, 02 Feb 2026 12:00:00 +0000',
+        })
+    return items
+
+
+def legacy_write(path, items):
+    """The ElementTree build, tostring, minidom reparse and toprettyxml path."""
+    rss = ET.Element('rss', version='2.0')
+    rss.set('xmlns:media', 'http://search.yahoo.com/mrss/')
+    rss.set('xmlns:atom', 'http://www.w3.org/2005/Atom')
+    channel = ET.SubElement(rss, 'channel')
+    ET.SubElement(channel, 'title').text = CHANNEL['title']
+    ET.SubElement(channel, 'link').text = CHANNEL['link']
+    ET.SubElement(channel, 'description').text = CHANNEL['description']
+    ET.SubElement(channel, 'language').text = CHANNEL['language']
+    ET.SubElement(channel, 'lastBuildDate').text = datetime.datetime.now(datetime.UTC).strftime('%a, %d %b %Y %H:%M:%S +0000')
+    atom_link = ET.SubElement(channel, '{http://www.w3.org/2005/Atom}link')
+    atom_link.set('href', CHANNEL['self_url'])
+    atom_link.set('rel', 'self')
+    atom_link.set('type', 'application/rss+xml')
+    for item_data in items:
+        item = ET.SubElement(channel, 'item')
+        ET.SubElement(item, 'title').text = item_data['title']
+        ET.SubElement(item, 'link').text = item_data['link']
+        ET.SubElement(item, 'guid', isPermaLink='true').text = item_data['link']
+        ET.SubElement(item, 'category').text = item_data['category']
+        ET.SubElement(item, 'description').text = item_data['description']
+        ET.SubElement(item, 'pubDate').text = item_data['pub_date']
+        media_thumb = ET.SubElement(item, '{http://search.yahoo.com/mrss/}thumbnail')
+        media_thumb.set('url', item_data['image'])
+    xml_content = minidom.parseString(ET.tostring(rss, encoding='unicode')).toprettyxml(indent='  ')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(xml_content)
+
+
+def streaming_write(path, items):
+    write_rss(path, CHANNEL, items)
+
+
+def all_outputs(path):
+    stem = os.path.splitext(path)[0]
+    return [FeedOutput(f"{stem}{'_' + category.lower() if category else ''}{ext}", fmt, CHANNEL, category)
+            for category in (None, 'Video', 'Article') for fmt, ext in FORMATS.items()]
+
+
+def one_pass_write(path, items):
+    write_feeds(all_outputs(path), items)
+
+
+def per_output_write(path, items):
+    for output in all_outputs(path):
+        write_feeds([output], items)
+
+
+def measure(func, path, items):
+    """Run func once. Returns (seconds, peak heap MB, output size MB)."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(path, items)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024), os.path.getsize(path) / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='100,10000,100000')
+    args = parser.parse_args()
+
+    print(f"{'items':>8} {'writer':<10} {'seconds':>9} {'peak MB':>9} {'file MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (int(s) for s in args.sizes.split(',')):
+            items = synthetic_items(size)
+            for name, func in (('minidom', legacy_write), ('streaming', streaming_write),
+                               ('x9 passes', per_output_write), ('x9 1 pass', one_pass_write)):
+                path = os.path.join(tmp, f'{name}.xml')
+                elapsed, peak, file_mb = measure(func, path, items)
+                print(f'{size:>8} {name:<10} {elapsed:>9.3f} {peak:>9.1f} {file_mb:>8.2f}')
+                record('feed_writer', f'{size}/{name}', seconds=elapsed, peak_mb=peak)
+
+
+if __name__ == '__main__':
+    main()
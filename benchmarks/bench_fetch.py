@@ -0,0 +1,122 @@
+"""
+Fetch Mode Benchmark
+
+Compares cold-start wall time and peak RSS of a full jw_news_parser run in
+HTTP mode and Selenium mode against the recorded What's New page served
+locally. Each run is a fresh interpreter so import and browser startup costs
+are included.
+
+    python benchmarks/bench_fetch.py --repeat 5
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from results import record
+from standin import StandinServer
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+RUN_PARSER = 'import jw_news_parser; jw_news_parser.main()'
+
+
+def _tree_rss(proc):
+    """Sum resident memory of a process and all its descendants (browser included)."""
+    total = 0
+    for p in [proc] + proc.children(recursive=True):
+        try:
+            total += p.memory_info().rss
+        except psutil.Error:
+            continue
+    return total
+
+
+def run_once(mode, url):
+    """Run the parser once in a fresh interpreter. Returns (seconds, peak RSS bytes, exit code)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, JW_FETCH_MODE=mode, JW_WHATS_NEW_URL=url,
+                   JW_DATA_DIR=tmp, JW_OUTPUT_DIR=tmp)
+        start = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, '-c', RUN_PARSER], cwd=REPO_DIR, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        peak = 0
+        if PSUTIL_AVAILABLE:
+            # Sample the whole process tree so Chrome's memory is counted too
+            ps = psutil.Process(proc.pid)
+            while proc.poll() is None:
+                try:
+                    peak = max(peak, _tree_rss(ps))
+                except psutil.Error:
+                    pass
+                time.sleep(0.02)
+            code = proc.returncode
+        else:
+            # Unix fallback: peak RSS of the interpreter only, excludes browser children
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = code = os.waitstatus_to_exitcode(status)
+            scale = 1 if sys.platform == 'darwin' else 1024
+            peak = usage.ru_maxrss * scale
+        elapsed = time.perf_counter() - start
+        produced = os.path.exists(os.path.join(tmp, 'jw_feed.xml'))
+    return elapsed, peak, code if produced else (code or 1)
+
+
+def bench_mode(mode, url, repeat):
+    times, peaks = [], []
+    for _ in range(repeat):
+        elapsed, peak, code = run_once(mode, url)
+        if code != 0:
+            return None
+        times.append(elapsed)
+        peaks.append(peak)
+    return {
+        'mode': mode,
+        'runs': repeat,
+        'median_s': statistics.median(times),
+        'min_s': min(times),
+        'peak_rss_mb': max(peaks) / (1024 * 1024),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--modes', default='http,selenium')
+    args = parser.parse_args()
+
+    if not PSUTIL_AVAILABLE:
+        print("psutil not installed: peak RSS covers the Python process only")
+
+    with StandinServer() as server:
+        url = server.url('/en/whats-new/')
+        print(f"{'mode':<10} {'runs':>4} {'median s':>10} {'min s':>8} {'peak RSS MB':>12}")
+        for mode in args.modes.split(','):
+            if mode == 'selenium' and not shutil.which('chromedriver') and not shutil.which('google-chrome'):
+                print(f"{mode:<10} skipped (Chrome not found)")
+                continue
+            result = bench_mode(mode, url, args.repeat)
+            if result is None:
+                print(f"{mode:<10} failed")
+                continue
+            print(f"{mode:<10} {result['runs']:>4} {result['median_s']:>10.3f} "
+                  f"{result['min_s']:>8.3f} {result['peak_rss_mb']:>12.1f}")
+            record('fetch', mode, seconds=result['median_s'],
+                   peak_rss_mb=result['peak_rss_mb'] if PSUTIL_AVAILABLE else None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+History Store Benchmark
+
+Builds synthetic histories of 10k, 100k and 1M entries and times what a feed
+run does with them: open the store, check a page of URLs, append the new ones
+and compact. The first open builds the SQLite index from the log (as on a
+fresh clone); later runs open the existing index. The previous history.json list (json.load, list membership,
+json.dump of the whole file) is timed at the same sizes for comparison.
+"run s" is what every feed run pays: load plus append (compaction is
+occasional).
+
+    python benchmarks/bench_history.py --sizes 10000,100000,1000000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from jw_history import HistoryStore
+from results import record
+
+PAGE = 25  # URLs checked and added per run, one What's New page
+
+
+def url(i):
+    return f'https://www.jw.org/finder?wtlocale=E&docid={1000000 + i}&srctype=wol&srcid=share'
+
+
+def build_log(path, size):
+    """Write a history log with size entries."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(size):
+            f.write(json.dumps({'url': url(i), 'title': f'Item {i}', 'first_seen': '2024-01-01T00:00:00Z'}) + '\n')
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def bench_store(path, size):
+    """Returns a dict of timings for the append-only store."""
+    index, history = timed(lambda: HistoryStore(path))
+    history.close()
+    load, history = timed(lambda: HistoryStore(path))
+    page = [url(size - PAGE // 2 + i) for i in range(PAGE)]  # Half known, half new
+    probes = [url(i * 7919 % size) for i in range(1000)]
+    rounds = 100
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for link in probes:
+            link in history
+    lookup_ns = (time.perf_counter() - start) / (rounds * len(probes)) * 1e9
+
+    def run():
+        for link in page:
+            history.add(link)
+        history.flush()
+    append, _ = timed(run)
+    compact, _ = timed(history.compact)
+    history.close()
+    return {'index_s': index, 'load_s': load, 'lookup_ns': lookup_ns, 'append_s': append, 'compact_s': compact,
+            'run_s': load + append}
+
+
+def bench_legacy(path, size):
+    """Returns a dict of timings for the old history.json list."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump([url(i) for i in range(size)], f, indent=4)
+    page = [url(size - PAGE // 2 + i) for i in range(PAGE)]
+
+    def load():
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    load_s, history = timed(load)
+
+    def run():
+        for link in page:
+            if link not in history:
+                history.append(link)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(history, f, indent=4)
+    append_s, _ = timed(run)
+    return {'load_s': load_s, 'append_s': append_s, 'run_s': load_s + append_s}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--skip-legacy', action='store_true')
+    args = parser.parse_args()
+
+    print(f"{'entries':>8} {'store':<8} {'index s':>8} {'load s':>8} {'lookup ns':>10} {'append s':>9} "
+          f"{'run s':>8} {'compact s':>10} {'file MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (int(s) for s in args.sizes.split(',')):
+            path = os.path.join(tmp, f'history_{size}.jsonl')
+            build_log(path, size)
+            file_mb = os.path.getsize(path) / (1024 * 1024)
+            r = bench_store(path, size)
+            print(f"{size:>8} {'jsonl':<8} {r['index_s']:>8.3f} {r['load_s']:>8.3f} {r['lookup_ns']:>10.0f} "
+                  f"{r['append_s']:>9.4f} {r['run_s']:>8.3f} {r['compact_s']:>10.3f} {file_mb:>8.1f}")
+            record('history', f'{size}/jsonl', **r)
+
+            if args.skip_legacy:
+                continue
+            legacy_path = os.path.join(tmp, f'history_{size}.json')
+            r = bench_legacy(legacy_path, size)
+            print(f"{size:>8} {'json':<8} {'-':>8} {r['load_s']:>8.3f} {'-':>10} {r['append_s']:>9.4f} {r['run_s']:>8.3f} {'-':>10} "
+                  f"{os.path.getsize(legacy_path) / (1024 * 1024):>8.1f}")
+            record('history', f'{size}/json', **r)
+            os.remove(legacy_path)
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
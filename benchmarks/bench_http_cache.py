@@ -0,0 +1,61 @@
+"""
+Response Cache Benchmark
+
+Fetches a set of pages from the local stand-in (with simulated upstream
+latency) through jw_http in each response cache mode: no cache, a cold cache,
+fresh hits, stale entries revalidated with 304s, and offline replay. Reports
+time and upstream requests per pass.
+
+    python benchmarks/bench_http_cache.py --pages 20 --delay 0.1
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from results import record
+from standin import StandinServer, paged_whats_new_routes
+
+import jw_http
+
+
+def fetch_all(server, urls):
+    """Fetch every URL once. Returns (seconds, upstream requests)."""
+    before = sum(server.hits.values())
+    start = time.perf_counter()
+    for url in urls:
+        jw_http.fetch_text(url)
+    return time.perf_counter() - start, sum(server.hits.values()) - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--delay', type=float, default=0.1, help='simulated upstream latency in seconds')
+    args = parser.parse_args()
+
+    routes = paged_whats_new_routes(args.pages)
+    with StandinServer(routes, conditional=True, delay=args.delay) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        urls = [server.url(path) for path in routes]
+        print(f"{args.pages} pages, {args.delay * 1000:.0f} ms upstream latency")
+        print(f"{'pass':<12} {'seconds':>8} {'requests':>8}")
+
+        passes = [('off', 'off'), ('cold', 'on'), ('fresh', 'on'), ('revalidate', 'on'), ('replay', 'replay')]
+        for name, mode in passes:
+            cache = jw_http.configure_cache(mode, root=tmp)
+            if name == 'revalidate':
+                cache.ttl_rules, cache.default_ttl = [], 0  # Everything stale
+            elapsed, requests = fetch_all(server, urls)
+            print(f"{name:<12} {elapsed:>8.3f} {requests:>8}")
+            record('http_cache', name, seconds=elapsed)
+
+
+if __name__ == '__main__':
+    main()
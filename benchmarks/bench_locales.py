@@ -0,0 +1,68 @@
+"""
+Multi-Locale Benchmark
+
+Generates feeds for several locales from the local stand-in (which serves a
+What's New fixture per language with simulated upstream latency), first one
+locale after another and then concurrently through update_feeds, and prints
+the per-locale timings of the concurrent run.
+
+    python benchmarks/bench_locales.py --delay 0.3 --workers 3
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from results import record
+from standin import StandinServer
+
+LOCALES = ('en', 'es', 'fr')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--delay', type=float, default=0.3, help='simulated upstream latency in seconds')
+    parser.add_argument('--workers', type=int, default=len(LOCALES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, StandinServer(delay=args.delay) as server:
+        os.environ.update(JW_DATA_DIR=tmp, JW_OUTPUT_DIR=tmp, JW_FETCH_MODE='http')
+        import jw_news_parser as jnp
+
+        spec = ','.join(f"{locale}={server.url(f'/{locale}/whats-new/')}" for locale in LOCALES)
+
+        def configs():
+            # Fresh output each pass so neither run short-circuits on unchanged items
+            for name in os.listdir(tmp):
+                os.remove(os.path.join(tmp, name))
+            return jnp.parse_locales(spec)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for config in configs():
+                jnp.update_feed(config)
+            sequential = time.perf_counter() - start
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            results = jnp.update_feeds(configs(), args.workers)
+            concurrent = time.perf_counter() - start
+
+        jnp.print_timings(results)
+        print(f"\n{len(LOCALES)} locales: sequential {sequential:.3f}s, "
+              f"concurrent ({args.workers} workers) {concurrent:.3f}s")
+        record('locales', 'sequential', seconds=sequential)
+        record('locales', f'concurrent x{args.workers}', seconds=concurrent)
+        print("feeds written:", ', '.join(sorted(n for n in os.listdir(tmp) if n.endswith('.xml'))))
+
+
+if __name__ == '__main__':
+    main()
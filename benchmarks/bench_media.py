@@ -0,0 +1,77 @@
+"""
+Media Resolver Benchmark
+
+Serves media API responses for many video categories from the local stand-in
+(built from the recorded News Reports category, with simulated upstream
+latency) and resolves them one after another, concurrently as the downloader
+does, and again from a reloaded ResolverCache.
+
+    python benchmarks/bench_media.py --categories 40 --delay 0.1 --workers 1,4,8
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from results import record
+from standin import StandinServer, video_category_routes
+
+import jw_http
+import jw_media
+
+
+def category_url(key):
+    return f'https://www.jw.org/en/library/videos/?appLanguage=E#en/categories/{key}'
+
+
+def resolve_all(urls, workers, cache=None):
+    """Resolve every URL. Returns (seconds, total items)."""
+    session = jw_http.get_session()
+    resolve = cache.resolve if cache is not None else jw_media.resolve_category
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda url: resolve(url, session=session), urls))
+    return time.perf_counter() - start, sum(len(items or []) for items in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--categories', type=int, default=40)
+    parser.add_argument('--delay', type=float, default=0.1, help='simulated upstream latency in seconds')
+    parser.add_argument('--workers', default='1,4,8')
+    args = parser.parse_args()
+
+    keys = [f'Category{i:03d}' for i in range(args.categories)]
+    urls = [category_url(key) for key in keys]
+    with StandinServer(video_category_routes(keys), delay=args.delay) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        jw_media.MEDIATOR_URL = server.url('/apis/mediator/v1')
+        print(f"{args.categories} categories, {args.delay * 1000:.0f} ms upstream latency")
+        print(f"{'mode':<16} {'seconds':>8} {'items':>6}")
+
+        for workers in (int(w) for w in args.workers.split(',')):
+            elapsed, items = resolve_all(urls, workers)
+            print(f"{f'resolve x{workers}':<16} {elapsed:>8.3f} {items:>6}")
+            record('media', f'resolve x{workers}', seconds=elapsed)
+
+        path = os.path.join(tmp, 'media_cache.json')
+        cache = jw_media.ResolverCache(path)
+        resolve_all(urls, max(int(w) for w in args.workers.split(',')), cache)
+        cache.save()
+        start = time.perf_counter()
+        cache = jw_media.ResolverCache(path)  # Reload from disk, as the next run would
+        load = time.perf_counter() - start
+        elapsed, items = resolve_all(urls, 1, cache)
+        print(f"{'cached':<16} {load + elapsed:>8.3f} {items:>6}")
+        record('media', 'cached', seconds=load + elapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+What's New Parser Benchmark
+
+Measures parse throughput (items per second) of parse_whats_new_items over
+the saved What's New snapshots in fixtures/, plus a scaled-up page built by
+repeating the snapshot's entries with unique links. The previous full-page
+html.parser implementation is included for comparison.
+
+    python benchmarks/bench_parser.py --scale 2000
+"""
+
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import jw_news_parser
+from jw_news_parser import parse_date, parse_whats_new_items
+from results import record
+
+SYNOPSIS_BLOCK = re.compile(rb'<div class="synopsis.*?\n</div>', re.S)
+
+
+def legacy_parse(html):
+    """The original parser: whole-page html.parser soup, per-field find calls, list dedupe."""
+    items_list = []
+    soup = BeautifulSoup(html, 'html.parser')
+    for article in soup.find_all("div", {"class": "synopsis"}):
+        link_elem = article.find('a')
+        if not link_elem:
+            continue
+        href = link_elem.get('href', '')
+        if not href:
+            continue
+        if not href.startswith('http'):
+            href = 'https://www.jw.org' + href
+        if href in [item['link'] for item in items_list]:
+            continue
+        title_elem = article.find('h3') or article.find('h2')
+        title = title_elem.text.strip() if title_elem else ''
+        if not title:
+            continue
+        img_elem = article.find('img')
+        image = (img_elem.get('src', '') or img_elem.get('data-src', '')) if img_elem else ''
+        pub_date = None
+        date_elem = article.find('p', class_='contextTtl')
+        if date_elem:
+            pub_date = parse_date(date_elem.text.strip())
+        if not pub_date:
+            date_match = re.search(r'\d{4}-\d{2}-\d{2}', article.get_text())
+            if date_match:
+                pub_date = parse_date(date_match.group(0))
+        is_video = 'hasDuration' in article.get('class', [])
+        if is_video:
+            duration_elem = article.find('span', class_='syn-img-overlay-text')
+            duration = duration_elem.text.strip() if duration_elem else ''
+            description = f"Video{' (' + duration + ')' if duration else ''}: {title}"
+        else:
+            description = title
+        items_list.append({'title': title, 'link': href, 'image': image,
+                           'category': 'Video' if is_video else 'Article',
+                           'description': description, 'pub_date': pub_date})
+    return items_list
+
+
+def scaled_page(html, count):
+    """Repeat the snapshot's synopsis blocks until the page holds count unique entries."""
+    blocks = SYNOPSIS_BLOCK.findall(html)
+    out = []
+    for i in range(count):
+        block = blocks[i % len(blocks)]
+        out.append(block.replace(b'href="', b'href="/scaled/%d' % i))
+    matches = list(SYNOPSIS_BLOCK.finditer(html))
+    return html[:matches[0].start()] + b'\n'.join(out) + html[matches[-1].end():]
+
+
+def throughput(func, html, min_time):
+    """Run func repeatedly for at least min_time seconds. Returns (items, items/s)."""
+    runs, items = 0, 0
+    start = time.perf_counter()
+    while True:
+        items = len(func(html))
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return items, items * runs / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=int, default=2000, help='entries in the scaled-up page (0 to skip)')
+    parser.add_argument('--min-time', type=float, default=1.0)
+    args = parser.parse_args()
+
+    pages = []
+    for path in sorted(glob.glob(os.path.join(BENCH_DIR, 'fixtures', 'whats_new*.html'))):
+        with open(path, 'rb') as f:
+            pages.append((os.path.basename(path), f.read()))
+    if args.scale:
+        pages.append((f'scaled x{args.scale}', scaled_page(pages[0][1], args.scale)))
+
+    def current(backend):
+        def run(html):
+            jw_news_parser.HTML_PARSER = backend
+            return parse_whats_new_items(html)
+        return run
+
+    parsers = [('legacy', legacy_parse), ('html.parser', current('html.parser'))]
+    try:
+        import lxml  # noqa: F401
+        parsers.append(('lxml', current('lxml')))
+    except ImportError:
+        print("lxml not installed: skipping lxml backend")
+
+    print(f"{'page':<24} {'parser':<12} {'items':>6} {'items/s':>10}")
+    for name, html in pages:
+        for parser_name, func in parsers:
+            items, rate = throughput(func, html, args.min_time)
+            print(f'{name:<24} {parser_name:<12} {items:>6} {rate:>10.0f}')
+            record('parser', f'{name}/{parser_name}', items_per_s=rate)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Publish Benchmark
+
+Builds a throwaway repository with a local bare "origin", a main branch
+padded with filler files and a gh-pages branch holding the feed plus an
+index page. It then publishes a changed feed twice: once with the old
+checkout-based command sequence, once with update_and_publish.publish(), which
+uses git plumbing. Both results are checked in the bare repository. The
+plumbing run must keep the working tree on main and leave the other gh-pages
+files intact. A last run publishes while origin is unreachable, then again
+once it is back with nothing new to commit; that retry must still push both
+branches.
+
+    python benchmarks/bench_publish.py --files 5000
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from results import record
+from update_and_publish import GitError, git, publish
+
+LEGACY_STEPS = [
+    "git add jw_feed.xml",
+    'git commit -m "Auto-update RSS feed"',
+    "git push origin main",
+    "git checkout gh-pages",
+    "git checkout main -- jw_feed.xml",
+    "git add jw_feed.xml",
+    'git commit -m "Update RSS feed"',
+    "git push origin gh-pages",
+    "git checkout main",
+]
+
+
+def make_repo(root, filler):
+    """Create origin.git and a clone with main and gh-pages. Returns the clone path."""
+    origin, work = os.path.join(root, 'origin.git'), os.path.join(root, 'work')
+    git(root, 'init', '-q', '--bare', origin)
+    git(root, 'init', '-q', '-b', 'main', work)
+    git(work, 'config', 'user.name', 'bench')
+    git(work, 'config', 'user.email', 'bench@example.com')
+    os.makedirs(os.path.join(work, 'data'))
+    for i in range(filler):
+        with open(os.path.join(work, 'data', f'file_{i}.txt'), 'w') as f:
+            f.write(f'filler {i}\n' * 20)
+    write_feed(work, 0)
+    git(work, 'add', '-A')
+    git(work, 'commit', '-q', '-m', 'initial')
+    git(work, 'checkout', '-q', '--orphan', 'gh-pages')
+    git(work, 'rm', '-q', '-r', '--cached', '.')
+    with open(os.path.join(work, 'index.html'), 'w') as f:
+        f.write('<a href="jw_feed.xml">feed</a>\n')
+    git(work, 'add', 'index.html', 'jw_feed.xml')
+    git(work, 'commit', '-q', '-m', 'pages')
+    git(work, 'checkout', '-q', '-f', 'main')
+    git(work, 'clean', '-q', '-fd')
+    git(work, 'remote', 'add', 'origin', origin)
+    git(work, 'push', '-q', 'origin', 'main', 'gh-pages')
+    git(work, 'fetch', '-q', 'origin')
+    return work
+
+
+def write_feed(work, n):
+    with open(os.path.join(work, 'jw_feed.xml'), 'w') as f:
+        f.write(f'<rss version="2.0"><channel><title>update {n}</title></channel></rss>\n')
+
+
+def check(work, n):
+    """True if origin's gh-pages and main both hold feed n and gh-pages still has index.html."""
+    origin = os.path.join(os.path.dirname(work), 'origin.git')
+    pages = git(origin, 'show', 'gh-pages:jw_feed.xml')
+    main_feed = git(origin, 'show', 'main:jw_feed.xml')
+    names = git(origin, 'ls-tree', '--name-only', 'gh-pages').split('\n')
+    return f'update {n}' in pages and f'update {n}' in main_feed and 'index.html' in names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=5000, help='filler files on main')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work = make_repo(tmp, args.files)
+        print(f"main has {args.files} filler files")
+        print(f"{'method':<10} {'seconds':>8} {'branch after':>13} {'ok':>4}")
+
+        write_feed(work, 1)
+        start = time.perf_counter()
+        for step in LEGACY_STEPS:
+            subprocess.run(step, shell=True, cwd=work, capture_output=True)
+        elapsed = time.perf_counter() - start
+        branch = git(work, 'symbolic-ref', '--short', 'HEAD')
+        print(f"{'checkout':<10} {elapsed:>8.2f} {branch:>13} {'yes' if check(work, 1) else 'NO':>4}")
+        record('publish', 'checkout', seconds=elapsed)
+
+        git(work, 'fetch', '-q', 'origin')
+        write_feed(work, 2)
+        start = time.perf_counter()
+        publish(work, [os.path.join(work, 'jw_feed.xml')])
+        elapsed = time.perf_counter() - start
+        branch = git(work, 'symbolic-ref', '--short', 'HEAD')
+        print(f"{'plumbing':<10} {elapsed:>8.2f} {branch:>13} {'yes' if check(work, 2) else 'NO':>4}")
+        record('publish', 'plumbing', seconds=elapsed)
+
+        origin = git(work, 'remote', 'get-url', 'origin')
+        git(work, 'remote', 'set-url', 'origin', os.path.join(tmp, 'missing.git'))
+        write_feed(work, 3)
+        try:
+            publish(work, [os.path.join(work, 'jw_feed.xml')])
+        except GitError:
+            pass  # The push fails; the commits stay local
+        git(work, 'remote', 'set-url', 'origin', origin)
+        start = time.perf_counter()
+        publish(work, [os.path.join(work, 'jw_feed.xml')])
+        elapsed = time.perf_counter() - start
+        ok = check(work, 3)
+        branch = git(work, 'symbolic-ref', '--short', 'HEAD')
+        print(f"{'retry':<10} {elapsed:>8.2f} {branch:>13} {'yes' if ok else 'NO':>4}")
+        record('publish', 'retry', seconds=elapsed)
+        if not ok:
+            sys.exit("retry after a failed push left origin behind")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Feed Server Load Test
+
+Polls jw_feed.xml with many concurrent keep-alive clients, first against the
+old single-threaded SimpleHTTPRequestHandler server and then against
+jw_feed_server, and reports requests per second, p50/p99 latency and bytes
+per response for plain, gzip and conditional (304) polls.
+
+    python benchmarks/bench_server.py --clients 16 --seconds 3
+"""
+
+import argparse
+import http.client
+import http.server
+import os
+import shutil
+import socketserver
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from jw_feed_server import FeedServer
+from results import record
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class LegacyServer(socketserver.TCPServer):
+    allow_reuse_address = True
+
+
+def client(port, headers, deadline, latencies, sizes):
+    """Poll the feed on one keep-alive connection until the deadline."""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.request('GET', '/jw_feed.xml', headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - start)
+        sizes.append(len(body))
+        if response.will_close:
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    conn.close()
+
+
+def load(port, headers, clients, seconds):
+    """Run concurrent clients for a fixed time. Returns (req/s, p50 ms, p99 ms, bytes per response)."""
+    latencies, sizes = [], []
+    deadline = time.perf_counter() + seconds
+    threads = [threading.Thread(target=client, args=(port, headers, deadline, latencies, sizes))
+               for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if not latencies:
+        return 0.0, 0.0, 0.0, 0
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return len(latencies) / seconds, statistics.median(ordered) * 1000, p99 * 1000, int(statistics.mean(sizes))
+
+
+def etag_of(port):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request('GET', '/jw_feed.xml', headers={'Accept-Encoding': 'gzip'})
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response.getheader('ETag')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copy(os.path.join(REPO_DIR, 'jw_feed.xml'), tmp)
+        print(f"{args.clients} clients, {args.seconds:.0f}s per scenario, "
+              f"feed {os.path.getsize(os.path.join(tmp, 'jw_feed.xml')) / 1024:.0f} KB")
+        print(f"{'server':<8} {'scenario':<12} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'bytes':>8}")
+
+        legacy = LegacyServer(('127.0.0.1', 0), partial(QuietHandler, directory=tmp))
+        new = FeedServer(tmp, port=0, host='127.0.0.1')
+        for name, httpd in (('legacy', legacy), ('new', new)):
+            threading.Thread(target=httpd.serve_forever, daemon=True).start()
+            port = httpd.server_address[1]
+            scenarios = [('plain', {}), ('gzip', {'Accept-Encoding': 'gzip'})]
+            if name == 'new':
+                scenarios.append(('304', {'Accept-Encoding': 'gzip', 'If-None-Match': etag_of(port)}))
+            for scenario, headers in scenarios:
+                rps, p50, p99, size = load(port, headers, args.clients, args.seconds)
+                print(f"{name:<8} {scenario:<12} {rps:>8.0f} {p50:>8.2f} {p99:>8.2f} {size:>8}")
+                record('server', f'{name}/{scenario}', requests_rps=rps, p50_ms=p50, p99_ms=p99)
+            httpd.shutdown()
+            httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Page Settle Benchmark
+
+Serves video category pages whose entries load lazily in batches (a batch
+after load and one more after each scroll to the bottom) at several batch
+delays, and reads each in Chrome the old way (a fixed 5 s sleep) and with
+jw_browser.wait_until_settled(), which scrolls until the list stops growing.
+Each page is also served with a banner outside the list replaced every
+--churn-ms, which must not hold the settle wait open. Reports the seconds
+spent waiting and how many of the entries were found.
+
+    python benchmarks/bench_settle.py --delays 100,500,1500 --batches 4 --churn-ms 100
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from results import record
+from standin import StandinServer, lazy_category_page
+
+FIXED_SLEEP = 5
+SELECTOR = 'div.syn-body.lss'
+
+
+def fixed_sleep(driver, jw_browser, url):
+    """The previous wait: load, sleep, read whatever is there."""
+    jw_browser.load_page(driver, url)
+    start = time.perf_counter()
+    time.sleep(FIXED_SLEEP)
+    found = len(driver.find_elements('css selector', SELECTOR))
+    return found, time.perf_counter() - start
+
+
+def settle(driver, jw_browser, url):
+    jw_browser.load_page(driver, url)
+    return jw_browser.wait_until_settled(driver, SELECTOR, page=url.rstrip('/').rsplit('/', 1)[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--delays', default='100,500,1500', help='milliseconds before each batch appears')
+    parser.add_argument('--batches', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--churn-ms', type=int, default=100, help='background DOM change interval; 0 to skip')
+    args = parser.parse_args()
+
+    if not shutil.which('chromedriver') and not shutil.which('google-chrome'):
+        print("skipped (Chrome not found)")
+        return
+
+    import jw_browser
+
+    delays = [int(d) for d in args.delays.split(',')]
+    pages = [(f'lazy{delay}', delay, 0) for delay in delays]
+    if args.churn_ms:
+        pages += [(f'lazy{delay}churn', delay, args.churn_ms) for delay in delays]
+    routes = {f'/en/library/videos/{slug}/': (lazy_category_page(args.batches, args.batch_size, delay, churn),
+                                              'text/html; charset=utf-8') for slug, delay, churn in pages}
+    total = args.batches * args.batch_size
+    with StandinServer(routes) as server:
+        driver = jw_browser.create_driver(headless=True, allowed_hosts=['127.0.0.1'])
+        try:
+            print(f"{'delay ms':>8} {'churn ms':>8} {'wait':<8} {'seconds':>8} {'found':>9}")
+            for slug, delay, churn in pages:
+                url = server.url(f'/en/library/videos/{slug}/')
+                for name, wait in (('sleep 5', fixed_sleep), ('settle', settle)):
+                    found, seconds = wait(driver, jw_browser, url)
+                    print(f"{delay:>8} {churn or '-':>8} {name:<8} {seconds:>8.2f} {f'{found}/{total}':>9}")
+                    case = f'{delay}ms+churn/{name}' if churn else f'{delay}ms/{name}'
+                    record('settle', case, seconds=seconds, missed=total - found)
+        finally:
+            driver.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Thumbnail Benchmark
+
+Serves item images from the local stand-in (with simulated upstream latency)
+and runs the feed's thumbnail stage over them: cold with increasing worker
+counts, then again from the reloaded thumbnail index, as the next feed run
+would. Reports time, images fetched, and the bytes a reader downloads for the
+first thumbnail of every item against the original images.
+
+    python benchmarks/bench_thumbnails.py --images 25 --delay 0.1 --workers 1,8
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from results import record
+from standin import StandinServer, image_routes
+
+import jw_http
+import jw_thumbnails
+
+
+def attach(server, root, urls, workers):
+    """Run the thumbnail stage once. Returns (seconds, images fetched, items)."""
+    items = [{'title': f'Item {i}', 'image': url} for i, url in enumerate(urls)]
+    start = time.perf_counter()
+    store = jw_thumbnails.ThumbnailStore(root, base_url=server.url('/thumbs'), workers=workers)
+    fetched = store.attach(items, jw_http.get_session())
+    store.save()
+    return time.perf_counter() - start, fetched, items
+
+
+def reader_bytes(root, routes, items):
+    """Bytes of each item's first thumbnail: the local file, or the original when there is none."""
+    total = 0
+    for item in items:
+        url = item['thumbnails'][0]['url']
+        name = url.rsplit('/', 1)[1]
+        if os.path.exists(os.path.join(root, name)):
+            total += os.path.getsize(os.path.join(root, name))
+        else:
+            total += len(routes['/' + url.split('/', 3)[3]][0])
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--images', type=int, default=25)
+    parser.add_argument('--delay', type=float, default=0.1, help='simulated upstream latency in seconds')
+    parser.add_argument('--workers', default='1,8')
+    args = parser.parse_args()
+
+    routes = image_routes(args.images)
+    with StandinServer(routes, delay=args.delay) as server, tempfile.TemporaryDirectory() as tmp:
+        urls = [server.url(path) for path in routes]
+        original = sum(len(body) for body, _ in routes.values())
+        resize = 'Pillow' if jw_thumbnails.PILLOW_AVAILABLE else 'no Pillow, originals kept'
+        print(f"{args.images} images, {args.delay * 1000:.0f} ms upstream latency ({resize})")
+        print(f"{'pass':<12} {'seconds':>8} {'fetched':>8} {'reader KB':>10} {'original KB':>12}")
+
+        for workers in (int(w) for w in args.workers.split(',')):
+            root = os.path.join(tmp, f'cold{workers}')
+            elapsed, fetched, items = attach(server, root, urls, workers)
+            size = reader_bytes(root, routes, items)
+            print(f"{f'cold x{workers}':<12} {elapsed:>8.3f} {fetched:>8} {size / 1024:>10.0f} {original / 1024:>12.0f}")
+            record('thumbnails', f'cold x{workers}', seconds=elapsed, reader_bytes=size)
+
+        elapsed, fetched, items = attach(server, root, urls, workers)
+        print(f"{'cached':<12} {elapsed:>8.3f} {fetched:>8}")
+        record('thumbnails', 'cached', seconds=elapsed)
+
+
+if __name__ == '__main__':
+    main()
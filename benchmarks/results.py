@@ -0,0 +1,32 @@
+"""
+Benchmark Results
+
+Machine-readable output for the benchmarks. Each benchmark prints its usual
+table and also calls record() for every row; when JW_BENCH_RESULTS names a
+file (run_all.py sets it), the rows are appended there as JSON Lines:
+
+    {"bench": "parser", "case": "whats_new.html/lxml", "metrics": {"items_per_s": 41234.5}}
+
+Metric names carry their unit and direction: names ending in _per_s, _rps or
+_mb_s are better when higher, everything else (seconds, MB, ms) when lower.
+"""
+
+import json
+import os
+
+RESULTS_FILE = os.environ.get('JW_BENCH_RESULTS')
+HIGHER_IS_BETTER = ('_per_s', '_rps', '_mb_s')
+
+
+def record(bench, case, **metrics):
+    """Record one result row, if a results file is configured."""
+    if not RESULTS_FILE:
+        return
+    row = {'bench': bench, 'case': str(case),
+           'metrics': {name: round(float(value), 6) for name, value in metrics.items() if value is not None}}
+    with open(RESULTS_FILE, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(row) + '\n')
+
+
+def higher_is_better(metric):
+    return metric.endswith(HIGHER_IS_BETTER)
@@ -0,0 +1,172 @@
+"""
+Benchmark Suite Runner
+
+Runs the benchmarks in fresh interpreters, collects the rows each one records
+through results.record(), and writes them to one JSON file per commit
+(benchmarks/results/<commit>.json by default) together with the Python
+version and platform. Two result files can then be compared; metrics that got
+worse by more than the threshold are reported as regressions.
+
+    python benchmarks/run_all.py --quick
+    python benchmarks/run_all.py --only parser,history
+    python benchmarks/run_all.py --compare benchmarks/results/a1b2c3d.json benchmarks/results/e4f5a6b.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+sys.path.insert(0, BENCH_DIR)
+
+from results import higher_is_better
+
+# Benchmark name -> arguments for a quick run (a full run uses each script's defaults)
+SUITE = {
+    'parser': ['--scale', '500', '--min-time', '0.3'],
+    'feed_writer': ['--sizes', '100,10000'],
+    'archive': ['--sizes', '10000', '--runs', '5'],
+    'history': ['--sizes', '10000,100000'],
+    'conditional': [],
+    'fetch': ['--repeat', '1', '--modes', 'http'],
+    'browser': ['--repeat', '2'],
+    'settle': ['--delays', '100,1000', '--batches', '3'],
+    'locales': ['--delay', '0.05'],
+    'daemon': ['--bursts', '2', '--burst', '2', '--gap', '0.5', '--quiet', '3', '--min', '0.25', '--max', '2'],
+    'backfill': ['--pages', '12', '--known-page', '6', '--delay', '0.05', '--workers', '1,4'],
+    'daily_text': ['--days', '10', '--delay', '0.05', '--workers', '1,4'],
+    'http_cache': ['--pages', '10', '--delay', '0.05'],
+    'thumbnails': ['--images', '10', '--delay', '0.05'],
+    'media': ['--categories', '20', '--delay', '0.05', '--workers', '1,4'],
+    'download': ['--files', '4', '--size-mb', '8', '--workers', '1,4'],
+    'server': ['--seconds', '1'],
+    'publish': ['--files', '500'],
+}
+
+
+def git_commit():
+    """(short commit id, whether the tree has uncommitted changes), or (None, False) outside git."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_DIR,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+
+
+def run_suite(names, quick):
+    """Run the named benchmarks. Returns the result document."""
+    commit, dirty = git_commit()
+    doc = {
+        'commit': commit,
+        'dirty': dirty,
+        'created_at': datetime.datetime.now(datetime.UTC).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'quick': quick,
+        'benches': {},
+        'results': [],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in names:
+            rows_path = os.path.join(tmp, f'{name}.jsonl')
+            command = [sys.executable, os.path.join(BENCH_DIR, f'bench_{name}.py')]
+            if quick:
+                command += SUITE[name]
+            print(f"== {name}: {' '.join(command[1:])}", flush=True)
+            start = time.perf_counter()
+            code = subprocess.run(command, cwd=REPO_DIR, env=dict(os.environ, JW_BENCH_RESULTS=rows_path)).returncode
+            doc['benches'][name] = {'exit_code': code, 'seconds': round(time.perf_counter() - start, 3)}
+            if os.path.exists(rows_path):
+                with open(rows_path, encoding='utf-8') as f:
+                    doc['results'].extend(json.loads(line) for line in f if line.strip())
+            if code != 0:
+                print(f"!! {name} exited with {code}")
+    return doc
+
+
+def _index(doc):
+    return {(row['bench'], row['case'], metric): value
+            for row in doc['results'] for metric, value in row['metrics'].items()}
+
+
+def compare(base, head, threshold):
+    """Print metric changes from base to head. Returns the number of regressions."""
+    old, new = _index(base), _index(head)
+    print(f"{base.get('commit')} -> {head.get('commit')}, regressions beyond {threshold:.0%}")
+    print(f"{'bench':<12} {'case':<30} {'metric':<16} {'base':>12} {'head':>12} {'change':>8}")
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key], new[key]
+        if before == 0:
+            continue
+        change = (after - before) / abs(before)
+        worse = -change if higher_is_better(key[2]) else change
+        flag = ''
+        if worse > threshold:
+            regressions += 1
+            flag = '  REGRESSION'
+        print(f"{key[0]:<12} {key[1]:<30} {key[2]:<16} {before:>12.4g} {after:>12.4g} {change:>+8.1%}{flag}")
+    ran = {row['bench'] for row in head['results']}
+    for key in sorted(k for k in old.keys() - new.keys() if k[0] in ran):
+        print(f"{key[0]:<12} {key[1]:<30} {key[2]:<16} missing from head")
+    print(f"{regressions} regressions")
+    return regressions
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--only', help=f"comma-separated benchmarks (default: all of {', '.join(SUITE)})")
+    parser.add_argument('--quick', action='store_true', help='small sizes and short runs, for CI')
+    parser.add_argument('--output', help='result file (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', nargs='+', metavar='RESULTS',
+                        help='compare BASE against HEAD (or against a fresh run) instead of only running')
+    parser.add_argument('--threshold', type=float, default=0.10, help='relative change counted as a regression')
+    args = parser.parse_args(argv)
+
+    if args.compare and len(args.compare) > 2:
+        parser.error('--compare takes one or two result files')
+    if args.compare and len(args.compare) == 2:
+        return 1 if compare(load(args.compare[0]), load(args.compare[1]), args.threshold) else 0
+
+    names = args.only.split(',') if args.only else list(SUITE)
+    unknown = [name for name in names if name not in SUITE]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    doc = run_suite(names, args.quick)
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        label = (doc['commit'] or 'local') + ('-dirty' if doc['dirty'] else '')
+        output = os.path.join(RESULTS_DIR, f'{label}.json')
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(doc, f, indent=1)
+        f.write('\n')
+    print(f"\n{len(doc['results'])} results written to {output}")
+
+    failed = [name for name, bench in doc['benches'].items() if bench['exit_code'] != 0]
+    if args.compare:
+        print()
+        if compare(load(args.compare[0]), doc, args.threshold):
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
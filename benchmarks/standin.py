@@ -0,0 +1,465 @@
+"""
+Local HTTP Stand-in
+
+Serves recorded fixtures on localhost so the scrapers and benchmarks can run
+without touching jw.org. Point JW_WHATS_NEW_URL at the stand-in to run the
+feed generator offline:
+
+    python benchmarks/standin.py --port 8765
+    JW_WHATS_NEW_URL=http://127.0.0.1:8765/en/whats-new/ python jw_news_parser.py
+"""
+
+import argparse
+import datetime
+import email.utils
+import hashlib
+import http.server
+import io
+import os
+import re
+import struct
+import threading
+import time
+from urllib.parse import urlsplit
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Benchmarks time the network path; the shared response cache would turn repeat fetches into hits
+os.environ.setdefault('JW_HTTP_CACHE', 'off')
+# Fixture pages point at jw-cdn.org images; never fetch them from a benchmark
+os.environ.setdefault('JW_THUMBNAILS', 'off')
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_fixture(name):
+    """Read a fixture file as bytes."""
+    with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+        return f.read()
+
+
+def default_routes():
+    """Routes mirroring the jw.org pages the scrapers read."""
+    html = 'text/html; charset=utf-8'
+    return {
+        '/en/whats-new/': (load_fixture('whats_new.html'), html),
+        '/es/whats-new/': (load_fixture('whats_new_es.html'), html),
+        '/fr/whats-new/': (load_fixture('whats_new_fr.html'), html),
+        '/en/library/videos/StudioNewsReports/': (load_fixture('video_category.html'), html),
+        '/apis/mediator/v1/categories/E/StudioNewsReports': (load_fixture('mediator_category.json'),
+                                                             'application/json'),
+    }
+
+
+SYNOPSIS_BLOCK = re.compile(rb'<div class="synopsis.*?\n</div>', re.S)
+
+
+def paged_whats_new_routes(pages, per_page=25, base='/en/whats-new/'):
+    """Build a paginated What's New listing from the fixture's entries.
+
+    Page 1 is served at base and page N at base?page=N; every entry gets a
+    unique link, newest on page 1.
+    """
+    html = load_fixture('whats_new.html')
+    blocks = SYNOPSIS_BLOCK.findall(html)
+    matches = list(SYNOPSIS_BLOCK.finditer(html))
+    head, tail = html[:matches[0].start()], html[matches[-1].end():]
+    routes = {}
+    for page in range(1, pages + 1):
+        out = []
+        for i in range(per_page):
+            n = (page - 1) * per_page + i
+            out.append(blocks[n % len(blocks)].replace(b'href="', b'href="/archive/%d' % n))
+        path = base if page == 1 else f'{base}?page={page}'
+        routes[path] = (head + b'\n'.join(out) + tail, 'text/html; charset=utf-8')
+    return routes
+
+
+def whats_new_timeline(steps):
+    """Successive versions of the What's New page, each with one more new entry on top.
+
+    Version 0 is the recorded page; version k has k new entries (linked under
+    /new/<n>, newest first) ahead of the recorded ones, and the oldest entries
+    drop off the end so the page keeps its length, as on jw.org.
+    """
+    html = load_fixture('whats_new.html')
+    blocks = SYNOPSIS_BLOCK.findall(html)
+    matches = list(SYNOPSIS_BLOCK.finditer(html))
+    head, tail = html[:matches[0].start()], html[matches[-1].end():]
+    versions = []
+    for step in range(steps + 1):
+        new = [blocks[n % len(blocks)].replace(b'href="', b'href="/new/%d' % n) for n in range(step - 1, -1, -1)]
+        versions.append(head + b'\n'.join((new + blocks)[:len(blocks)]) + tail)
+    return versions
+
+
+def paged_item_link(n):
+    """Feed link of the n-th entry (0 = newest) served by paged_whats_new_routes."""
+    html = load_fixture('whats_new.html')
+    blocks = SYNOPSIS_BLOCK.findall(html)
+    href = re.search(rb'href="([^"]*)"', blocks[n % len(blocks)]).group(1).decode().replace('&amp;', '&')
+    return 'https://www.jw.org/archive/%d%s' % (n, href)
+
+
+DAILY_TEXT_TAB = re.compile(rb'<div class="tabContent.*?\n</div>\n</div>', re.S)
+
+
+def daily_text_routes(start, days, base='/en/wol/dt/r1/lp-e'):
+    """Daily text pages for days dates from start, each with yesterday/today/tomorrow tabs.
+
+    The fixture's three texts are reused in rotation with their dates rewritten,
+    and each page is served at base/YYYY/M/D like wol.jw.org.
+    """
+    html = load_fixture('daily_text.html')
+    tabs = DAILY_TEXT_TAB.findall(html)
+    matches = list(DAILY_TEXT_TAB.finditer(html))
+    head, tail = html[:matches[0].start()], html[matches[-1].end():]
+
+    def tab(day, active):
+        block = tabs[day.toordinal() % len(tabs)]
+        block = re.sub(rb'class="tabContent[^"]*"', b'class="tabContent active"' if active else b'class="tabContent"', block)
+        block = re.sub(rb'data-date="[^"]*"', b'data-date="%sT00:00:00.000Z"' % day.isoformat().encode(), block)
+        heading = f'{day:%A}, {day:%B} {day.day}'.encode()
+        return re.sub(rb'<h2>.*?</h2>', b'<h2>' + heading + b'</h2>', block)
+
+    routes = {}
+    for i in range(days):
+        day = start + datetime.timedelta(days=i)
+        page = [tab(day + datetime.timedelta(days=offset), offset == 0) for offset in (-1, 0, 1)]
+        path = f'{base}/{day.year}/{day.month}/{day.day}'
+        routes[path] = (head + b'\n'.join(page) + tail, 'text/html; charset=utf-8')
+    return routes
+
+
+def video_category_routes(keys, base='/apis/mediator/v1', pages='/en/library/videos'):
+    """Media API responses and rendered category pages for the given category keys.
+
+    Each category reuses the recorded News Reports entries with its key folded
+    into every media key, title and download URL, so categories do not share
+    videos. Point JW_MEDIATOR_URL at base and category URLs look like
+    .../videos/?appLanguage=E#en/categories/<key>.
+    """
+    api = load_fixture('mediator_category.json')
+    page = load_fixture('video_category.html')
+    routes = {}
+    for key in keys:
+        tag = key.encode()
+        body = (api.replace(b'StudioNewsReports', tag)
+                .replace(b'pub-jwbnw_', b'pub-jwbnw_' + tag + b'_')
+                .replace(b'"title": "', b'"title": "' + tag + b': ')
+                .replace(b'/media_broadcasting/', b'/media_broadcasting/' + tag + b'/'))
+        routes[f'{base}/categories/E/{key}'] = (body, 'application/json')
+        html = re.sub(rb'(<h3><a [^>]*>)', rb'\1' + tag + b': ', page.replace(b'StudioNewsReports', tag))
+        routes[f'{pages}/{key}/'] = (html, 'text/html; charset=utf-8')
+    return routes
+
+
+def lazy_category_page(batches, batch_size=10, delay_ms=300, churn_ms=0):
+    """A video category page whose entries load lazily, as on jw.org.
+
+    Starts empty; a script adds batch_size entries delay_ms after load and
+    another batch delay_ms after each scroll to the bottom, until batches
+    batches are shown. Entry titles are "Video <n>". With churn_ms, a banner
+    outside the list is also replaced every churn_ms, like a carousel.
+    """
+    page = load_fixture('video_category.html')
+    start, end = page.index(b'<div class="synopsis-group">'), page.index(b'</body>')
+    script = b"""<div class="synopsis-group" id="lazy"></div>
+<script>
+const BATCHES = %d, SIZE = %d, DELAY = %d, CHURN = %d;
+let shown = 0, loading = false;
+function more() {
+    if (loading || shown >= BATCHES) return;
+    loading = true;
+    setTimeout(() => {
+        const list = document.getElementById('lazy');
+        for (let i = 0; i < SIZE; i++) {
+            const n = shown * SIZE + i;
+            const item = document.createElement('div');
+            item.className = 'synopsis lss';
+            item.style.minHeight = '200px';
+            item.innerHTML = '<div class="syn-body lss"><h3><a href="#video-' + n + '">Video ' + n + '</a></h3></div>';
+            list.appendChild(item);
+        }
+        shown++;
+        loading = false;
+    }, DELAY);
+}
+window.addEventListener('load', more);
+if (CHURN) {
+    const banner = document.body.insertBefore(document.createElement('div'), document.body.firstChild);
+    let tick = 0;
+    setInterval(() => { banner.innerHTML = '<p>Slide ' + (tick++ %% 5) + '</p>'; }, CHURN);
+}
+window.addEventListener('scroll', () => {
+    if (window.innerHeight + window.scrollY >= document.body.scrollHeight - 50) more();
+});
+</script>
+""" % (batches, batch_size, delay_ms, churn_ms)
+    return page[:start] + script + page[end:]
+
+
+def fake_jpeg(width, height, size):
+    """A JPEG-shaped byte string of about size bytes: SOI, filler segments, a baseline frame header, EOI.
+
+    Enough for header parsing; it carries no image data, so it cannot be decoded.
+    """
+    out = bytearray(b'\xff\xd8')
+    while len(out) < size - 32:
+        filler = min(65533, size - 32 - len(out))
+        out += b'\xff\xe1' + struct.pack('>H', filler + 2) + b'\0' * filler
+    out += b'\xff\xc0' + struct.pack('>HBHHB', 11, 8, height, width, 1) + b'\x01\x11\x00'
+    return bytes(out + b'\xff\xd9')
+
+
+def image_routes(count, width=1200, height=600, size=250_000, base='/img/p'):
+    """count distinct item images at base/<n>/univ/art/<n>_univ_lss_lg.jpg, like cms-imgp.jw-cdn.org.
+
+    Real JPEGs when Pillow is installed, so they can be downscaled; otherwise
+    fake_jpeg() stand-ins of the same dimensions and size.
+    """
+    routes = {}
+    for n in range(count):
+        if Image is not None:
+            out = io.BytesIO()
+            Image.effect_noise((width, height), 40 + n % 40).convert('RGB').save(out, 'JPEG', quality=90)
+            body = out.getvalue()
+        else:
+            body = fake_jpeg(width, height, size + n)
+        routes[f'{base}/{n}/univ/art/{n}_univ_lss_lg.jpg'] = (body, 'image/jpeg')
+    return routes
+
+
+def full_page_routes(third_party, images=25, base='/en/whats-new/'):
+    """What's New as a browser loads it: local item images, a stylesheet, a web font, a
+    video and an analytics script from a third-party origin.
+
+    third_party is the script's origin, e.g. the stand-in under another host
+    name (http://localhost:<port> when the page is served from 127.0.0.1).
+    """
+    routes = image_routes(images)
+    paths, local = list(routes), {}
+
+    def localize(match):
+        # The same jw-cdn.org image always maps to the same local one
+        return local.setdefault(match.group(), paths[len(local) % len(paths)].encode())
+
+    html = re.sub(rb'https://cms-imgp\.jw-cdn\.org/img/p/[^" ,]+', localize, load_fixture('whats_new.html'))
+    extras = (b'<style>@font-face{font-family:Site;src:url(/assets/fonts/site.woff2)}body{font-family:Site}</style>'
+              b'<script src="%s/analytics.js"></script>' % third_party.encode())
+    video = b'<video src="/assets/video/intro.mp4" preload="auto" muted></video>'
+    html = html.replace(b'</head>', extras + b'</head>', 1).replace(b'</body>', video + b'</body>', 1)
+    routes.update({
+        base: (html, 'text/html; charset=utf-8'),
+        '/assets/css/site.css': (b'body{margin:0}\n' * 2000, 'text/css'),
+        '/assets/fonts/site.woff2': (os.urandom(120_000), 'font/woff2'),
+        '/assets/video/intro.mp4': (os.urandom(2_000_000), 'video/mp4'),
+        '/analytics.js': (b'/* tracker */' + b'void 0;\n' * 20_000, 'application/javascript'),
+    })
+    return routes
+
+
+class StandinHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass  # Suppress logging
+
+    def do_GET(self):
+        self._respond(head_only=False)
+
+    def do_HEAD(self):
+        self._respond(head_only=True)
+
+    def _respond(self, head_only):
+        standin = self.server.standin
+        standin.hits[self.path] = standin.hits.get(self.path, 0) + 1
+        if standin.delay:
+            time.sleep(standin.delay)  # Simulated upstream latency
+        path = self.path if self.path in standin.routes else urlsplit(self.path).path
+        route = standin.routes.get(path)
+        if route is None:
+            self.send_error(404)
+            return
+
+        fault = standin.next_fault(path) if not head_only else None
+        if fault and fault[0] == 'status':
+            self.send_error(fault[1])
+            return
+
+        body, content_type = route
+        validators = []
+        if standin.conditional:
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()
+            modified = standin.modified.get(path, standin.started)
+            validators = [('ETag', etag), ('Last-Modified', email.utils.formatdate(modified, usegmt=True))]
+            if self._not_modified(etag, modified):
+                standin.not_modified += 1
+                self.send_response(304)
+                for name, value in validators:
+                    self.send_header(name, value)
+                self.end_headers()
+                return
+
+        status, start = 200, 0
+        range_match = re.fullmatch(r'bytes=(\d+)-', self.headers.get('Range', ''))
+        if standin.ranges and range_match:
+            start = int(range_match.group(1))
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(body)}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            status = 206
+
+        payload = memoryview(body)[start:]
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        if standin.ranges:
+            self.send_header('Accept-Ranges', 'bytes')
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{len(body) - 1}/{len(body)}')
+        for name, value in validators:
+            self.send_header(name, value)
+        self.end_headers()
+        if head_only:
+            return
+
+        if fault and fault[0] == 'truncate':
+            # Send part of the body, then drop the connection mid-transfer
+            self.wfile.write(payload[:fault[1]])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(payload)
+        standin.bytes_sent += len(payload)
+
+    def _not_modified(self, etag, modified):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(',')]
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(modified) <= since
+        return False
+
+
+class StandinServer:
+    """Serve a mapping of URL paths to (body, content type) from a background thread.
+
+    With conditional=True responses carry ETag/Last-Modified and matching
+    conditional requests are answered with 304. delay adds fixed latency (in
+    seconds) to every request. With ranges=True, "Range: bytes=N-" requests
+    get 206 partial responses. Faults queued with inject() are applied to the
+    next requests for a path.
+    """
+
+    def __init__(self, routes=None, port=0, conditional=False, delay=0, ranges=False):
+        self.routes = default_routes() if routes is None else dict(routes)
+        self.ranges = ranges
+        self.faults = {}
+        self._faults_lock = threading.Lock()
+        self.conditional = conditional
+        self.delay = delay
+        self.started = time.time()
+        self.modified = {}
+        self.hits = {}
+        self.bytes_sent = 0
+        self.not_modified = 0
+        self.changes = []
+        self._stopped = threading.Event()
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', port), StandinHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.standin = self
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def set_route(self, path, body, content_type='text/html; charset=utf-8'):
+        """Replace the content served at a path, as if upstream had changed."""
+        self.routes[path] = (body, content_type)
+        # Last-Modified has one-second resolution; keep it strictly increasing
+        self.modified[path] = max(time.time(), self.modified.get(path, self.started) + 1)
+
+    def schedule(self, path, bodies, gaps):
+        """Serve bodies[0] at path now and switch to each following body after a gap.
+
+        gaps is seconds between versions, one number or one per change. The
+        time each change went live is appended to self.changes.
+        """
+        if isinstance(gaps, (int, float)):
+            gaps = [gaps] * (len(bodies) - 1)
+        self.set_route(path, bodies[0])
+
+        def run():
+            for body, gap in zip(bodies[1:], gaps):
+                if self._stopped.wait(gap):
+                    return
+                self.set_route(path, body)
+                self.changes.append(time.time())
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def inject(self, path, *faults):
+        """Queue faults for the next requests to path.
+
+        Each fault is ('status', code) to fail the request, or ('truncate', n)
+        to drop the connection after n body bytes.
+        """
+        with self._faults_lock:
+            self.faults.setdefault(path, []).extend(faults)
+
+    def next_fault(self, path):
+        with self._faults_lock:
+            queue = self.faults.get(path)
+            return queue.pop(0) if queue else None
+
+    def url(self, path):
+        """Absolute URL for a path on this server."""
+        return f'http://127.0.0.1:{self.port}{path}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve recorded jw.org fixtures locally.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--conditional', action='store_true', help='send validators and answer 304')
+    parser.add_argument('--delay', type=float, default=0, help='seconds of latency per request')
+    parser.add_argument('--schedule', type=float, metavar='SECONDS',
+                        help='add a new item to What\'s New every SECONDS, e.g. to watch jw_news_parser --daemon')
+    args = parser.parse_args()
+
+    server = StandinServer(port=args.port, conditional=args.conditional, delay=args.delay)
+    if args.schedule:
+        server.schedule('/en/whats-new/', whats_new_timeline(1000), args.schedule)
+    print(f"Serving fixtures on {server.url('/')}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
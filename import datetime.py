@@ -2,48 +2,56 @@
 Daily Bible Reading Utility
 
 Prints the daily Bible reading schedule based on the current day of the year.
+Readings come from the compiled plan in jw_reading_plan, which also lists the
+next N days or exports a year as iCalendar/RSS.
 """
 
+import argparse
 import datetime
-import os
 
-# Configuration - use environment variables or defaults
-DATA_DIR = os.environ.get('JW_DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
-BIBLE_FILE = os.path.join(DATA_DIR, 'bible.txt')
-DAYS_FILE = os.path.join(DATA_DIR, 'days.txt')
+from jw_reading_plan import PLAN_FILE, load_plan
 
 
-def get_daily_reading():
-    """Get the daily Bible reading for today."""
+def get_daily_reading(date=None):
+    """Get the Bible reading for a date (default today) as (WOL link, passage)."""
     try:
-        with open(BIBLE_FILE) as f:
-            bible = f.readlines()
-
-        with open(DAYS_FILE) as f:
-            reading_links = f.readlines()
+        plan = load_plan(PLAN_FILE)
     except FileNotFoundError as e:
         print(f"Error: Required file not found: {e.filename}")
         return None, None
 
-    now = datetime.datetime.now()
-    day_of_year = int(now.strftime("%j"))
-
-    # Convert to 0-based index (day 1 = index 0)
-    index = day_of_year - 1
-
-    # Bounds checking
-    if index < 0 or index >= len(bible) or index >= len(reading_links):
-        print(f"Error: Day {day_of_year} is out of range for the data files")
-        return None, None
-
-    day = bible[index].strip()
-    script = reading_links[index].strip()
-
-    return script, day
-
-
-if __name__ == '__main__':
-    script, day = get_daily_reading()
+    reading = plan.for_date(date or datetime.date.today())
+    return reading.url, reading.title
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print the daily Bible reading")
+    parser.add_argument('--date', type=datetime.date.fromisoformat, default=None,
+                        help="date as YYYY-MM-DD (default: today)")
+    parser.add_argument('--days', type=int, default=1, help="list this many days from --date")
+    parser.add_argument('--year', type=int, default=None, help="year to export (default: this year)")
+    parser.add_argument('--ics', metavar='PATH', help="export the year as an iCalendar file")
+    parser.add_argument('--rss', metavar='PATH', help="export the year as an RSS feed")
+    args = parser.parse_args(argv)
+
+    if args.ics or args.rss:
+        plan = load_plan(PLAN_FILE)
+        year = args.year or datetime.date.today().year
+        count = plan.export_year(year, ics_path=args.ics, rss_path=args.rss)
+        print(f"Exported {count} readings for {year}")
+        return
+
+    if args.days > 1:
+        plan = load_plan(PLAN_FILE)
+        for date, reading in plan.between(args.date or datetime.date.today(), args.days):
+            print(f"{date:%a %Y-%m-%d}  {reading.title:<32} {reading.url}")
+        return
+
+    script, day = get_daily_reading(args.date)
     if script and day:
         print(script)
         print(day)
+
+
+if __name__ == '__main__':
+    main()
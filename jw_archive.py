@@ -0,0 +1,126 @@
+"""
+Feed Archive
+
+Pages a feed into an RFC 5005 archived feed. Every item the feed has carried
+is kept in a compact store: an append-only JSON Lines log of one array per
+item, held in memory as one tuple per item in the order items were first
+seen. The subscription (head) document only carries the newest items; older
+items are sealed into archive pages of a fixed size.
+
+An archive page is written once, when it fills up, and never again. Its file
+name carries a hash of its items and of the page it links back to, so a page
+can be cached forever. Pages link to the next older page with prev-archive and
+to the head with current; the head links to the newest page with
+prev-archive. Each run therefore rewrites the head and, when one fills up, a
+single new archive page.
+"""
+
+import hashlib
+
+import jw_jsonl
+
+# Compact once superseded lines make up this share of the log
+COMPACT_RATIO = 0.5
+
+# Item fields kept in the store, in row order; link identifies an item
+FIELDS = ('link', 'title', 'category', 'description', 'pub_date', 'image', 'thumbnails')
+
+
+class ItemStore:
+    """Every item a feed has carried, oldest first, as tuples backed by an append-only log."""
+
+    def __init__(self, path):
+        self.path = path
+        self._rows = []
+        self._positions = {}
+        self._pending = []
+        self._log_lines = 0
+        self._load()
+
+    def _load(self):
+        self._log_lines = jw_jsonl.load(self.path, self._load_row)
+
+    def _load_row(self, value):
+        row = tuple(value)
+        if len(row) == len(FIELDS):
+            self._put(row)
+
+    def _put(self, row):
+        """Insert or replace a row. Returns True if the row is new."""
+        position = self._positions.get(row[0])
+        if position is None:
+            self._positions[row[0]] = len(self._rows)
+            self._rows.append(row)
+            return True
+        self._rows[position] = row
+        return False
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, link):
+        return link in self._positions
+
+    def update(self, items):
+        """Add items not stored yet and refresh changed ones. Returns how many were added.
+
+        items are in scrape order, newest first; new ones are stored oldest
+        first so the store stays in the order items appeared.
+        """
+        added = 0
+        for item in reversed(items):
+            row = tuple(item.get(field) for field in FIELDS)
+            position = self._positions.get(row[0])
+            if position is not None and self._rows[position] == row:
+                continue
+            added += self._put(row)
+            self._pending.append(row)
+        return added
+
+    def items(self, start=0, stop=None):
+        """Yield the items in positions [start, stop) as dicts, newest first."""
+        stop = len(self._rows) if stop is None else min(stop, len(self._rows))
+        for position in range(stop - 1, start - 1, -1):
+            yield dict(zip(FIELDS, self._rows[position]))
+
+    def newest(self, count):
+        """The newest count items as dicts, newest first."""
+        return list(self.items(max(0, len(self._rows) - count)))
+
+    def flush(self):
+        """Append new and changed rows to the log, compacting when it is due."""
+        if self._pending:
+            jw_jsonl.append(self.path, self._pending)
+            self._log_lines += len(self._pending)
+            self._pending = []
+        dead = self._log_lines - len(self._rows)
+        if dead > 0 and dead >= self._log_lines * COMPACT_RATIO:
+            self.compact()
+
+    def compact(self):
+        """Rewrite the log with one line per item."""
+        self._log_lines = jw_jsonl.rewrite(self.path, self._rows)
+        self._pending = []
+
+
+def page_digest(fmt, items_hash, prev_url):
+    """Content hash of an archive page: its format, its items and the page it links back to."""
+    return hashlib.sha256(f'{fmt}\n{prev_url or ""}\n{items_hash}'.encode('utf-8')).hexdigest()
+
+
+def page_name(stem, number, digest, ext):
+    """File name of archive page number (1 = oldest)."""
+    return f'{stem}-archive-{number:05d}-{digest[:12]}{ext}'
+
+
+def archive_channel(channel, self_url, prev_url, current_url, last_build_date):
+    """Channel of an archive page derived from the head document's channel."""
+    links = [('current', current_url)]
+    if prev_url:
+        links.append(('prev-archive', prev_url))
+    return dict(channel, self_url=self_url, links=links, archive=True, last_build_date=last_build_date)
+
+
+def head_channel(channel, prev_url):
+    """Channel of the head document, linking to the newest archive page."""
+    return dict(channel, links=[('prev-archive', prev_url)]) if prev_url else channel
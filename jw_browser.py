@@ -0,0 +1,398 @@
+"""
+Browser Pool
+
+Keeps a small set of long-lived Chrome sessions for the Selenium scrapers.
+Drivers are started once, accept the jw.org cookie banner once, and are then
+handed out to workers and returned after each page. A driver whose session
+has died is quit and replaced automatically.
+
+Every Selenium path starts Chrome through create_driver(), which uses a lean
+scraping profile: headless, with images, media and fonts blocked through the
+DevTools protocol and every host outside JW_BROWSER_ALLOWED_HOSTS failing to
+resolve, so third-party scripts and beacons never load. The chromedriver path
+resolved by webdriver-manager is cached on disk, and load_page() records each
+page's load time and bytes transferred in the current metrics run.
+
+Pages are read as soon as they are ready rather than after fixed sleeps:
+wait_until_settled() scrolls a lazily loaded list until it stops growing,
+and wait_until_unobstructed() waits out whatever covers an element.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+import jw_metrics
+
+from selenium import webdriver
+from selenium.common.exceptions import SessionNotCreatedException, TimeoutException, WebDriverException
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+try:
+    from webdriver_manager.chrome import ChromeDriverManager
+    USE_WEBDRIVER_MANAGER = True
+except ImportError:
+    USE_WEBDRIVER_MANAGER = False
+
+# Configuration - use environment variables or defaults
+DATA_DIR = os.environ.get('JW_DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+HEADLESS = os.environ.get('JW_BROWSER_HEADLESS', 'on').lower() not in ('0', 'off', 'false', 'no')
+BLOCK_RESOURCES = os.environ.get('JW_BROWSER_BLOCK', 'on').lower() not in ('0', 'off', 'false', 'no')
+# Hosts pages may load from; jw.org serves its scripts and styles from akamaihd.net
+ALLOWED_HOSTS = [h.strip() for h in os.environ.get(
+    'JW_BROWSER_ALLOWED_HOSTS', 'jw.org,*.jw.org,*.jw-cdn.org,*.akamaihd.net,localhost,127.0.0.1').split(',')
+    if h.strip()]
+DRIVER_CACHE_FILE = os.environ.get('JW_CHROMEDRIVER_CACHE', os.path.join(DATA_DIR, 'chromedriver.json'))
+DRIVER_CACHE_DAYS = 7  # Resolve again weekly so a Chrome update gets a matching driver
+WINDOW_SIZE = '1366,900'
+SETTLE_TIMEOUT = float(os.environ.get('JW_SETTLE_TIMEOUT', '20'))  # Longest wait for a list to stop growing
+SETTLE_QUIET = float(os.environ.get('JW_SETTLE_QUIET', '1'))  # Settled after this long without changes
+SETTLE_POLL = 0.1
+RETRY_BACKOFF = 0.5  # Seconds before the first retry of a failed session start, doubling after
+
+# The scrapers only read the DOM: images, video, audio and fonts are never needed
+BLOCKED_URL_PATTERNS = [
+    '*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.avif*', '*.svg*', '*.ico*',
+    '*.mp4*', '*.m4v*', '*.webm*', '*.mp3*', '*.m4a*', '*.m3u8*',
+    '*.woff*', '*.ttf*', '*.otf*', '*.eot*',
+]
+
+# Load time and transfer size of the current page from the Navigation and Resource Timing APIs
+PAGE_STATS_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+return {
+    load_ms: nav ? (nav.loadEventEnd || nav.duration) : 0,
+    bytes: (nav ? nav.transferSize : 0) + resources.reduce((total, r) => total + (r.transferSize || 0), 0),
+    requests: resources.length + 1,
+};
+"""
+
+# Count the matching elements and scroll the last one into view, so lazy loading fetches the next batch.
+# A MutationObserver timestamps the last change inside the list: the smallest element holding the first and
+# last match, re-observed as the list grows. Banners, carousels and other churn elsewhere on the page are ignored.
+SETTLE_SCRIPT = """
+const state = window.__jwSettle || (window.__jwSettle = {last: performance.now(), list: null,
+    observer: new MutationObserver(() => { window.__jwSettle.last = performance.now(); })});
+const found = document.querySelectorAll(arguments[0]);
+if (found.length) {
+    const last = found[found.length - 1];
+    let list = found[0].parentElement;
+    while (!list.contains(last)) {
+        list = list.parentElement;
+    }
+    if (list !== state.list) {
+        state.observer.disconnect();
+        state.observer.observe(list, {childList: true, subtree: true});
+        state.list = list;
+        state.last = performance.now();
+    }
+    last.scrollIntoView({block: 'end'});
+}
+window.scrollBy(0, window.innerHeight);
+return [found.length, performance.now() - state.last];
+"""
+
+# True when element is the topmost element at its centre, i.e. nothing covers it
+UNOBSTRUCTED_SCRIPT = """
+const rect = arguments[0].getBoundingClientRect();
+const top = document.elementFromPoint(rect.left + rect.width / 2, rect.top + rect.height / 2);
+return !!top && (top === arguments[0] || arguments[0].contains(top));
+"""
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def _read_driver_cache():
+    try:
+        with open(DRIVER_CACHE_FILE, encoding='utf-8') as f:
+            cached = json.load(f)
+        if time.time() - cached['resolved'] < DRIVER_CACHE_DAYS * 86400 and os.path.isfile(cached['path']):
+            return cached['path']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _write_driver_cache(path):
+    tmp_path = DRIVER_CACHE_FILE + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'path': path, 'resolved': time.time()}, f)
+        os.replace(tmp_path, DRIVER_CACHE_FILE)
+    except OSError as e:
+        logging.warning("Could not cache the chromedriver path: %s", e)
+
+
+def chromedriver_path(refresh=False):
+    """Resolve the chromedriver binary, reusing the path cached on disk for DRIVER_CACHE_DAYS.
+
+    refresh=True resolves it again, e.g. after the cached driver failed to start a session.
+    """
+    global _driver_path
+    with _driver_path_lock:
+        if not refresh:
+            _driver_path = _driver_path or _read_driver_cache()
+            if _driver_path:
+                return _driver_path
+        with jw_metrics.span('driver_resolve'):
+            _driver_path = ChromeDriverManager().install()
+        _write_driver_cache(_driver_path)
+        return _driver_path
+
+
+def chrome_options(headless=HEADLESS, block=BLOCK_RESOURCES, allowed_hosts=None):
+    """Chrome options for the scraping profile."""
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument('--headless=new')
+    options.add_argument(f'--window-size={WINDOW_SIZE}')
+    for argument in ('--no-first-run', '--no-default-browser-check', '--disable-extensions', '--disable-sync',
+                     '--disable-background-networking', '--disable-dev-shm-usage', '--mute-audio'):
+        options.add_argument(argument)
+    if block:
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        hosts = ALLOWED_HOSTS if allowed_hosts is None else allowed_hosts
+        if hosts:
+            # Any other host fails to resolve, so third-party scripts, trackers and embeds never load
+            options.add_argument('--host-resolver-rules=MAP * ~NOTFOUND, '
+                                 + ', '.join(f'EXCLUDE {host}' for host in hosts))
+    return options
+
+
+def block_resources(driver, patterns=BLOCKED_URL_PATTERNS):
+    """Block requests matching patterns for the rest of the session."""
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+
+
+def create_driver(headless=HEADLESS, block=BLOCK_RESOURCES, allowed_hosts=None):
+    """Start a Chrome session with the scraping profile."""
+    options = chrome_options(headless, block, allowed_hosts)
+    if USE_WEBDRIVER_MANAGER:
+        try:
+            driver = webdriver.Chrome(service=Service(chromedriver_path()), options=options)
+        except SessionNotCreatedException:
+            # The cached driver may no longer match the installed Chrome
+            driver = webdriver.Chrome(service=Service(chromedriver_path(refresh=True)), options=options)
+    else:
+        driver = webdriver.Chrome(options=options)
+    if block:
+        block_resources(driver)
+    return driver
+
+
+def page_stats(driver):
+    """Load time (ms), bytes transferred and requests of the current page, or None if unavailable.
+
+    Cross-origin resources without Timing-Allow-Origin report no size, so
+    bytes is a lower bound.
+    """
+    try:
+        return driver.execute_script(PAGE_STATS_SCRIPT)
+    except WebDriverException:
+        return None
+
+
+def record_page_stats(driver):
+    """Add the current page's bytes and requests to the current metrics run. Returns page_stats()."""
+    stats = page_stats(driver)
+    if stats:
+        jw_metrics.count('page_bytes', stats['bytes'])
+        jw_metrics.count('page_requests', stats['requests'])
+        logging.debug("Loaded %s in %.0f ms, %d bytes in %d requests",
+                      driver.current_url, stats['load_ms'], stats['bytes'], stats['requests'])
+    return stats
+
+
+def load_page(driver, url):
+    """Open url, timing it as a page_load span and recording its size. Returns page_stats()."""
+    with jw_metrics.span('page_load'):
+        driver.get(url)
+    return record_page_stats(driver)
+
+
+class _Settled:
+    """WebDriverWait condition: the element count is non-zero and the list has stopped changing.
+
+    The page must stay quiet for quiet seconds, or for 1.5 times the longest
+    wait for a batch seen so far when that is longer, so a slow page is not
+    taken as settled between two of its batches.
+    """
+
+    def __init__(self, css_selector, quiet):
+        self.css_selector = css_selector
+        self.quiet = quiet
+        self.count = 0
+        self.last_growth = time.perf_counter()
+        self.longest_gap = 0.0
+
+    def __call__(self, driver):
+        count, idle_ms = driver.execute_script(SETTLE_SCRIPT, self.css_selector)
+        now = time.perf_counter()
+        if count > self.count:
+            self.longest_gap = max(self.longest_gap, now - self.last_growth)
+            self.last_growth = now
+            self.count = count
+        required = max(self.quiet, 1.5 * self.longest_gap)
+        return count > 0 and now - self.last_growth >= required and idle_ms >= required * 1000
+
+
+def wait_until_settled(driver, css_selector, timeout=SETTLE_TIMEOUT, quiet=SETTLE_QUIET, page=None):
+    """Wait until the list of elements matching css_selector stops growing.
+
+    Scrolls the last element into view on every check, so lazily loaded items
+    keep arriving, and returns as soon as the count is non-zero and the DOM
+    has been quiet for quiet seconds, or after timeout. The settle time is
+    recorded as a settle span labelled page. Returns (element count, seconds).
+    """
+    condition = _Settled(css_selector, quiet)
+    start = time.perf_counter()
+    with jw_metrics.span('settle', page=page or 'page'):
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=SETTLE_POLL).until(condition)
+        except TimeoutException:
+            logging.warning("%s still changing after %.0fs; using the %d items loaded so far",
+                            page or driver.current_url, timeout, condition.count)
+    elapsed = time.perf_counter() - start
+    logging.info("%s settled with %d items in %.2fs", page or driver.current_url, condition.count, elapsed)
+    return condition.count, elapsed
+
+
+def wait_until_unobstructed(driver, element, timeout=5):
+    """Wait until nothing covers element (e.g. a banner or a sliding header). Returns True if it is clear."""
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=SETTLE_POLL).until(
+            lambda d: d.execute_script(UNOBSTRUCTED_SCRIPT, element))
+        return True
+    except TimeoutException:
+        return False
+
+
+def accept_cookies(driver, timeout=20):
+    """Click the jw.org cookie banner if it appears."""
+    try:
+        cookie_button = WebDriverWait(driver, timeout).until(
+            EC.element_to_be_clickable((By.CLASS_NAME, "lnc-acceptCookiesButton"))
+        )
+        cookie_button.click()
+    except Exception as e:
+        logging.error("Error clicking the cookie bar button: %s", e)
+
+
+def is_alive(driver):
+    """True if the driver's browser session still answers."""
+    try:
+        driver.current_url
+        return True
+    except WebDriverException:
+        return False
+
+
+class DriverPool:
+    """A fixed-size pool of warm Chrome drivers.
+
+    Each driver loads warm_url and accepts cookies when it is created.
+    """
+
+    def __init__(self, size, warm_url, max_retries=3):
+        self.size = size
+        self.warm_url = warm_url
+        self.max_retries = max_retries
+        self.recycled = 0
+        self._idle = queue.Queue()
+        self._all = set()
+        self._lock = threading.Lock()
+        for _ in range(size):
+            driver = self._new_driver()
+            if driver is not None:
+                self._idle.put(driver)
+        if not self._all:
+            raise RuntimeError("Failed to start any Chrome session for the pool")
+
+    def _new_driver(self):
+        retries = 0
+        while retries < self.max_retries:
+            driver = None
+            try:
+                with jw_metrics.span('driver_start'):
+                    driver = create_driver()
+                load_page(driver, self.warm_url)
+                accept_cookies(driver)
+                with self._lock:
+                    self._all.add(driver)
+                return driver
+            except SessionNotCreatedException:
+                retries += 1
+                logging.warning("Chrome session not created. Retrying... (%d/%d)", retries, self.max_retries)
+                if driver:
+                    driver.quit()
+                if retries < self.max_retries:
+                    time.sleep(RETRY_BACKOFF * 2 ** (retries - 1))
+            except Exception as e:
+                logging.error("An unexpected error occurred while setting up the driver: %s", e)
+                if driver:
+                    driver.quit()
+                break
+        logging.error("Failed to create a Chrome session after %d attempts.", self.max_retries)
+        return None
+
+    def _discard(self, driver):
+        with self._lock:
+            self._all.discard(driver)
+        with contextlib.suppress(Exception):
+            driver.quit()
+
+    def acquire(self):
+        """Take an idle driver, waiting for one if all are busy."""
+        while True:
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                with self._lock:
+                    if not self._all:
+                        raise RuntimeError("No working Chrome sessions left in the pool")
+
+    def release(self, driver):
+        """Return a driver to the pool, replacing it if its session has died."""
+        if is_alive(driver):
+            self._idle.put(driver)
+            return
+        logging.warning("Browser session died. Starting a replacement...")
+        self._discard(driver)
+        self.recycled += 1
+        replacement = self._new_driver()
+        if replacement is not None:
+            self._idle.put(replacement)
+
+    @contextlib.contextmanager
+    def driver(self):
+        """Borrow a driver for the duration of a with block."""
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def close(self):
+        """Quit every driver in the pool."""
+        with self._lock:
+            drivers = list(self._all)
+            self._all.clear()
+        for driver in drivers:
+            with contextlib.suppress(Exception):
+                driver.quit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
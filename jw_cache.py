@@ -0,0 +1,308 @@
+"""
+HTTP Response Cache
+
+An on-disk cache of HTTP responses shared by every scraper in the project.
+Bodies are stored once per content hash under objects/, so the same page
+fetched by two scripts (or under two URLs) takes the space of one. An
+append-only index.jsonl maps each URL to its latest body hash, fetch time and
+ETag/Last-Modified validators.
+
+Each URL is fresh for a TTL picked by the first matching rule in TTL_RULES
+(or JW_HTTP_CACHE_TTL); stale entries are revalidated with a conditional
+request, and a 304 serves the stored body. Total body size is bounded, and
+the least recently used bodies are evicted first.
+
+The JW_HTTP_CACHE mode switch:
+
+- on: serve fresh entries, revalidate stale ones (default)
+- off: bypass the cache entirely
+- record: always fetch from the network and store every response
+- replay: never touch the network; serve stored responses regardless of age
+  and fail with CacheMiss for anything not recorded, for offline,
+  deterministic runs
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import requests
+
+import jw_jsonl
+import jw_metrics
+
+# Configuration - use environment variables or defaults
+DATA_DIR = os.environ.get('JW_DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.environ.get('JW_HTTP_CACHE_DIR', os.path.join(DATA_DIR, 'http_cache'))
+CACHE_MODE = os.environ.get('JW_HTTP_CACHE', 'on').lower()
+MAX_BYTES = int(float(os.environ.get('JW_HTTP_CACHE_MAX_MB', '200')) * 1024 * 1024)
+DEFAULT_TTL = 600  # seconds
+
+# (URL pattern, seconds fresh); the first match wins
+TTL_RULES = [
+    (r'/wol/dt/', 30 * 24 * 3600),  # Dated daily text pages do not change
+    (r'/apis/mediator/', 24 * 3600),
+    (r'/whats-new/$', 0),  # The page the feed watches for changes: always revalidated
+]
+
+MODES = ('on', 'off', 'record', 'replay')
+
+# Compact the index once superseded lines make up this share of it
+COMPACT_RATIO = 0.5
+
+
+class CacheMiss(requests.RequestException):
+    """A URL was requested in replay mode that was never recorded."""
+
+
+def parse_ttl_rules(spec):
+    """Parse "pattern=seconds;pattern=seconds" into TTL rules."""
+    rules = []
+    for part in (spec or '').split(';'):
+        if '=' in part:
+            pattern, seconds = part.rsplit('=', 1)
+            rules.append((pattern.strip(), float(seconds)))
+    return rules
+
+
+class CachedResponse:
+    """A stored response: body bytes plus the metadata needed to serve and revalidate it."""
+
+    __slots__ = ('url', 'body', 'encoding', 'content_type', 'etag', 'last_modified', 'from_cache')
+
+    def __init__(self, url, body, encoding=None, content_type=None, etag=None, last_modified=None,
+                 from_cache=False):
+        self.url = url
+        self.body = body
+        self.encoding = encoding
+        self.content_type = content_type
+        self.etag = etag
+        self.last_modified = last_modified
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.body.decode(self.encoding or 'utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.body)
+
+    @property
+    def validators(self):
+        validators = {}
+        if self.etag:
+            validators['etag'] = self.etag
+        if self.last_modified:
+            validators['last_modified'] = self.last_modified
+        return validators
+
+
+class ResponseCache:
+    """Content-addressed, size-bounded response cache in a directory."""
+
+    def __init__(self, root=CACHE_DIR, mode=CACHE_MODE, max_bytes=MAX_BYTES, ttl_rules=None,
+                 default_ttl=DEFAULT_TTL):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.root = root
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        if ttl_rules is None:
+            ttl_rules = parse_ttl_rules(os.environ.get('JW_HTTP_CACHE_TTL')) + TTL_RULES
+        self.ttl_rules = [(re.compile(pattern), seconds) for pattern, seconds in ttl_rules]
+        self.index_path = os.path.join(root, 'index.jsonl')
+        self._entries = {}
+        self._sizes = {}  # body hash -> bytes
+        self._log_lines = 0
+        self._lock = threading.Lock()
+        if mode != 'off':
+            os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+            self._load()
+
+    def _load(self):
+        self._log_lines = jw_jsonl.load(self.index_path, lambda record: self._entries.update({record['url']: record}))
+        for record in list(self._entries.values()):
+            if record['sha256'] not in self._sizes:
+                try:
+                    self._sizes[record['sha256']] = os.path.getsize(self._object_path(record['sha256']))
+                except OSError:
+                    del self._entries[record['url']]  # Body evicted by another process
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def total_bytes(self):
+        return sum(self._sizes.values())
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+
+    def ttl_for(self, url):
+        """Seconds a response for url stays fresh."""
+        for pattern, seconds in self.ttl_rules:
+            if pattern.search(url):
+                return seconds
+        return self.default_ttl
+
+    def lookup(self, url, ttl=None):
+        """(stored response, fresh) for url, or (None, False) if nothing usable is stored.
+
+        ttl overrides the TTL the entry was stored with or its rule's TTL.
+        """
+        with self._lock:
+            record = self._entries.get(url)
+        if record is None:
+            return None, False
+        path = self._object_path(record['sha256'])
+        try:
+            with open(path, 'rb') as f:
+                body = f.read()
+            os.utime(path)  # Mark as recently used for eviction
+        except OSError:
+            with self._lock:
+                self._entries.pop(url, None)
+            return None, False
+        if ttl is None:
+            ttl = record.get('ttl', self.ttl_for(url))
+        fresh = time.time() - record['stored_at'] < ttl
+        return CachedResponse(url, body, record.get('encoding'), record.get('content_type'),
+                              record.get('etag'), record.get('last_modified'), from_cache=True), fresh
+
+    def store(self, response, ttl=None):
+        """Store a CachedResponse's body and index entry, evicting old bodies if over the size bound."""
+        digest = hashlib.sha256(response.body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(response.body)
+            os.replace(tmp_path, path)
+        record = {
+            'url': response.url,
+            'sha256': digest,
+            'stored_at': time.time(),
+            'encoding': response.encoding,
+            'content_type': response.content_type,
+            'etag': response.etag,
+            'last_modified': response.last_modified,
+        }
+        if ttl is not None:
+            record['ttl'] = ttl
+        self._append(record)
+        with self._lock:
+            self._sizes[digest] = len(response.body)
+        if self.mode != 'replay' and self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def touch(self, url):
+        """Restart the freshness period of a revalidated entry."""
+        with self._lock:
+            record = self._entries.get(url)
+        if record is not None:
+            self._append(dict(record, stored_at=time.time()))
+
+    def _append(self, record):
+        with self._lock:
+            jw_jsonl.append(self.index_path, [record])
+            self._entries[record['url']] = record
+            self._log_lines += 1
+            due = self._log_lines - len(self._entries) >= self._log_lines * COMPACT_RATIO > 0
+        if due:
+            self.compact()
+
+    def evict(self, max_bytes=None):
+        """Delete least recently used bodies until the cache fits max_bytes. Returns bytes freed."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock:
+            # Bodies no URL points at any more (superseded versions) go first, then least recently used
+            live = {r['sha256'] for r in self._entries.values()}
+            by_use = []
+            for digest in self._sizes:
+                try:
+                    used = os.stat(self._object_path(digest)).st_mtime
+                except OSError:
+                    used = 0
+                by_use.append((digest in live, used, digest))
+            by_use.sort()
+            total, freed = sum(self._sizes.values()), 0
+            evicted = set()
+            for _, _, digest in by_use:
+                if total <= limit:
+                    break
+                try:
+                    os.remove(self._object_path(digest))
+                except OSError:
+                    pass
+                size = self._sizes.pop(digest)
+                total -= size
+                freed += size
+                evicted.add(digest)
+            if evicted:
+                self._entries = {url: r for url, r in self._entries.items() if r['sha256'] not in evicted}
+        if evicted:
+            jw_metrics.count('http_cache_evictions', len(evicted))
+            self.compact()
+        return freed
+
+    def compact(self):
+        """Rewrite the index with one line per live URL."""
+        with self._lock:
+            self._log_lines = jw_jsonl.rewrite(self.index_path, self._entries.values())
+
+    def get(self, session, url, timeout, ttl=None, headers=None):
+        """Fetch url through the cache. Returns a CachedResponse.
+
+        Raises requests.HTTPError for error statuses and CacheMiss in replay
+        mode for URLs that were never recorded.
+        """
+        if self.mode == 'off':
+            return _network_get(session, url, timeout, headers)
+        cached, fresh = self.lookup(url, ttl)
+        if self.mode == 'replay':
+            if cached is None:
+                jw_metrics.count('http_cache_misses')
+                raise CacheMiss(f"Not recorded: {url}")
+            jw_metrics.count('http_cache_hits')
+            return cached
+        if self.mode == 'record':
+            # Always take a full response so the recording is complete
+            cached, headers = None, None
+        elif cached is not None:
+            if fresh:
+                jw_metrics.count('http_cache_hits')
+                return cached
+            headers = {}
+            if cached.etag:
+                headers['If-None-Match'] = cached.etag
+            if cached.last_modified:
+                headers['If-Modified-Since'] = cached.last_modified
+        response = _network_get(session, url, timeout, headers)
+        if response is None:
+            if cached is None:
+                return None  # 304 to the caller's own validators; nothing to store
+            jw_metrics.count('http_cache_revalidated')
+            self.touch(url)
+            return cached
+        jw_metrics.count('http_cache_misses')
+        self.store(response, ttl)
+        return response
+
+
+def _network_get(session, url, timeout, headers=None):
+    """GET url. Returns a CachedResponse, or None for 304 Not Modified."""
+    response = session.get(url, headers=headers or None, timeout=timeout)
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
+    encoding = response.encoding
+    if encoding is None or encoding.lower() == 'iso-8859-1':
+        # Decode as UTF-8 when the server omits a charset (requests would guess Latin-1)
+        encoding = 'utf-8'
+    return CachedResponse(url, response.content, encoding, response.headers.get('Content-Type'),
+                          response.headers.get('ETag'), response.headers.get('Last-Modified'))
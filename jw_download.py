@@ -0,0 +1,287 @@
+"""
+Download Engine
+
+Streams media files to disk in chunks instead of holding them in memory.
+Each file is written to a ".part" file next to its destination; when a
+transfer breaks, the next attempt resumes from the bytes already on disk with
+an HTTP Range request. The finished size is checked against the server's
+Content-Length before the file is renamed into place.
+
+Downloads run on a thread pool that shares one requests session, with an
+optional global bandwidth cap, an optional limit on concurrent transfers per
+host, and live progress/throughput statistics.
+"""
+
+import contextlib
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+
+import jw_http
+import jw_metrics
+
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_WORKERS = 3
+MAX_RETRIES = 3
+
+
+class IncompleteDownloadError(Exception):
+    """The transfer ended before the expected number of bytes arrived."""
+
+
+def parse_rate(value):
+    """Parse a bandwidth such as "500K", "2M" or "1500000" into bytes per second."""
+    if not value:
+        return None
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMG]?)B?\s*', str(value), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid bandwidth limit: {value!r}")
+    scale = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}[match.group(2).upper()]
+    return int(float(match.group(1)) * scale)
+
+
+class RateLimiter:
+    """Token bucket shared by all download threads to cap total bandwidth."""
+
+    def __init__(self, bytes_per_second):
+        self.rate = bytes_per_second
+        self.capacity = max(bytes_per_second, CHUNK_SIZE)
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, amount):
+        """Block until amount bytes may be transferred."""
+        while amount > self.capacity:
+            self._consume(self.capacity)
+            amount -= self.capacity
+        self._consume(amount)
+
+    def _consume(self, amount):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostLimiter:
+    """Caps how many transfers run against the same host at once."""
+
+    def __init__(self, per_host):
+        self.per_host = per_host
+        self.slots = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, url):
+        """Hold one of the host's slots for the duration of a with block."""
+        host = urlsplit(url).netloc
+        with self.lock:
+            semaphore = self.slots.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        with semaphore:
+            yield
+
+
+class DownloadStats:
+    """Thread-safe counters for files, bytes, retries and throughput."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.files_done = 0
+        self.files_failed = 0
+        self.files_skipped = 0
+        self.bytes_downloaded = 0
+        self.bytes_resumed = 0
+        self.retries = 0
+        self.active = {}
+
+    def add_bytes(self, url, amount):
+        with self.lock:
+            self.bytes_downloaded += amount
+            done, total = self.active.get(url, (0, None))
+            self.active[url] = (done + amount, total)
+
+    def start_file(self, url, offset, total):
+        with self.lock:
+            self.active[url] = (offset, total)
+            self.bytes_resumed += offset
+
+    def finish_file(self, url, ok):
+        with self.lock:
+            self.active.pop(url, None)
+            if ok:
+                self.files_done += 1
+            else:
+                self.files_failed += 1
+
+    def skip_file(self):
+        with self.lock:
+            self.files_skipped += 1
+
+    def add_retry(self):
+        with self.lock:
+            self.retries += 1
+
+    def snapshot(self):
+        """Return a dict of the current counters and overall throughput."""
+        with self.lock:
+            elapsed = time.monotonic() - self.started
+            return {
+                'files_done': self.files_done,
+                'files_failed': self.files_failed,
+                'files_skipped': self.files_skipped,
+                'bytes_downloaded': self.bytes_downloaded,
+                'bytes_resumed': self.bytes_resumed,
+                'retries': self.retries,
+                'elapsed_s': elapsed,
+                'throughput_bps': self.bytes_downloaded / elapsed if elapsed > 0 else 0.0,
+                'active': dict(self.active),
+            }
+
+
+def format_stats(snapshot):
+    """One-line summary of a stats snapshot for logging."""
+    mb = snapshot['bytes_downloaded'] / (1024 * 1024)
+    rate = snapshot['throughput_bps'] / (1024 * 1024)
+    return (f"{snapshot['files_done']} downloaded, {snapshot['files_failed']} failed, "
+            f"{snapshot['files_skipped']} skipped, {mb:.1f} MB at {rate:.2f} MB/s, "
+            f"{snapshot['retries']} retries, {len(snapshot['active'])} in progress")
+
+
+def _expected_total(response, offset):
+    """Total file size implied by a 200/206 response, or None if unknown."""
+    content_range = response.headers.get('Content-Range', '')
+    match = re.match(r'bytes (\d+)-\d+/(\d+|\*)', content_range)
+    if response.status_code == 206 and match:
+        if int(match.group(1)) != offset:
+            raise IncompleteDownloadError(f"Server resumed at byte {match.group(1)}, expected {offset}")
+        return int(match.group(2)) if match.group(2) != '*' else None
+    length = response.headers.get('Content-Length')
+    return offset + int(length) if length is not None else None
+
+
+def download_file(session, url, dest, stats=None, limiter=None, max_retries=MAX_RETRIES,
+                  chunk_size=CHUNK_SIZE, backoff=1.0, timeout=jw_http.DEFAULT_TIMEOUT):
+    """Stream url to dest, resuming a partial .part file. Returns True on success."""
+    stats = stats or DownloadStats()
+    os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+    part_path = dest + '.part'
+    file_name = os.path.basename(dest)
+    attempt = 0
+    while True:
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        # Identity encoding so the bytes on disk line up with Content-Length and Range offsets
+        headers = {'Accept-Encoding': 'identity'}
+        if offset:
+            headers['Range'] = f'bytes={offset}-'
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as r:
+                if r.status_code == 416 and offset:
+                    # Nothing left to send: the .part file may already be complete
+                    total = _remote_size(session, url, timeout)
+                    if total == offset:
+                        os.replace(part_path, dest)
+                        stats.finish_file(url, True)
+                        return True
+                    os.remove(part_path)
+                    raise IncompleteDownloadError("Range not satisfiable; restarting")
+                r.raise_for_status()
+                if offset and r.status_code == 200:
+                    offset = 0  # Server ignored the Range header; start over
+                total = _expected_total(r, offset)
+                stats.start_file(url, offset, total)
+
+                with open(part_path, 'ab' if offset else 'wb') as f:
+                    for chunk in r.iter_content(chunk_size=chunk_size):
+                        if limiter:
+                            limiter.consume(len(chunk))
+                        f.write(chunk)
+                        stats.add_bytes(url, len(chunk))
+
+            size = os.path.getsize(part_path)
+            if total is not None and size != total:
+                raise IncompleteDownloadError(f"Got {size} of {total} bytes")
+            os.replace(part_path, dest)
+            stats.finish_file(url, True)
+            logging.info("Successfully downloaded %s (%.1f MB)", file_name, size / (1024 * 1024))
+            return True
+        except (requests.exceptions.RequestException, IncompleteDownloadError, OSError) as e:
+            attempt += 1
+            if attempt >= max_retries:
+                logging.error("Download failed for %s. Skipping after %d retries. (%s)", file_name, max_retries, e)
+                stats.finish_file(url, False)
+                return False
+            stats.add_retry()
+            logging.warning("Download failed for %s. Retrying (%d/%d)... (%s)", file_name, attempt, max_retries, e)
+            time.sleep(backoff * 2 ** (attempt - 1))
+
+
+def _remote_size(session, url, timeout):
+    try:
+        r = session.head(url, allow_redirects=True, timeout=timeout)
+        return int(r.headers['Content-Length'])
+    except (requests.exceptions.RequestException, KeyError, ValueError):
+        return None
+
+
+class DownloadEngine:
+    """Run streaming, resumable downloads on a bounded pool of threads."""
+
+    def __init__(self, session=None, workers=DEFAULT_WORKERS, bandwidth=None,
+                 max_retries=MAX_RETRIES, chunk_size=CHUNK_SIZE, backoff=1.0, per_host=None):
+        self.session = session or jw_http.create_session(pool_size=max(workers, 1) * 2)
+        self.stats = DownloadStats()
+        self.limiter = RateLimiter(bandwidth) if bandwidth else None
+        self.hosts = HostLimiter(per_host) if per_host else None
+        self.max_retries = max_retries
+        self.chunk_size = chunk_size
+        self.backoff = backoff
+        self.pool = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix='download')
+        self.futures = []
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def submit(self, url, dest):
+        """Queue a download. Returns a future resolving to True/False, or None if already queued."""
+        with self._lock:
+            if dest in self._pending:
+                return None
+            self._pending.add(dest)
+        future = self.pool.submit(self._download, url, dest)
+        self.futures.append(future)
+        return future
+
+    def _download(self, url, dest):
+        slot = self.hosts.slot(url) if self.hosts is not None else contextlib.nullcontext()
+        with slot, jw_metrics.span('download'):
+            return download_file(self.session, url, dest, self.stats, self.limiter,
+                                 self.max_retries, self.chunk_size, self.backoff)
+
+    def wait(self):
+        """Block until every queued download has finished. Returns the stats snapshot."""
+        for future in list(self.futures):
+            future.result()
+        return self.stats.snapshot()
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,292 @@
+"""
+Feed Server
+
+Serves the generated feeds to feed readers on the local network. Only the
+feeds, their archive pages and the thumbnail images are served; every other
+file in the output directory is a 404. Files are held in a size-bounded LRU
+cache together with gzip (and brotli, when the brotli package is installed)
+variants, so a poll costs no disk read and no compression. Variants are built
+once per file change on a background thread; until they are ready the file
+is sent uncompressed. Responses carry ETag, Last-Modified and Cache-Control
+headers and conditional requests are answered with 304. A file is reloaded
+when its modification time or size changes on disk.
+"""
+
+import argparse
+import email.utils
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+try:
+    import brotli
+    HAVE_BROTLI = True
+except ImportError:
+    HAVE_BROTLI = False
+
+ROOT_DIR = os.environ.get('JW_OUTPUT_DIR', os.path.dirname(os.path.abspath(__file__)))
+PORT = int(os.environ.get('JW_SERVER_PORT', '8888'))
+MAX_AGE = int(os.environ.get('JW_SERVER_MAX_AGE', '300'))  # Seconds readers may reuse a response
+RELOAD_INTERVAL = 1.0  # Seconds between disk checks for a changed file
+CACHE_BYTES = int(float(os.environ.get('JW_SERVER_CACHE_MB', '32')) * 1024 * 1024)
+MIN_COMPRESS_SIZE = 256
+# Paths relative to the root that may be served: feeds, archive pages and thumbnails
+SERVED_PATHS = re.compile(r'jw_feed[\w-]*\.(xml|atom|json)|thumbs/[\w-]+\.(jpg|jpeg|png|webp)')
+
+mimetypes.add_type('application/rss+xml', '.rss')
+mimetypes.add_type('application/feed+json', '.json')
+mimetypes.add_type('application/atom+xml', '.atom')
+
+
+class FeedFile:
+    """One file's bytes, compressed variants and validators."""
+
+    def __init__(self, path, stat):
+        with open(path, 'rb') as f:
+            body = f.read()
+        self.stat_key = (stat.st_mtime_ns, stat.st_size)
+        self.checked = time.monotonic()
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if self.content_type.startswith('text/') or self.content_type.endswith('xml'):
+            self.content_type += '; charset=utf-8'
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        self.mtime = int(stat.st_mtime)
+        self.variants = {'identity': body}
+
+    @property
+    def size(self):
+        return sum(len(body) for body in self.variants.values())
+
+    @property
+    def compressible(self):
+        # Images are already compressed
+        return len(self.variants['identity']) >= MIN_COMPRESS_SIZE and not self.content_type.startswith('image/')
+
+    def compress(self):
+        """Build the compressed variants. Runs once per file version, off the request path."""
+        body = self.variants['identity']
+        variants = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+        if HAVE_BROTLI:
+            variants['br'] = brotli.compress(body)
+        self.variants = variants
+
+    def negotiate(self, accept_encoding):
+        """Pick the smallest variant the client accepts."""
+        accepted = {token.split(';')[0].strip().lower() for token in (accept_encoding or '').split(',')}
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and encoding in accepted:
+                return encoding
+        return 'identity'
+
+    def variant_etag(self, encoding):
+        return self.etag if encoding == 'identity' else self.etag[:-1] + '-' + encoding + '"'
+
+
+class FeedCache:
+    """In-memory copies of the servable files under root, reloaded when they change.
+
+    The least recently used files are dropped once the cache holds more than
+    max_bytes, counting every variant.
+    """
+
+    def __init__(self, root, reload_interval=RELOAD_INTERVAL, max_bytes=CACHE_BYTES):
+        self.root = os.path.abspath(root)
+        self.reload_interval = reload_interval
+        self.max_bytes = max_bytes
+        self.files = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.reloads = 0
+        self.compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='compress')
+
+    def resolve(self, url_path):
+        """Map a URL path to a servable file under root, or None if it is not one."""
+        relative = unquote(urlsplit(url_path).path).lstrip('/')
+        if not SERVED_PATHS.fullmatch(relative):
+            return None
+        path = os.path.abspath(os.path.join(self.root, relative))
+        if not path.startswith(self.root + os.sep):
+            return None
+        return path
+
+    def _store(self, path, entry):
+        """Put an entry in the cache and evict the least recently used past max_bytes. Call with the lock held."""
+        old = self.files.pop(path, None)
+        if old is not None:
+            self.bytes -= old.cached_size
+        # The size as counted, since compressing an entry grows it
+        entry.cached_size = entry.size
+        self.files[path] = entry
+        self.bytes += entry.cached_size
+        while self.bytes > self.max_bytes and len(self.files) > 1:
+            _, evicted = self.files.popitem(last=False)
+            self.bytes -= evicted.cached_size
+
+    def _compress(self, path, entry):
+        entry.compress()
+        with self.lock:
+            # Re-account the entry unless it was replaced or evicted meanwhile
+            if self.files.get(path) is entry:
+                self._store(path, entry)
+
+    def get(self, url_path):
+        """Return the FeedFile for a URL path, or None if there is no such file."""
+        path = self.resolve(url_path)
+        if path is None:
+            return None
+        entry = self.files.get(path)
+        now = time.monotonic()
+        if entry is not None and now - entry.checked < self.reload_interval:
+            self._touch(path)
+            return entry
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._drop(path)
+            return None
+        if not os.path.isfile(path):
+            return None
+        if entry is not None and entry.stat_key == (stat.st_mtime_ns, stat.st_size):
+            entry.checked = now
+            self._touch(path)
+            return entry
+        with self.lock:
+            entry = self.files.get(path)
+            if entry is None or entry.stat_key != (stat.st_mtime_ns, stat.st_size):
+                entry = FeedFile(path, stat)
+                self._store(path, entry)
+                self.reloads += 1
+                if entry.compressible:
+                    self.compressor.submit(self._compress, path, entry)
+            else:
+                self.files.move_to_end(path)
+        return entry
+
+    def _touch(self, path):
+        # A single OrderedDict call is atomic, so hits need not take the lock
+        try:
+            self.files.move_to_end(path)
+        except KeyError:
+            pass
+
+    def _drop(self, path):
+        with self.lock:
+            entry = self.files.pop(path, None)
+            if entry is not None:
+                self.bytes -= entry.cached_size
+
+    def close(self):
+        self.compressor.shutdown(wait=False)
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    """Serves FeedCache entries with compression and conditional responses."""
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this, keep-alive
+    # clients wait on delayed ACKs for every response
+    disable_nagle_algorithm = True
+    server_version = 'JWFeedServer/1.0'
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def _not_modified(self, entry, encoding):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+            return '*' in tags or entry.etag in tags or entry.variant_etag(encoding) in tags
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return entry.mtime <= since
+        return False
+
+    def _respond(self, send_body):
+        path = self.path
+        if path.endswith('/'):
+            path += 'jw_feed.xml'
+        entry = self.server.cache.get(path)
+        if entry is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        encoding = entry.negotiate(self.headers.get('Accept-Encoding'))
+        common = {
+            'ETag': entry.variant_etag(encoding),
+            'Last-Modified': entry.last_modified,
+            'Cache-Control': f'public, max-age={self.server.max_age}',
+            'Vary': 'Accept-Encoding',
+        }
+        if self._not_modified(entry, encoding):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            for name, value in common.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+
+        body = entry.variants[encoding]
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', entry.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if encoding != 'identity':
+            self.send_header('Content-Encoding', encoding)
+        for name, value in common.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+class FeedServer(ThreadingHTTPServer):
+    """Threaded HTTP server over a FeedCache."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, root=ROOT_DIR, port=PORT, host='', max_age=MAX_AGE, quiet=True):
+        self.cache = FeedCache(root)
+        self.max_age = max_age
+        self.quiet = quiet
+        super().__init__((host, port), FeedHandler)
+
+    def server_close(self):
+        super().server_close()
+        self.cache.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the generated feeds over HTTP")
+    parser.add_argument('--root', default=ROOT_DIR, help="directory to serve")
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args(argv)
+
+    with FeedServer(args.root, args.port, quiet=not args.verbose) as httpd:
+        print(f"Serving {args.root} on port {httpd.server_address[1]}"
+              f" (brotli {'on' if HAVE_BROTLI else 'off'})")
+        httpd.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+"""
+Streaming Feed Writer
+
+Writes RSS 2.0, Atom and JSON Feed documents straight to disk in a single
+pass. Items are serialized one at a time as they are consumed, so memory stays
+flat no matter how many items the feed holds, and write_feeds() renders any
+number of documents (in any format, optionally limited to one category) from
+one pass over the items. Output goes to a temporary file in the target
+directory that is renamed over the destination once complete, so readers
+never see a half-written feed.
+"""
+
+import contextlib
+import datetime
+import email.utils
+import functools
+import json
+import os
+import tempfile
+from xml.sax.saxutils import escape
+
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+MEDIA_NS = 'http://search.yahoo.com/mrss/'
+FH_NS = 'http://purl.org/syndication/history/1.0'  # RFC 5005 feed paging and archiving
+JSON_FEED_VERSION = 'https://jsonfeed.org/version/1.1'
+
+# Format -> file extension of its documents
+FORMATS = {'rss': '.xml', 'atom': '.atom', 'json': '.json'}
+
+_ATTR_ENTITIES = {'"': '&quot;', '\n': '&#10;', '\r': '&#13;', '\t': '&#9;'}
+
+
+def rfc822_now():
+    """Current UTC time in RFC 822 format, as used by RSS dates."""
+    return datetime.datetime.now(datetime.UTC).strftime('%a, %d %b %Y %H:%M:%S +0000')
+
+
+@functools.lru_cache(maxsize=1024)
+def rfc3339(rfc822_date):
+    """Convert an RFC 822 date (as used in items) to RFC 3339 for Atom and JSON Feed."""
+    dt = email.utils.parsedate_to_datetime(rfc822_date)
+    return dt.astimezone(datetime.UTC).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _text(value):
+    return escape(value or '')
+
+
+def _attr(value):
+    return '"' + escape(value or '', _ATTR_ENTITIES) + '"'
+
+
+def _target_mode(path):
+    # mkstemp creates 0600 files; keep the existing mode, or make the feed world-readable
+    try:
+        return os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        return 0o644
+
+
+@contextlib.contextmanager
+def atomic_write(path, encoding='utf-8'):
+    """Open a temp file next to path for writing and rename it into place on success."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding=encoding, newline='\n') as f:
+            os.chmod(tmp_path, _target_mode(path))
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+
+
+def _thumbnails(item):
+    """(url, width, height) of each thumbnail of an item, preferred first."""
+    if item.get('thumbnails'):
+        return [(t['url'], t.get('width'), t.get('height')) for t in item['thumbnails']]
+    if item.get('image'):
+        return [(item['image'], None, None)]
+    return []
+
+
+def _write_media_thumbnails(f, item, indent):
+    # Media RSS reads several thumbnails as in order of preference
+    for url, width, height in _thumbnails(item):
+        size = f' width="{width}" height="{height}"' if width and height else ''
+        f.write(f"{indent}<media:thumbnail url={_attr(url)}{size}/>\n")
+
+
+def write_rss_head(f, channel, build_date):
+    f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+    fh = f' xmlns:fh="{FH_NS}"' if channel.get('archive') else ''
+    f.write(f'<rss version="2.0" xmlns:atom="{ATOM_NS}" xmlns:media="{MEDIA_NS}"{fh}>\n')
+    f.write('  <channel>\n')
+    f.write(f"    <title>{_text(channel.get('title'))}</title>\n")
+    f.write(f"    <link>{_text(channel.get('link'))}</link>\n")
+    f.write(f"    <description>{_text(channel.get('description'))}</description>\n")
+    f.write(f"    <language>{_text(channel.get('language'))}</language>\n")
+    f.write(f'    <lastBuildDate>{build_date}</lastBuildDate>\n')
+    if channel.get('self_url'):
+        f.write(f"    <atom:link href={_attr(channel['self_url'])} rel=\"self\" type=\"application/rss+xml\"/>\n")
+    for rel, href in channel.get('links', ()):
+        f.write(f'    <atom:link href={_attr(href)} rel={_attr(rel)} type="application/rss+xml"/>\n')
+    if channel.get('archive'):
+        f.write('    <fh:archive/>\n')
+
+
+def write_rss_item(f, item, default_date):
+    """Write one <item> element."""
+    link = _text(item.get('link', ''))
+    f.write('    <item>\n')
+    f.write(f"      <title>{_text(item.get('title', ''))}</title>\n")
+    f.write(f'      <link>{link}</link>\n')
+    f.write(f'      <guid isPermaLink="true">{link}</guid>\n')
+    f.write(f"      <category>{_text(item.get('category', 'Update'))}</category>\n")
+    f.write(f"      <description>{_text(item.get('description', ''))}</description>\n")
+    f.write(f"      <pubDate>{_text(item.get('pub_date') or default_date)}</pubDate>\n")
+    _write_media_thumbnails(f, item, '      ')
+    f.write('    </item>\n')
+
+
+def write_rss_tail(f):
+    f.write('  </channel>\n')
+    f.write('</rss>\n')
+
+
+def write_atom_head(f, channel, build_date):
+    f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+    fh = f' xmlns:fh="{FH_NS}"' if channel.get('archive') else ''
+    f.write(f'<feed xmlns="{ATOM_NS}" xmlns:media="{MEDIA_NS}"{fh} xml:lang={_attr(channel.get("language"))}>\n')
+    f.write(f"  <title>{_text(channel.get('title'))}</title>\n")
+    f.write(f"  <subtitle>{_text(channel.get('description'))}</subtitle>\n")
+    f.write(f"  <link rel=\"alternate\" href={_attr(channel.get('link'))}/>\n")
+    if channel.get('self_url'):
+        f.write(f"  <link rel=\"self\" type=\"application/atom+xml\" href={_attr(channel['self_url'])}/>\n")
+    for rel, href in channel.get('links', ()):
+        f.write(f'  <link rel={_attr(rel)} type="application/atom+xml" href={_attr(href)}/>\n')
+    if channel.get('archive'):
+        f.write('  <fh:archive/>\n')
+    f.write(f"  <id>{_text(channel.get('self_url') or channel.get('link'))}</id>\n")
+    f.write(f'  <updated>{rfc3339(build_date)}</updated>\n')
+    f.write(f"  <author><name>{_text(channel.get('author') or channel.get('title'))}</name></author>\n")
+
+
+def write_atom_entry(f, item, default_date):
+    """Write one <entry> element."""
+    link = item.get('link', '')
+    f.write('  <entry>\n')
+    f.write(f"    <title>{_text(item.get('title', ''))}</title>\n")
+    f.write(f'    <link rel="alternate" href={_attr(link)}/>\n')
+    f.write(f'    <id>{_text(link)}</id>\n')
+    f.write(f"    <updated>{rfc3339(item.get('pub_date') or default_date)}</updated>\n")
+    f.write(f"    <category term={_attr(item.get('category', 'Update'))}/>\n")
+    f.write(f"    <summary>{_text(item.get('description', ''))}</summary>\n")
+    _write_media_thumbnails(f, item, '    ')
+    f.write('  </entry>\n')
+
+
+def write_atom_tail(f):
+    f.write('</feed>\n')
+
+
+def write_json_head(f, channel, build_date):
+    f.write('{\n')
+    f.write(f'  "version": {json.dumps(JSON_FEED_VERSION)},\n')
+    for key, field in (('title', 'title'), ('home_page_url', 'link'), ('feed_url', 'self_url'),
+                       ('description', 'description'), ('language', 'language')):
+        if channel.get(field):
+            f.write(f'  {json.dumps(key)}: {json.dumps(channel[field], ensure_ascii=False)},\n')
+    f.write('  "items": [')
+
+
+def write_json_item(f, item, default_date, first):
+    """Write one JSON Feed item object, preceded by a comma unless it is the first."""
+    entry = {
+        'id': item.get('link', ''),
+        'url': item.get('link', ''),
+        'title': item.get('title', ''),
+        'content_text': item.get('description', ''),
+        'date_published': rfc3339(item.get('pub_date') or default_date),
+        'tags': [item.get('category', 'Update')],
+    }
+    thumbnails = _thumbnails(item)
+    if thumbnails:
+        entry['image'] = thumbnails[0][0]
+    f.write(('\n    ' if first else ',\n    ') + json.dumps(entry, ensure_ascii=False))
+
+
+def write_json_tail(f, count):
+    f.write('\n  ]\n}\n' if count else ']\n}\n')
+
+
+class FeedOutput:
+    """One document for write_feeds(): path, format, channel and an optional category filter."""
+
+    def __init__(self, path, format='rss', channel=None, category=None):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown feed format {format!r}; expected one of {', '.join(FORMATS)}")
+        self.path = path
+        self.format = format
+        self.channel = channel or {}
+        self.category = category
+        self.count = 0
+        self.build_date = None
+
+    def wants(self, item):
+        return self.category is None or item.get('category') == self.category
+
+    def write_head(self, f, build_date):
+        self.count = 0
+        self.build_date = self.channel.get('last_build_date') or build_date
+        if self.format == 'rss':
+            write_rss_head(f, self.channel, self.build_date)
+        elif self.format == 'atom':
+            write_atom_head(f, self.channel, self.build_date)
+        else:
+            write_json_head(f, self.channel, self.build_date)
+
+    def write_item(self, f, item):
+        if self.format == 'rss':
+            write_rss_item(f, item, self.build_date)
+        elif self.format == 'atom':
+            write_atom_entry(f, item, self.build_date)
+        else:
+            write_json_item(f, item, self.build_date, self.count == 0)
+        self.count += 1
+
+    def write_tail(self, f):
+        if self.format == 'rss':
+            write_rss_tail(f)
+        elif self.format == 'atom':
+            write_atom_tail(f)
+        else:
+            write_json_tail(f, self.count)
+
+
+def write_feeds(outputs, items):
+    """Stream every output document atomically from one pass over items.
+
+    items is any iterable of item dicts and is consumed exactly once; each
+    item goes to every output whose category filter it matches. Returns the
+    item count written to each output, in order.
+    """
+    build_date = rfc822_now()
+    with contextlib.ExitStack() as stack:
+        files = [stack.enter_context(atomic_write(out.path)) for out in outputs]
+        for out, f in zip(outputs, files):
+            out.write_head(f, build_date)
+        for item in items:
+            for out, f in zip(outputs, files):
+                if out.wants(item):
+                    out.write_item(f, item)
+        for out, f in zip(outputs, files):
+            out.write_tail(f)
+    return [out.count for out in outputs]
+
+
+def write_rss(path, channel, items):
+    """Stream an RSS 2.0 document to path atomically.
+
+    channel holds title, link, description, language and self_url, and
+    optionally links ((rel, href) pairs such as RFC 5005 prev-archive) and
+    archive (mark the document as an archived feed page); items is any
+    iterable of item dicts and is consumed exactly once.
+    """
+    return write_feeds([FeedOutput(path, 'rss', channel)], items)[0]
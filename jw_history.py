@@ -0,0 +1,214 @@
+"""
+History Store
+
+Tracks which feed items have already been seen. Entries live in an
+append-only JSON Lines log (one URL, title and first-seen time per line),
+which is the tracked source of truth and changes by only the new lines each
+run. Lookups go through a SQLite index next to the log (<log>.db), so a run
+never loads the history: membership checks are indexed queries and each run
+only appends the URLs it discovered. The index records the log's size and a
+hash of its tail and is rebuilt from the log when they no longer match, e.g.
+on a fresh clone without a cached index. The log is periodically compacted, which is also when
+optional age and count limits evict the oldest entries.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+import jw_jsonl
+
+# Compact once duplicate or evicted lines make up this share of the log
+COMPACT_RATIO = 0.5
+# Bytes at the end of the log hashed to tell whether the index still matches it
+TAIL_BYTES = 4096
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, first_seen TEXT, record TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+
+REBUILD_SQL = """
+INSERT OR IGNORE INTO entries (url, first_seen, record)
+SELECT json_extract(?1, '$.url'), json_extract(?1, '$.first_seen'), ?1
+WHERE json_valid(?1) AND json_type(?1, '$.url') = 'text'
+"""
+
+
+def _now():
+    return datetime.datetime.now(datetime.UTC).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _row(record):
+    return record['url'], record.get('first_seen'), json.dumps(record, ensure_ascii=False)
+
+
+def _parse_time(value):
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=datetime.UTC)
+    except (TypeError, ValueError):
+        return None
+
+
+class HistoryStore:
+    """Append-only history of seen URLs with title and first-seen time, indexed in SQLite."""
+
+    def __init__(self, path, legacy_path=None, max_entries=None, max_age_days=None, index_path=None):
+        self.path = path
+        self.index_path = index_path or path + '.db'
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self._pending = {}  # Added since the last flush, by URL; not in the index yet
+        self._lock = threading.Lock()
+        # Stores are shared between the daemon's worker threads; the lock serializes use
+        self._db = sqlite3.connect(self.index_path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._log_lines, self._count = self._sync()
+        if not self._log_lines and legacy_path and os.path.exists(legacy_path):
+            self.migrate_json(legacy_path)
+
+    def _log_stat(self):
+        """(size, tail hash) of the log. Unlike mtimes, these survive a checkout."""
+        try:
+            with open(self.path, 'rb') as f:
+                size = f.seek(0, os.SEEK_END)
+                f.seek(max(0, size - TAIL_BYTES))
+                tail = f.read()
+        except FileNotFoundError:
+            return 0, 0
+        return size, int.from_bytes(hashlib.sha256(tail).digest()[:7], 'big')
+
+    def _sync(self):
+        """Rebuild the index unless it matches the log. Returns (log lines, entries)."""
+        meta = dict(self._db.execute('SELECT key, value FROM meta'))
+        if (meta.get('log_size'), meta.get('log_tail')) == self._log_stat() and 'log_lines' in meta:
+            return meta['log_lines'], meta['count']
+        with self._db:
+            self._db.execute('DELETE FROM entries')
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    lines = f.read().splitlines()
+            except FileNotFoundError:
+                lines = []
+            # SQLite decodes the lines; torn and foreign ones are skipped, and the first line for a URL wins
+            self._db.executemany(REBUILD_SQL, ((line,) for line in lines))
+            lines = len(lines)
+            count = self._db.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+            self._save_meta(lines, count)
+        return lines, count
+
+    def _save_meta(self, lines, count):
+        size, tail = self._log_stat()
+        self._db.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', [
+            ('log_size', size), ('log_tail', tail), ('log_lines', lines), ('count', count)])
+
+    def __contains__(self, url):
+        with self._lock:
+            return self._known(url)
+
+    def _known(self, url):
+        return url in self._pending or self._db.execute(
+            'SELECT 1 FROM entries WHERE url = ?', (url,)).fetchone() is not None
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        with self._lock:
+            urls = [url for url, in self._db.execute('SELECT url FROM entries ORDER BY id')] + list(self._pending)
+        return iter(urls)
+
+    def get(self, url):
+        """Return the stored record for a URL, or None."""
+        with self._lock:
+            if url in self._pending:
+                return self._pending[url]
+            row = self._db.execute('SELECT record FROM entries WHERE url = ?', (url,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def add(self, url, title=''):
+        """Record a URL as seen. Returns True if it was not already known."""
+        with self._lock:
+            if self._known(url):
+                return False
+            self._pending[url] = {'url': url, 'title': title, 'first_seen': _now()}
+            self._count += 1
+        return True
+
+    def _write_pending(self):
+        """Append pending entries to the log, then to the index. Call with the lock held."""
+        if not self._pending:
+            return
+        records = list(self._pending.values())
+        jw_jsonl.append(self.path, records)
+        with self._db:
+            self._db.executemany('INSERT OR IGNORE INTO entries (url, first_seen, record) VALUES (?, ?, ?)',
+                                 [_row(record) for record in records])
+            self._log_lines += len(records)
+            self._save_meta(self._log_lines, self._count)
+        self._pending = {}
+
+    def flush(self):
+        """Append newly added entries to the log, compacting when it is due."""
+        with self._lock:
+            self._write_pending()
+        if self._compaction_due():
+            self.compact()
+
+    def _oldest(self):
+        with self._lock:
+            row = self._db.execute('SELECT record FROM entries ORDER BY id LIMIT 1').fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _over_limits(self):
+        if self.max_entries is not None and self._count > self.max_entries:
+            return True
+        if self.max_age_days is not None and self._count:
+            oldest = _parse_time(self._oldest().get('first_seen'))
+            cutoff = datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=self.max_age_days)
+            return oldest is not None and oldest < cutoff
+        return False
+
+    def _compaction_due(self):
+        dead = self._log_lines - self._count
+        return (dead > 0 and dead >= self._log_lines * COMPACT_RATIO) or self._over_limits()
+
+    def compact(self):
+        """Rewrite the log with one line per live entry, applying eviction limits."""
+        with self._lock, self._db:
+            self._write_pending()
+            if self.max_age_days is not None:
+                cutoff = datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=self.max_age_days)
+                self._db.execute('DELETE FROM entries WHERE first_seen < ?', (cutoff.strftime('%Y-%m-%dT%H:%M:%SZ'),))
+            if self.max_entries is not None:
+                self._db.execute('DELETE FROM entries WHERE id NOT IN '
+                                 '(SELECT id FROM entries ORDER BY id DESC LIMIT ?)', (self.max_entries,))
+            self._log_lines = self._count = jw_jsonl.rewrite_lines(
+                self.path, (record for record, in self._db.execute('SELECT record FROM entries ORDER BY id')))
+            self._save_meta(self._log_lines, self._count)
+
+    def close(self):
+        self._db.close()
+
+    def migrate_json(self, legacy_path):
+        """Import URLs from the old history.json list (or dict) format."""
+        try:
+            with open(legacy_path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return 0
+        if isinstance(data, dict):
+            data = list(data.keys())
+        if not isinstance(data, list):
+            return 0
+        count = 0
+        for url in data:
+            if isinstance(url, str) and self.add(url):
+                count += 1
+        self.flush()
+        return count
@@ -0,0 +1,113 @@
+"""
+Shared HTTP Client
+
+Provides a pooled requests session for scrapers that can read JW.ORG pages
+without starting a browser. Page and API fetches go through the shared
+on-disk response cache in jw_cache (see JW_HTTP_CACHE for the on, off,
+record and replay modes).
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from jw_cache import MODES as CACHE_MODES, ResponseCache
+
+# Browser-like headers; jw.org serves the full server-rendered page to these
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/124.0 Safari/537.36')
+DEFAULT_HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+DEFAULT_TIMEOUT = 30
+POOL_SIZE = 10
+
+_session = None
+_cache = None
+
+
+def create_session(pool_size=POOL_SIZE, retries=3):
+    """Create a requests session with connection pooling and retry backoff."""
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=('GET', 'HEAD'),
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    """Return the process-wide shared session, creating it on first use."""
+    global _session
+    if _session is None:
+        _session = create_session()
+    return _session
+
+
+def get_cache():
+    """Return the process-wide response cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache()
+    return _cache
+
+
+def configure_cache(mode=None, root=None):
+    """Replace the process-wide response cache, e.g. to switch to record or replay mode."""
+    global _cache
+    kwargs = {k: v for k, v in (('mode', mode), ('root', root)) if v is not None}
+    _cache = ResponseCache(**kwargs)
+    return _cache
+
+
+def fetch_text(url, session=None, timeout=DEFAULT_TIMEOUT, ttl=None):
+    """Fetch a URL through the response cache and return the decoded body."""
+    return get_cache().get(session or get_session(), url, timeout, ttl).text
+
+
+def fetch_json(url, session=None, timeout=DEFAULT_TIMEOUT, ttl=None):
+    """Fetch a URL through the response cache and return the parsed JSON body."""
+    return get_cache().get(session or get_session(), url, timeout, ttl).json()
+
+
+def fetch_text_conditional(url, validators=None, session=None, timeout=DEFAULT_TIMEOUT, ttl=None):
+    """Fetch a URL with If-None-Match/If-Modified-Since from stored validators.
+
+    ttl overrides how long a cached response counts as fresh; 0 always asks
+    the origin (revalidating any cached copy), and is the default whenever
+    validators are passed, since a conditional request exists to reach the
+    origin. Returns (text, validators). text is None when the server answers 304, or
+    when the (possibly cached) response carries the validators passed in; the
+    validators passed in are then returned unchanged.
+    """
+    validators = validators or {}
+    if ttl is None and validators:
+        ttl = 0
+    headers = {}
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+
+    response = get_cache().get(session or get_session(), url, timeout, ttl, headers=headers)
+    if response is None:
+        return None, validators
+    new_validators = response.validators
+    if _unchanged(validators, new_validators):
+        return None, validators
+    return response.text, new_validators
+
+
+def _unchanged(old, new):
+    """True if new validators describe the same representation as old, as a server's 304 would."""
+    if old.get('etag') and new.get('etag'):
+        return old['etag'] == new['etag']
+    return bool(old.get('last_modified')) and old.get('last_modified') == new.get('last_modified')
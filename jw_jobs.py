@@ -0,0 +1,143 @@
+"""
+Download Jobs
+
+Checkpointed state for a download run over urls_and_titles.txt. Every
+category and every video in it moves through pending -> resolved ->
+downloading -> done (or failed), and each transition is appended to a JSON
+Lines log as it happens. After a crash the log is replayed and the run
+resumes where it stopped: finished categories are skipped, resolved ones do
+not need resolving again, and only unfinished videos are queued.
+"""
+
+import os
+import threading
+
+import jw_jsonl
+
+PENDING = 'pending'
+RESOLVED = 'resolved'
+DOWNLOADING = 'downloading'
+DONE = 'done'
+FAILED = 'failed'
+
+FINISHED = (DONE, FAILED)
+
+
+class JobStore:
+    """Per-category and per-item job state, checkpointed to an append-only log."""
+
+    def __init__(self, path):
+        self.path = path
+        self.categories = {}
+        self._lock = threading.Lock()
+        self._log_lines = 0
+        self._load()
+
+    def _load(self):
+        self._log_lines = jw_jsonl.load(self.path, self._apply)
+
+    def _apply(self, event):
+        category = self.categories.setdefault(event['category'], {'state': PENDING, 'items': {}})
+        if event.get('removed'):
+            category['items'].pop(event['item'], None)
+        elif 'item' in event:
+            item = category['items'].setdefault(event['item'], {})
+            item.update({k: v for k, v in event.items() if k not in ('category', 'item')})
+        else:
+            category['state'] = event['state']
+            if 'error' in event:
+                category['error'] = event['error']
+
+    def _checkpoint(self, event):
+        """Apply an event and append it to the log before returning."""
+        with self._lock:
+            self._apply(event)
+            jw_jsonl.append(self.path, [event])
+            self._log_lines += 1
+
+    def sync(self, urls):
+        """Add any URLs not yet tracked as pending categories."""
+        for url in urls:
+            if url not in self.categories:
+                self._checkpoint({'category': url, 'state': PENDING})
+
+    def state(self, url):
+        return self.categories.get(url, {}).get('state', PENDING)
+
+    def items(self, url):
+        """Item records of a category, by key."""
+        return self.categories.get(url, {}).get('items', {})
+
+    def set_state(self, url, state, error=None):
+        event = {'category': url, 'state': state}
+        if error:
+            event['error'] = error
+        self._checkpoint(event)
+
+    def resolve(self, url, items):
+        """Record the videos found in a category and mark it resolved.
+
+        A listing with download URLs (from the media API) supersedes unfinished
+        items recorded from the category page by title, which have none.
+        """
+        if any('url' in item for item in items):
+            listed = {item['key'] for item in items}
+            for key, known in list(self.items(url).items()):
+                if key not in listed and 'url' not in known and known.get('state') != DONE:
+                    self._checkpoint({'category': url, 'item': key, 'removed': True})
+        for item in items:
+            known = self.items(url).get(item['key'])
+            if known is None or known.get('state') != DONE:
+                self._checkpoint({'category': url, 'item': item['key'], 'state': PENDING,
+                                  **{k: v for k, v in item.items() if k != 'key'}})
+        self.set_state(url, RESOLVED)
+
+    def set_item(self, url, key, state, error=None):
+        """Move an item to a new state, finishing its category once every item has."""
+        event = {'category': url, 'item': key, 'state': state}
+        if error:
+            event['error'] = error
+        self._checkpoint(event)
+        if state in FINISHED:
+            with self._lock:
+                states = [item.get('state') for item in self.items(url).values()]
+            if states and all(s in FINISHED for s in states) and self.state(url) not in FINISHED:
+                self.set_state(url, FAILED if FAILED in states else DONE)
+
+    def pending_items(self, url):
+        """Items of a category that still need work, as (key, record) pairs."""
+        return [(key, item) for key, item in self.items(url).items() if item.get('state') != DONE]
+
+    def summary(self):
+        """Count categories and items by state."""
+        counts = {'categories': {}, 'items': {}}
+        with self._lock:
+            for category in self.categories.values():
+                counts['categories'][category['state']] = counts['categories'].get(category['state'], 0) + 1
+                for item in category['items'].values():
+                    state = item.get('state', PENDING)
+                    counts['items'][state] = counts['items'].get(state, 0) + 1
+        return counts
+
+    def _events(self):
+        """The current state as one event per category and item."""
+        for url, category in self.categories.items():
+            for key, item in category['items'].items():
+                yield {'category': url, 'item': key, **item}
+            event = {'category': url, 'state': category['state']}
+            if category.get('error'):
+                event['error'] = category['error']
+            yield event
+
+    def compact(self):
+        """Rewrite the log as one line per category and item."""
+        with self._lock:
+            self._log_lines = jw_jsonl.rewrite(self.path, self._events())
+
+    def reset(self):
+        """Forget all job state."""
+        with self._lock:
+            self.categories = {}
+            self._log_lines = 0
+            if os.path.exists(self.path):
+                os.remove(self.path)
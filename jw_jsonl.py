@@ -0,0 +1,88 @@
+"""
+JSON Lines Logs
+
+Reading, appending and compacting for the append-only JSON Lines logs behind
+the history, item, manifest, job, response cache and daily text stores.
+
+A write interrupted by a crash can leave the last line without its newline.
+Loading skips such a line; before the next append the tail is repaired, so a
+new record is never glued onto it: a complete record missing only its newline
+is terminated, anything else is cut off.
+"""
+
+import json
+import os
+
+TAIL_CHUNK = 4096
+
+
+def load(path, apply):
+    """Call apply with every record in the log. Returns the number of lines read.
+
+    Lines that do not decode, or for which apply raises KeyError or
+    TypeError, are torn or foreign and skipped. A missing file has no lines.
+    """
+    lines = 0
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                lines += 1
+                try:
+                    apply(json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    continue  # Torn or foreign line, dropped at next compaction
+    except FileNotFoundError:
+        pass
+    return lines
+
+
+def _repair_tail(f, end):
+    """Terminate or cut off an unterminated last line of a file opened for append."""
+    f.seek(end - 1)
+    if f.read(1) == b'\n':
+        return
+    start = end
+    while start > 0:
+        step = min(TAIL_CHUNK, start)
+        f.seek(start - step)
+        newline = f.read(step).rfind(b'\n')
+        start -= step
+        if newline >= 0:
+            start += newline + 1
+            break
+    f.seek(start)
+    try:
+        json.loads(f.read(end - start))
+    except ValueError:
+        f.truncate(start)
+    else:
+        f.write(b'\n')
+
+
+def append(path, records):
+    """Append records, one per line, after repairing a torn last line."""
+    data = b''.join(json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n' for record in records)
+    if not data:
+        return
+    with open(path, 'a+b') as f:
+        end = f.seek(0, os.SEEK_END)
+        if end:
+            _repair_tail(f, end)
+        f.write(data)
+
+
+def rewrite(path, records):
+    """Atomically replace the log with records, one per line. Returns the number written."""
+    return rewrite_lines(path, (json.dumps(record, ensure_ascii=False) for record in records))
+
+
+def rewrite_lines(path, lines):
+    """Atomically replace the log with already encoded records. Returns the number written."""
+    count = 0
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for line in lines:
+            f.write(line + '\n')
+            count += 1
+    os.replace(tmp_path, path)
+    return count
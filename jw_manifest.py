@@ -0,0 +1,128 @@
+"""
+Download Manifest
+
+Records every finished download (media key, URL, title, path, size and MD5
+checksum) in an append-only JSON Lines file next to the downloads. Lookups by
+key, URL or title are O(1), so already-downloaded videos are skipped before
+any network or browser work, and a video listed in several categories is
+downloaded once and hardlinked into the other folders.
+"""
+
+import datetime
+import hashlib
+import logging
+import os
+import shutil
+import threading
+
+import jw_jsonl
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _now():
+    return datetime.datetime.now(datetime.UTC).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def file_checksum(path, chunk_size=CHUNK_SIZE):
+    """MD5 of a file, read in chunks (the media API publishes MD5 checksums)."""
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def link_or_copy(source, dest):
+    """Hardlink source to dest, copying if the filesystem cannot link."""
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    try:
+        os.link(source, dest)
+        return 'linked'
+    except OSError:
+        shutil.copy2(source, dest)
+        return 'copied'
+
+
+class Manifest:
+    """Append-only log of downloaded media, indexed by key, URL and title."""
+
+    def __init__(self, path):
+        self.path = path
+        self.root = os.path.dirname(os.path.abspath(path))
+        self._by_key = {}
+        self._by_url = {}
+        self._by_title = {}
+        self._lock = threading.Lock()
+        self._log_lines = 0
+        self._load()
+
+    def _load(self):
+        self._log_lines = jw_jsonl.load(self.path, self._index)
+
+    def _index(self, record):
+        # Later lines replace earlier ones for the same key
+        self._by_key[record['key']] = record
+        if record.get('url'):
+            self._by_url[record['url']] = record
+        if record.get('title'):
+            self._by_title[record['title']] = record
+
+    def __len__(self):
+        return len(self._by_key)
+
+    def abspath(self, record):
+        """Absolute path of a record's file (paths are stored relative to the manifest)."""
+        return os.path.join(self.root, record['path'])
+
+    def find(self, key=None, url=None, title=None):
+        """Return the record matching any of key, URL or title whose file still exists."""
+        with self._lock:
+            candidates = [self._by_key.get(key), self._by_url.get(url), self._by_title.get(title)]
+        for record in candidates:
+            if record and os.path.isfile(self.abspath(record)):
+                if record.get('size') is None or os.path.getsize(self.abspath(record)) == record['size']:
+                    return record
+        return None
+
+    def record(self, path, key=None, url=None, title='', checksum=None):
+        """Add a downloaded file. The checksum is computed if not given."""
+        relpath = os.path.relpath(os.path.abspath(path), self.root)
+        record = {
+            'key': key or url or relpath,
+            'url': url,
+            'title': title,
+            'path': relpath,
+            'size': os.path.getsize(path),
+            'checksum': checksum or file_checksum(path),
+            'downloaded_at': _now(),
+        }
+        with self._lock:
+            self._index(record)
+            jw_jsonl.append(self.path, [record])
+            self._log_lines += 1
+        return record
+
+    def verify(self, path, expected):
+        """Check a finished download against the checksum the server published."""
+        if not expected:
+            return True
+        actual = file_checksum(path)
+        if actual != expected.lower():
+            logging.error("Checksum mismatch for %s: expected %s, got %s", path, expected, actual)
+            return False
+        return True
+
+    def place(self, record, dest):
+        """Make an already-downloaded file available at dest. Returns how, or None if present."""
+        source = self.abspath(record)
+        if os.path.exists(dest) or os.path.abspath(dest) == os.path.abspath(source):
+            return None
+        return link_or_copy(source, dest)
+
+    def compact(self):
+        """Rewrite the log with one line per key when superseded lines pile up."""
+        with self._lock:
+            if self._log_lines <= len(self._by_key):
+                return
+            self._log_lines = jw_jsonl.rewrite(self.path, self._by_key.values())
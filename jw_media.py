@@ -0,0 +1,139 @@
+"""
+Media Resolver
+
+Turns a jw.org video category URL into its media items and direct download
+links in one request to the mediator API that the video library page itself
+renders from, instead of clicking through each title in a browser. Resolved
+categories are cached on disk with a TTL so later runs skip resolution.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+import jw_http
+
+MEDIATOR_URL = os.environ.get('JW_MEDIATOR_URL', 'https://b.jw-cdn.org/apis/mediator/v1')
+PREFERRED_RESOLUTION = os.environ.get('JW_VIDEO_RESOLUTION', '720p')
+CACHE_TTL = float(os.environ.get('JW_MEDIA_CACHE_TTL', str(24 * 3600)))  # seconds
+
+# Locale in the URL fragment to the mediator language code, for when appLanguage is absent
+LANGUAGE_CODES = {'en': 'E', 'es': 'S', 'fr': 'F', 'de': 'X', 'pt': 'T', 'it': 'I'}
+
+
+def parse_category_url(url):
+    """Extract (language code, category key) from a video library category URL.
+
+    Handles URLs such as .../videos/?appLanguage=E#en/categories/StudioNewsReports
+    """
+    parts = urlsplit(url)
+    match = re.search(r'(?:^|/)(\w+)/categories/([^/?#]+)', parts.fragment or parts.path)
+    if not match:
+        return None, None
+    lang = parse_qs(parts.query).get('appLanguage', [None])[0]
+    return lang or LANGUAGE_CODES.get(match.group(1), 'E'), match.group(2)
+
+
+def _resolution(label):
+    match = re.match(r'(\d+)p', label or '')
+    return int(match.group(1)) if match else 0
+
+
+def pick_file(files, preferred=PREFERRED_RESOLUTION):
+    """Choose the preferred resolution, else the largest one below it, else the smallest."""
+    videos = [f for f in files if f.get('progressiveDownloadURL')]
+    if not videos:
+        return None
+    target = _resolution(preferred)
+    below = [f for f in videos if _resolution(f.get('label')) <= target]
+    if below:
+        return max(below, key=lambda f: _resolution(f.get('label')))
+    return min(videos, key=lambda f: _resolution(f.get('label')))
+
+
+def _media_items(category, preferred):
+    items = []
+    for media in category.get('media', []):
+        chosen = pick_file(media.get('files', []), preferred)
+        if chosen is None:
+            continue
+        items.append({
+            'key': media.get('naturalKey') or media.get('guid') or chosen['progressiveDownloadURL'],
+            'title': media.get('title', ''),
+            'url': chosen['progressiveDownloadURL'],
+            'size': chosen.get('filesize'),
+            'checksum': chosen.get('checksum'),
+            'label': chosen.get('label', ''),
+        })
+    for sub in category.get('subcategories', []):
+        items.extend(_media_items(sub, preferred))
+    return items
+
+
+def resolve_category(url, session=None, preferred=PREFERRED_RESOLUTION):
+    """Resolve a category page URL to its media items. Returns None if it cannot be resolved."""
+    lang, key = parse_category_url(url)
+    if not key:
+        return None
+    api_url = f'{MEDIATOR_URL}/categories/{lang}/{key}?detailed=1&clientType=www'
+    try:
+        category = jw_http.fetch_json(api_url, session)['category']
+    except (requests.RequestException, ValueError, KeyError) as e:
+        logging.warning("Could not resolve %s through the media API: %s", key, e)
+        return None
+
+    items, seen = [], set()
+    for item in _media_items(category, preferred):
+        if item['key'] not in seen:
+            seen.add(item['key'])
+            items.append(item)
+    return items
+
+
+class ResolverCache:
+    """JSON file cache of resolved categories with a time-to-live."""
+
+    def __init__(self, path, ttl=CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def get(self, url):
+        """Cached items for url, or None if missing or expired."""
+        with self.lock:
+            entry = self.entries.get(url)
+        if entry and time.time() - entry.get('resolved_at', 0) < self.ttl:
+            return entry['items']
+        return None
+
+    def put(self, url, items):
+        with self.lock:
+            self.entries[url] = {'resolved_at': time.time(), 'items': items}
+
+    def save(self):
+        with self.lock:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+
+    def resolve(self, url, session=None, preferred=PREFERRED_RESOLUTION):
+        """Return cached items for url, resolving and caching them on a miss."""
+        items = self.get(url)
+        if items is not None:
+            return items
+        items = resolve_category(url, session, preferred)
+        if items:
+            self.put(url, items)
+        return items
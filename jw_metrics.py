@@ -0,0 +1,230 @@
+"""
+Run Metrics
+
+Shared instrumentation for the scrapers. A run collects timed spans per stage
+(driver startup, fetch, parse, serialize, history I/O, downloads, ...),
+counters (items parsed, new items, bytes downloaded, retries, ...) and gauges.
+When the run finishes it appends one JSON record to <name>.jsonl and rewrites
+<name>.prom in the Prometheus textfile format, both in JW_METRICS_DIR.
+
+Code records into the current run through the module-level span(), count()
+and gauge() helpers, which do nothing when no run has been started. With
+profiling enabled, spans marked profile=True run under cProfile and the
+combined stats are dumped to <name>.prof.
+"""
+
+import contextlib
+import cProfile
+import datetime
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+
+METRICS_DIR = os.environ.get(
+    'JW_METRICS_DIR', os.path.join(os.environ.get('JW_DATA_DIR', os.path.dirname(os.path.abspath(__file__))), 'metrics'))
+
+_current = None
+
+
+class Span:
+    """Timing of one stage execution; elapsed is set when the block exits."""
+
+    __slots__ = ('stage', 'labels', 'elapsed')
+
+    def __init__(self, stage, labels):
+        self.stage = stage
+        self.labels = labels
+        self.elapsed = 0.0
+
+
+class Run:
+    """Spans, counters and gauges for one run of a scraper."""
+
+    def __init__(self, name, profile=False, metrics_dir=None):
+        self.name = name
+        self.metrics_dir = metrics_dir or METRICS_DIR
+        self.profile = profile
+        self.started = time.perf_counter()
+        self.started_at = datetime.datetime.now(datetime.UTC)
+        self.spans = {}
+        self.counters = {}
+        self.gauges = {}
+        self.profiles = []
+        self._lock = threading.Lock()
+        # cProfile can only be active in one thread at a time
+        self._profiler_lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, stage, profile=False, **labels):
+        """Time a block as one execution of stage."""
+        record = Span(stage, labels)
+        profiler = None
+        if profile and self.profile and self._profiler_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.elapsed = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                self._profiler_lock.release()
+            key = (stage, tuple(sorted(labels.items())))
+            with self._lock:
+                if profiler is not None:
+                    self.profiles.append(profiler)
+                stats = self.spans.setdefault(key, {'count': 0, 'total_s': 0.0, 'max_s': 0.0})
+                stats['count'] += 1
+                stats['total_s'] += record.elapsed
+                stats['max_s'] = max(stats['max_s'], record.elapsed)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def record(self, status='ok'):
+        """The run as a JSON-serializable dict."""
+        with self._lock:
+            spans = [{'stage': stage, **dict(labels), **stats} for (stage, labels), stats in self.spans.items()]
+            return {
+                'run': self.name,
+                'started_at': self.started_at.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'duration_s': time.perf_counter() - self.started,
+                'status': status,
+                'spans': spans,
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+            }
+
+    def finish(self, status='ok'):
+        """Write the JSON record, Prometheus textfile and profile. Returns the record."""
+        global _current
+        record = self.record(status)
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        with open(os.path.join(self.metrics_dir, f'{self.name}.jsonl'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+        _write_atomic(os.path.join(self.metrics_dir, f'{self.name}.prom'), prometheus_text(record))
+        if self.profiles:
+            stats = pstats.Stats(self.profiles[0])
+            for profiler in self.profiles[1:]:
+                stats.add(profiler)
+            path = os.path.join(self.metrics_dir, f'{self.name}.prof')
+            stats.dump_stats(path)
+            record['profile'] = path
+        if _current is self:
+            _current = None
+        return record
+
+    def profile_summary(self, limit=20):
+        """Top functions by cumulative time across the profiled spans."""
+        if not self.profiles:
+            return ''
+        out = io.StringIO()
+        stats = pstats.Stats(self.profiles[0], stream=out)
+        for profiler in self.profiles[1:]:
+            stats.add(profiler)
+        stats.sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
+
+def _write_atomic(path, text):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _metric_name(value):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', value)
+
+
+def _labels(values):
+    if not values:
+        return ''
+    escaped = (f'{_metric_name(k)}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for k, v in values.items())
+    return '{' + ','.join(escaped) + '}'
+
+
+def prometheus_text(record):
+    """Render a run record in the Prometheus text exposition format.
+
+    The textfile is rewritten every run, so the per-run span and counter
+    values are exported as last_run gauges rather than counters, which
+    would appear to reset each run.
+    """
+    prefix = 'jw_' + _metric_name(record['run'])
+    lines = [
+        f'# TYPE {prefix}_run_duration_seconds gauge',
+        f"{prefix}_run_duration_seconds {record['duration_s']:.6f}",
+        f'# TYPE {prefix}_last_run_timestamp_seconds gauge',
+        f"{prefix}_last_run_timestamp_seconds "
+        f"{datetime.datetime.strptime(record['started_at'], '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=datetime.UTC).timestamp():.0f}",
+        f'# TYPE {prefix}_run_success gauge',
+        f"{prefix}_run_success {1 if record['status'] == 'ok' else 0}",
+    ]
+    if record['spans']:
+        lines.append(f'# TYPE {prefix}_last_run_stage_seconds gauge')
+        for span in record['spans']:
+            labels = {k: v for k, v in span.items() if k not in ('count', 'total_s', 'max_s')}
+            lines.append(f"{prefix}_last_run_stage_seconds{_labels(labels)} {span['total_s']:.6f}")
+        lines.append(f'# TYPE {prefix}_last_run_stage_calls gauge')
+        for span in record['spans']:
+            labels = {k: v for k, v in span.items() if k not in ('count', 'total_s', 'max_s')}
+            lines.append(f"{prefix}_last_run_stage_calls{_labels(labels)} {span['count']}")
+    for name, value in sorted(record['counters'].items()):
+        lines.append(f'# TYPE {prefix}_last_run_{_metric_name(name)} gauge')
+        lines.append(f'{prefix}_last_run_{_metric_name(name)} {value}')
+    for name, value in sorted(record['gauges'].items()):
+        lines.append(f'# TYPE {prefix}_{_metric_name(name)} gauge')
+        lines.append(f'{prefix}_{_metric_name(name)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def start_run(name, profile=False, metrics_dir=None):
+    """Start a run and make it the one the module-level helpers record into."""
+    global _current
+    _current = Run(name, profile, metrics_dir)
+    return _current
+
+
+def current():
+    """The active run, or None."""
+    return _current
+
+
+@contextlib.contextmanager
+def span(stage, profile=False, **labels):
+    """Time a block in the current run (a no-op timer if there is none)."""
+    run = _current
+    if run is None:
+        record = Span(stage, labels)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.elapsed = time.perf_counter() - start
+        return
+    with run.span(stage, profile, **labels) as record:
+        yield record
+
+
+def count(name, amount=1):
+    """Add to a counter of the current run."""
+    if _current is not None:
+        _current.count(name, amount)
+
+
+def gauge(name, value):
+    """Set a gauge of the current run."""
+    if _current is not None:
+        _current.gauge(name, value)
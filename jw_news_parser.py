@@ -1,31 +1,37 @@
 """
 JW.ORG RSS Feed Generator
 
-Scrapes JW.ORG "What's New" page for the latest content using Selenium,
-then generates an RSS 2.0 feed that can be consumed by feed readers.
+Scrapes JW.ORG "What's New" page for the latest content, then generates an
+RSS 2.0 feed that can be consumed by feed readers.
 
-All content is scraped directly from the What's New page in release order.
+The page is fetched over plain HTTP with a pooled session; Selenium is only
+started as a fallback when that fails. All content is scraped directly from
+the What's New page in release order.
 """
 
 import os
 import re
 import json
+import hashlib
+import time
+import argparse
 import datetime
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.common.exceptions import WebDriverException
-from bs4 import BeautifulSoup
-from selenium import webdriver
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+
+import jw_http
+import jw_metrics
+import jw_thumbnails
+from jw_history import HistoryStore
+from jw_archive import ItemStore, archive_channel, head_channel, page_digest, page_name
+from jw_feed_writer import FORMATS as FEED_FORMAT_EXTENSIONS, FeedOutput, rfc822_now, write_feeds, write_rss
 
 try:
-    from webdriver_manager.chrome import ChromeDriverManager
-    USE_WEBDRIVER_MANAGER = True
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
 except ImportError:
-    USE_WEBDRIVER_MANAGER = False
+    HTML_PARSER = 'html.parser'
 
 try:
     from win10toast import ToastNotifier
@@ -53,33 +59,149 @@ def send_notification(title, message, error=False):
 # Configuration
 DATA_DIR = os.environ.get('JW_DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
 OUTPUT_DIR = os.environ.get('JW_OUTPUT_DIR', os.path.dirname(os.path.abspath(__file__)))
-HISTORY_FILE = os.path.join(DATA_DIR, 'history.json')
+HISTORY_FILE = os.path.join(DATA_DIR, 'history.jsonl')
+LEGACY_HISTORY_FILE = os.path.join(DATA_DIR, 'history.json')
+# Optional eviction limits, applied when the history log is compacted
+HISTORY_MAX_ENTRIES = int(os.environ['JW_HISTORY_MAX_ENTRIES']) if os.environ.get('JW_HISTORY_MAX_ENTRIES') else None
+HISTORY_MAX_AGE_DAYS = int(os.environ['JW_HISTORY_MAX_AGE_DAYS']) if os.environ.get('JW_HISTORY_MAX_AGE_DAYS') else None
 OUTPUT_FILE = os.path.join(OUTPUT_DIR, 'jw_feed.xml')
 FEED_URL = os.environ.get('JW_FEED_URL', 'https://camster91.github.io/JW-Newsfeed/jw_feed.xml')
+WHATS_NEW_URL = os.environ.get('JW_WHATS_NEW_URL', 'https://www.jw.org/en/whats-new/')
+# auto: HTTP first, Selenium fallback; http: HTTP only; selenium: browser only
+FETCH_MODE = os.environ.get('JW_FETCH_MODE', 'auto')
+STATE_FILE = os.path.join(DATA_DIR, 'feed_state.json')
+# Comma-separated locales; entries may be given as locale=url for localized page slugs
+LOCALES = os.environ.get('JW_LOCALES', 'en')
+DEFAULT_LOCALE = 'en'
+WHATS_NEW_URL_TEMPLATE = 'https://www.jw.org/{locale}/whats-new/'
+MAX_WORKERS = int(os.environ.get('JW_MAX_WORKERS', '4'))
+# Backfill: older listing pages are {url}{sep}page=N unless overridden
+PAGE_URL_TEMPLATE = os.environ.get('JW_PAGE_URL_TEMPLATE', '{url}{sep}page={page}')
+BACKFILL_MAX_PAGES = int(os.environ.get('JW_BACKFILL_MAX_PAGES', '20'))
+BACKFILL_WORKERS = int(os.environ.get('JW_BACKFILL_WORKERS', '4'))
+# Documents written from each scrape: every format for all items, and for each category alone
+FEED_FORMATS = [f.strip() for f in os.environ.get('JW_FEED_FORMATS', 'rss,atom,json').split(',') if f.strip()]
+FEED_CATEGORIES = [c.strip() for c in os.environ.get('JW_FEED_CATEGORIES', 'Video,Article').split(',') if c.strip()]
+# Archive mode: a bounded head feed plus immutable RFC 5005 archive pages of older items
+ARCHIVE = os.environ.get('JW_ARCHIVE', 'off').lower() in ('1', 'on', 'true', 'yes')
+FEED_HEAD_SIZE = int(os.environ.get('JW_FEED_HEAD_SIZE', '50'))
+ARCHIVE_PAGE_SIZE = int(os.environ.get('JW_ARCHIVE_PAGE_SIZE', '100'))
+ARCHIVE_FORMATS = ('rss', 'atom')  # Formats with RFC 5005 paging links
+# Where the thumbs/ directory is published; defaults to next to the feed
+THUMBNAIL_BASE_URL = os.environ.get('JW_THUMBNAIL_BASE_URL', FEED_URL.rsplit('/', 1)[0] + '/thumbs')
+
+
+def _is_synopsis_class(value):
+    # The strainer may see the raw class attribute ("synopsis lss ...") rather than a list
+    if not value:
+        return False
+    if isinstance(value, str):
+        value = value.split()
+    return 'synopsis' in value
+
+
+SYNOPSIS_STRAINER = SoupStrainer('div', class_=_is_synopsis_class)
+DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+# Dates as localized pages write them: "2 de febrero de 2026", "1er février 2026", "2. Februar 2026"
+LOCALIZED_DATE_PATTERN = re.compile(r'(\d{1,2})(?:er|º)?\.?\s+(?:de\s+)?([^\W\d_]+)\.?,?\s+(?:de\s+)?(\d{4})')
+# Month names in Spanish, Portuguese, French, German, Italian and Dutch
+MONTH_NAMES = {name: number for number, names in enumerate([
+    ('enero', 'janeiro', 'janvier', 'januar', 'gennaio', 'januari'),
+    ('febrero', 'fevereiro', 'février', 'februar', 'febbraio', 'februari'),
+    ('marzo', 'março', 'mars', 'märz', 'maart'),
+    ('abril', 'avril', 'april', 'aprile'),
+    ('mayo', 'maio', 'mai', 'maggio', 'mei'),
+    ('junio', 'junho', 'juin', 'juni', 'giugno'),
+    ('julio', 'julho', 'juillet', 'juli', 'luglio'),
+    ('agosto', 'août', 'august', 'augustus'),
+    ('septiembre', 'setiembre', 'setembro', 'septembre', 'september', 'settembre'),
+    ('octubre', 'outubro', 'octobre', 'oktober', 'ottobre'),
+    ('noviembre', 'novembro', 'novembre', 'november'),
+    ('diciembre', 'dezembro', 'décembre', 'dezember', 'dicembre', 'december'),
+], 1) for name in names}
+
+
+def locale_config(locale, url=None):
+    """Build the URL and file paths for one locale's feed.
+
+    The default locale keeps the original file names; other locales get their
+    own feed, history and state files so their histories never mix.
+    """
+    if locale == DEFAULT_LOCALE:
+        return {
+            'locale': locale,
+            'url': url or WHATS_NEW_URL,
+            'output_file': OUTPUT_FILE,
+            'feed_url': FEED_URL,
+            'history_file': HISTORY_FILE,
+            'legacy_history_file': LEGACY_HISTORY_FILE,
+            'state_file': STATE_FILE,
+            'item_store_file': os.path.join(DATA_DIR, 'feed_items.jsonl'),
+        }
+    return {
+        'locale': locale,
+        'url': url or WHATS_NEW_URL_TEMPLATE.format(locale=locale),
+        'output_file': os.path.join(OUTPUT_DIR, f'jw_feed_{locale}.xml'),
+        'feed_url': FEED_URL.rsplit('/', 1)[0] + f'/jw_feed_{locale}.xml',
+        'history_file': os.path.join(DATA_DIR, f'history_{locale}.jsonl'),
+        'legacy_history_file': None,
+        'state_file': os.path.join(DATA_DIR, f'feed_state_{locale}.json'),
+        'item_store_file': os.path.join(DATA_DIR, f'feed_items_{locale}.jsonl'),
+    }
+
+
+def parse_locales(spec):
+    """Parse "en,es=https://...,fr" into locale configs."""
+    configs = []
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        locale, _, url = entry.partition('=')
+        configs.append(locale_config(locale.strip(), url.strip() or None))
+    return configs
+
+
+def load_history(history_file=None, legacy_history_file=LEGACY_HISTORY_FILE):
+    """Open the history store, migrating the old history.json on first use."""
+    return HistoryStore(
+        history_file or HISTORY_FILE,
+        legacy_path=legacy_history_file,
+        max_entries=HISTORY_MAX_ENTRIES,
+        max_age_days=HISTORY_MAX_AGE_DAYS,
+    )
 
 
-def load_history():
-    """Load previously processed items from history file."""
+def save_history(history):
+    """Append newly seen items to the history log."""
+    history.flush()
+
+
+def load_feed_state(state_file=None):
+    """Load HTTP validators and the item hash recorded by the last feed update."""
     try:
-        with open(HISTORY_FILE) as f:
+        with open(state_file or STATE_FILE) as f:
             data = json.load(f)
-            if isinstance(data, list):
-                return set(data)
-            elif isinstance(data, dict):
-                return set(data.keys())
-            return set()
+            return data if isinstance(data, dict) else {}
     except (FileNotFoundError, json.JSONDecodeError):
-        return set()
+        return {}
 
 
-def save_history(history):
-    """Save processed items to history file."""
-    with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-        json.dump(list(history), f, ensure_ascii=False, indent=4)
+def save_feed_state(state, state_file=None):
+    """Save HTTP validators and the item hash for the next run."""
+    with open(state_file or STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=4, sort_keys=True)
+
+
+def hash_items(items):
+    """Hash the feed-visible fields of the parsed items, in order."""
+    fields = ('title', 'link', 'image', 'thumbnails', 'category', 'description', 'pub_date')
+    payload = json.dumps([[item.get(k) for k in fields] for item in items], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
 
 
 def parse_date(date_str):
-    """Parse date string to RFC 822 format. Returns None if parsing fails."""
+    """Parse date string (English or a localized month name) to RFC 822 format. Returns None if parsing fails."""
     formats = ['%Y-%m-%d', '%B %d, %Y', '%b %d, %Y', '%d %B %Y', '%d %b %Y']
     text = date_str.strip()
     for fmt in formats:
@@ -88,25 +210,103 @@ def parse_date(date_str):
             return dt.strftime('%a, %d %b %Y 12:00:00 +0000')
         except ValueError:
             continue
+    match = LOCALIZED_DATE_PATTERN.search(text.lower())
+    if match and match.group(2) in MONTH_NAMES:
+        try:
+            dt = datetime.datetime(int(match.group(3)), MONTH_NAMES[match.group(2)], int(match.group(1)))
+        except ValueError:
+            return None
+        return dt.strftime('%a, %d %b %Y 12:00:00 +0000')
     return None
 
 
-def scrape_whats_new(driver, history):
-    """Scrape the What's New page from JW.ORG. Returns items in release order."""
-    items_list = []
-    new_count = 0
+def start_browser():
+    """Start a headless Chrome session. Returns None if the browser fails to start."""
+    # Selenium is imported lazily so HTTP-only runs never pay its import cost
+    from selenium.common.exceptions import WebDriverException
+    import jw_browser
 
-    driver.get('https://www.jw.org/en/whats-new/')
+    try:
+        return jw_browser.create_driver()
+    except WebDriverException as e:
+        print(f"Error initializing browser: {e}")
+        send_notification("JW-Newsfeed Error", f"Browser error: {str(e)[:100]}", error=True)
+        return None
+
+
+def fetch_whats_new_http(session=None, validators=None, url=None, max_age=None):
+    """Fetch the What's New page HTML over plain HTTP.
+
+    Sends the stored ETag/Last-Modified validators and returns (html, validators);
+    html is None when the server reports the page has not been modified.
+    max_age caps the age in seconds of a response served from the response
+    cache; 0 always asks the origin.
+    """
+    html, validators = jw_http.fetch_text_conditional(url or WHATS_NEW_URL, validators, session=session,
+                                                      ttl=max_age)
+    if html is not None and 'synopsis' not in html:
+        raise ValueError("What's New page returned no synopsis entries")
+    return html, validators
+
+
+def fetch_whats_new_selenium(driver, url=None):
+    """Load the What's New page in a browser and return the rendered HTML."""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    import jw_browser
+
+    driver.get(url or WHATS_NEW_URL)
     WebDriverWait(driver, 60).until(
         EC.presence_of_element_located((By.CLASS_NAME, "synopsis"))
     )
+    jw_browser.record_page_stats(driver)
+    return driver.page_source
+
 
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
+def scrape_whats_new(driver, history, url=None):
+    """Scrape the What's New page from JW.ORG. Returns items in release order."""
+    return parse_whats_new(fetch_whats_new_selenium(driver, url), history)
+
+
+def _scan_synopsis(article):
+    """Collect the elements feed items need from one synopsis in a single walk."""
+    found = {}
+    date_match = None
+    for node in article.descendants:
+        name = getattr(node, 'name', None)
+        if name is None:
+            # Text node: look for a YYYY-MM-DD date until one is found
+            if date_match is None:
+                date_match = DATE_PATTERN.search(node)
+            continue
+        if name in ('a', 'h3', 'h2', 'img') and name not in found:
+            found[name] = node
+        elif name == 'p' and 'p' not in found and 'contextTtl' in node.get('class', ()):
+            found['p'] = node
+        elif name == 'p' and 'date' not in found and 'pubDate' in node.get('class', ()):
+            found['date'] = node
+        elif name == 'span' and 'span' not in found and 'syn-img-overlay-text' in node.get('class', ()):
+            found['span'] = node
+    return found, date_match
+
+
+def parse_whats_new_items(html):
+    """Parse What's New page HTML (str or bytes) into item records in release order.
+
+    Only the synopsis subtrees are built, using lxml when it is installed.
+    """
+    items_list = []
+    seen = set()
+
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=SYNOPSIS_STRAINER)
 
-    for article in soup.find_all("div", {"class": "synopsis"}):
+    for article in soup.find_all("div", {"class": "synopsis"}, recursive=False):
         try:
-            link_elem = article.find('a')
-            if not link_elem:
+            found, date_match = _scan_synopsis(article)
+
+            link_elem = found.get('a')
+            if link_elem is None:
                 continue
 
             href = link_elem.get('href', '')
@@ -116,54 +316,46 @@ def scrape_whats_new(driver, history):
                 href = 'https://www.jw.org' + href
 
             # Skip duplicates within this scrape
-            if href in [item['link'] for item in items_list]:
+            if href in seen:
                 continue
 
             # Get title
-            title_elem = article.find('h3')
-            if not title_elem:
-                title_elem = article.find('h2')
-            title = title_elem.text.strip() if title_elem else ''
+            title_elem = found.get('h3') or found.get('h2')
+            title = title_elem.get_text().strip() if title_elem is not None else ''
             if not title:
                 continue
 
             # Get image
-            img_elem = article.find('img')
+            img_elem = found.get('img')
             image = ''
-            if img_elem:
+            if img_elem is not None:
                 image = img_elem.get('src', '') or img_elem.get('data-src', '')
 
-            # Get date - try contextTtl first, then search all text
+            # Get date - try contextTtl and pubDate (possibly localized), then the synopsis'
+            # machine-readable data-date, then any YYYY-MM-DD in the article text
             pub_date = None
-            date_elem = article.find('p', class_='contextTtl')
-            if date_elem:
-                pub_date = parse_date(date_elem.text.strip())
-            if not pub_date:
-                # Search for YYYY-MM-DD pattern anywhere in the article element
-                all_text = article.get_text()
-                date_match = re.search(r'\d{4}-\d{2}-\d{2}', all_text)
-                if date_match:
-                    pub_date = parse_date(date_match.group(0))
+            for date_elem in (found.get('p'), found.get('date')):
+                if not pub_date and date_elem is not None:
+                    pub_date = parse_date(date_elem.get_text())
+            if not pub_date and article.get('data-date'):
+                pub_date = parse_date(article['data-date'][:10])
+            if not pub_date and date_match:
+                pub_date = parse_date(date_match.group(0))
 
             # Detect if it's a video (has hasDuration class)
-            classes = article.get('class', [])
-            is_video = 'hasDuration' in classes
+            is_video = 'hasDuration' in article.get('class', ())
             category = 'Video' if is_video else 'Article'
 
             # Generate description
             if is_video:
                 # Get duration if available
-                duration_elem = article.find('span', class_='syn-img-overlay-text')
-                duration = duration_elem.text.strip() if duration_elem else ''
+                duration_elem = found.get('span')
+                duration = duration_elem.get_text().strip() if duration_elem is not None else ''
                 description = f"Video{' (' + duration + ')' if duration else ''}: {title}"
             else:
                 description = title
 
-            is_new = href not in history
-            if is_new:
-                history.add(href)
-                new_count += 1
-
+            seen.add(href)
             items_list.append({
                 'title': title,
                 'link': href,
@@ -171,111 +363,445 @@ def scrape_whats_new(driver, history):
                 'category': category,
                 'description': description,
                 'pub_date': pub_date,
-                'is_new': is_new
             })
         except (KeyError, AttributeError):
             continue
 
-    return items_list, new_count
-
-
-def generate_rss_feed(items):
-    """Generate RSS 2.0 feed from scraped content."""
-    rss = ET.Element('rss', version='2.0')
-    rss.set('xmlns:media', 'http://search.yahoo.com/mrss/')
-    rss.set('xmlns:atom', 'http://www.w3.org/2005/Atom')
+    return items_list
 
-    channel = ET.SubElement(rss, 'channel')
 
-    ET.SubElement(channel, 'title').text = "JW.ORG What's New"
-    ET.SubElement(channel, 'link').text = 'https://www.jw.org/en/whats-new/'
-    ET.SubElement(channel, 'description').text = 'Latest updates from JW.ORG'
-    ET.SubElement(channel, 'language').text = 'en'
-    ET.SubElement(channel, 'lastBuildDate').text = datetime.datetime.now(datetime.UTC).strftime('%a, %d %b %Y %H:%M:%S +0000')
-
-    atom_link = ET.SubElement(channel, '{http://www.w3.org/2005/Atom}link')
-    atom_link.set('href', FEED_URL)
-    atom_link.set('rel', 'self')
-    atom_link.set('type', 'application/rss+xml')
-
-    for item_data in items:
-        item = ET.SubElement(channel, 'item')
-
-        ET.SubElement(item, 'title').text = item_data.get('title', '')
-        ET.SubElement(item, 'link').text = item_data.get('link', '')
-        ET.SubElement(item, 'guid', isPermaLink='true').text = item_data.get('link', '')
-        ET.SubElement(item, 'category').text = item_data.get('category', 'Update')
-        ET.SubElement(item, 'description').text = item_data.get('description', '')
-
-        pub_date = item_data.get('pub_date') or datetime.datetime.now(datetime.UTC).strftime('%a, %d %b %Y %H:%M:%S +0000')
-        ET.SubElement(item, 'pubDate').text = pub_date
-
-        if item_data.get('image'):
-            media_thumb = ET.SubElement(item, '{http://search.yahoo.com/mrss/}thumbnail')
-            media_thumb.set('url', item_data['image'])
-
-    return rss
-
-
-def prettify_xml(elem):
-    """Return a pretty-printed XML string."""
-    rough_string = ET.tostring(elem, encoding='unicode')
-    reparsed = minidom.parseString(rough_string)
-    return reparsed.toprettyxml(indent='  ')
-
-
-def main():
-    """Main function to scrape JW.ORG and generate RSS feed."""
-    print("Starting JW.ORG RSS Feed Generator...")
-
-    history = load_history()
-    print(f"Loaded {len(history)} previously processed items")
-
-    driver = None
-    try:
-        if USE_WEBDRIVER_MANAGER:
-            driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()))
+def parse_whats_new(html, history):
+    """Parse What's New page HTML into feed items and mark which are new to history."""
+    items = parse_whats_new_items(html)
+    new_count = 0
+    for item in items:
+        item['is_new'] = history.add(item['link'], item['title'])
+        if item['is_new']:
+            new_count += 1
+    return items, new_count
+
+
+def whats_new_page_url(url, page):
+    """URL of a What's New listing page; page 1 is the base URL."""
+    if page == 1:
+        return url
+    return PAGE_URL_TEMPLATE.format(url=url, page=page, sep='&' if '?' in url else '?')
+
+
+def backfill_whats_new(url, history, items, session=None, max_pages=BACKFILL_MAX_PAGES,
+                       workers=BACKFILL_WORKERS, log=print):
+    """Walk older What's New pages until one holds a URL already in history.
+
+    items is the parsed first page. Pages 2..max_pages are fetched
+    concurrently, at most workers at a time, and their items appended in page
+    order. Returns (items, new_count, pages_read) for the added pages.
+    """
+    seen = {item['link'] for item in items}
+    new_count, pages_read = 0, 1
+    if not items or not all(item['is_new'] for item in items):
+        return items, new_count, pages_read
+
+    def fetch(page):
+        return jw_http.fetch_text(whats_new_page_url(url, page), session=session)
+
+    page = 2
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while page <= max_pages:
+            batch = list(range(page, min(page + workers, max_pages + 1)))
+            futures = [pool.submit(fetch, p) for p in batch]
+            for p, future in zip(batch, futures):
+                try:
+                    html = future.result()
+                except requests.RequestException as e:
+                    log(f"Backfill stopped at page {p}: {e}")
+                    return items, new_count, pages_read
+
+                # Parse in page order on this thread; history is not thread-safe
+                page_items = [i for i in parse_whats_new_items(html) if i['link'] not in seen]
+                pages_read = p
+                if not page_items:
+                    # Past the last page, or the site ignored the page parameter
+                    return items, new_count, pages_read
+                reached_known = False
+                for item in page_items:
+                    item['is_new'] = history.add(item['link'], item['title'])
+                    if item['is_new']:
+                        new_count += 1
+                    else:
+                        reached_known = True
+                    seen.add(item['link'])
+                items.extend(page_items)
+                if reached_known:
+                    return items, new_count, pages_read
+            page = batch[-1] + 1
+
+    log(f"Backfill reached the page limit ({max_pages}) before any known item")
+    return items, new_count, pages_read
+
+
+def feed_channel(locale=DEFAULT_LOCALE, link=None, feed_url=None, category=None):
+    """Channel metadata for a locale's feed, or for its single-category feed."""
+    title = "JW.ORG What's New" if locale == DEFAULT_LOCALE else f"JW.ORG What's New ({locale})"
+    return {
+        'title': f'{title}: {category}' if category else title,
+        'link': link or WHATS_NEW_URL_TEMPLATE.format(locale=locale),
+        'description': 'Latest updates from JW.ORG',
+        'language': locale,
+        'self_url': feed_url or FEED_URL,
+    }
+
+
+def generate_rss_feed(items, output_file=None, locale=DEFAULT_LOCALE, link=None, feed_url=None):
+    """Write the RSS 2.0 feed for the scraped content. Returns the item count."""
+    return write_rss(output_file or OUTPUT_FILE, feed_channel(locale, link, feed_url), items)
+
+
+def feed_outputs(config, formats=None, categories=None, archive=None):
+    """Every document written for one locale's scrape.
+
+    The RSS feed for all items keeps the locale's output file name; other
+    formats swap the extension, and category feeds add the category to the
+    name (jw_feed.atom, jw_feed_video.xml, ...). With archive pages (as
+    returned by update_archive), the all-items feeds link to the newest one.
+    """
+    formats = FEED_FORMATS if formats is None else formats
+    categories = FEED_CATEGORIES if categories is None else categories
+    path_stem = os.path.splitext(config['output_file'])[0]
+    url_stem = os.path.splitext(config['feed_url'])[0]
+    outputs = []
+    for category in [None] + list(categories):
+        suffix = f'_{category.lower()}' if category else ''
+        for fmt in formats:
+            ext = FEED_FORMAT_EXTENSIONS[fmt]
+            channel = feed_channel(config['locale'], config['url'], url_stem + suffix + ext, category)
+            if category is None and archive and archive.get(fmt):
+                channel = head_channel(channel, archive_url(config, archive[fmt][-1]))
+            outputs.append(FeedOutput(path_stem + suffix + ext, fmt, channel, category))
+    return outputs
+
+
+def archive_url(config, name):
+    """Published URL of an archive page, next to the locale's feed."""
+    return config['feed_url'].rsplit('/', 1)[0] + '/' + name
+
+
+def update_archive(config, items, archive=None, head_size=FEED_HEAD_SIZE, page_size=ARCHIVE_PAGE_SIZE):
+    """Add the scraped items to the locale's item store and seal archive pages that filled up.
+
+    archive is the previous run's page record: the page size and, for each
+    archived format, page file names oldest first. Only newly filled pages
+    are written. Returns (head items, updated record, paths of pages written).
+    """
+    store = ItemStore(config['item_store_file'])
+    store.update(items)
+    store.flush()
+
+    archive = dict(archive or {})
+    page_size = archive.setdefault('page_size', page_size)  # Pages already sealed fix the size
+    directory = os.path.dirname(config['output_file'])
+    stem, _ = os.path.splitext(os.path.basename(config['output_file']))
+    written, sealed = [], None
+    for fmt in (f for f in FEED_FORMATS if f in ARCHIVE_FORMATS):
+        ext = FEED_FORMAT_EXTENSIONS[fmt]
+        names = archive[fmt] = list(archive.get(fmt, []))
+        head_url = os.path.splitext(config['feed_url'])[0] + ext
+        while (len(names) + 1) * page_size <= len(store):
+            start = len(names) * page_size
+            page_items = list(store.items(start, start + page_size))
+            prev_url = archive_url(config, names[-1]) if names else None
+            name = page_name(stem, len(names) + 1, page_digest(fmt, hash_items(page_items), prev_url), ext)
+            channel = archive_channel(feed_channel(config['locale'], config['url']), archive_url(config, name),
+                                      prev_url, head_url, page_items[0].get('pub_date') or rfc822_now())
+            path = os.path.join(directory, name)
+            write_feeds([FeedOutput(path, fmt, channel)], page_items)
+            names.append(name)
+            written.append(path)
+        sealed = len(names) if sealed is None else min(sealed, len(names))
+
+    # The head always carries every item not yet sealed into a page
+    unsealed = len(store) - sealed * page_size if sealed is not None else 0
+    head = store.newest(max(head_size, unsealed))
+    return head, archive, written
+
+
+def output_hash(output, items):
+    """Hash of everything an output document is rendered from, to skip rewriting it unchanged."""
+    channel = json.dumps(output.channel, sort_keys=True, ensure_ascii=False)
+    items_hash = hash_items([item for item in items if output.wants(item)])
+    return hashlib.sha256(f'{output.format}\n{channel}\n{items_hash}'.encode('utf-8')).hexdigest()
+
+
+def update_feed(config, session=None, log=print, backfill_pages=0, archive=ARCHIVE, history=None, browser=None,
+                max_age=None):
+    """Fetch, parse and write one locale's feeds.
+
+    With backfill_pages set, older listing pages are walked (up to that many)
+    until one contains an item already in history. With archive set, the
+    feeds carry a bounded head and older items go to archive pages (see
+    update_archive). A long-running caller can pass the locale's history
+    store, kept loaded between runs, and browser, a driver pool (acquire and
+    release) whose Chrome session is reused instead of starting one per
+    fallback, and max_age=0 so every poll reaches jw.org rather than the
+    response cache. Every document from feed_outputs() is rendered from the one
+    scrape, and those whose inputs are unchanged are skipped. Returns a
+    result dict with the locale, a status
+    (updated, not_modified, unchanged or error), item counts, the feed files
+    and per-stage timings in seconds.
+    """
+    result = {'locale': config['locale'], 'status': 'error', 'items': 0, 'new': 0, 'timings': {}}
+    timings = result['timings']
+    locale = config['locale']
+    started = time.perf_counter()
+    output_file = config['output_file']
+
+    state = load_feed_state(config['state_file'])
+
+    html, validators = None, {}
+    if FETCH_MODE in ('auto', 'http'):
+        try:
+            log("Fetching What's New page over HTTP...")
+            # Only trust a 304 if the feed it would have produced is still on disk
+            known = state if os.path.exists(output_file) else None
+            with jw_metrics.span('fetch', locale=locale) as span:
+                html, validators = fetch_whats_new_http(session, validators=known, url=config['url'],
+                                                        max_age=max_age)
+            timings['fetch'] = span.elapsed
+            if html is None:
+                log("What's New not modified since last run. Feed not updated.")
+                jw_metrics.count('not_modified')
+                result['status'] = 'not_modified'
+                timings['total'] = time.perf_counter() - started
+                return result
+        except (requests.RequestException, ValueError) as e:
+            log(f"HTTP fetch failed: {e}")
+            jw_metrics.count('fetch_errors')
+            response = getattr(e, 'response', None)
+            if response is not None and response.status_code == 404 and locale != DEFAULT_LOCALE:
+                log(f"jw.org may use a localized path for {locale}; pass its What's New URL as "
+                    f"--locales {locale}=<url>")
+            if FETCH_MODE == 'http':
+                send_notification("JW-Newsfeed Error", f"HTTP fetch failed: {str(e)[:100]}", error=True)
+                return result
+
+    if history is None:
+        with jw_metrics.span('history_load', locale=locale) as span:
+            history = load_history(config['history_file'], config['legacy_history_file'])
+        timings['history_load'] = span.elapsed
+    log(f"Loaded {len(history)} previously processed items")
+
+    items, new_count = None, 0
+    if html is not None:
+        with jw_metrics.span('parse', profile=True, locale=locale) as span:
+            items, new_count = parse_whats_new(html, history)
+        timings['parse'] = span.elapsed
+        log(f"Found {len(items)} items ({new_count} new)")
+        if not items and FETCH_MODE == 'auto':
+            items, validators = None, {}
+        elif backfill_pages > 1:
+            with jw_metrics.span('backfill', locale=locale) as span:
+                items, older_new, pages = backfill_whats_new(config['url'], history, items, session,
+                                                             max_pages=backfill_pages, log=log)
+            new_count += older_new
+            timings['backfill'] = span.elapsed
+            jw_metrics.count('pages_backfilled', max(0, pages - 1))
+            if pages > 1:
+                log(f"Backfilled {pages - 1} older pages ({older_new} new items)")
+
+    if items is None:
+        stage = time.perf_counter()
+        if browser is not None:
+            try:
+                driver = browser.acquire()
+            except RuntimeError as e:
+                log(f"ERROR: {e}")
+                return result
         else:
-            driver = webdriver.Chrome()
-        driver.minimize_window()
-    except WebDriverException as e:
-        print(f"Error initializing browser: {e}")
-        send_notification("JW-Newsfeed Error", f"Browser error: {str(e)[:100]}", error=True)
-        return
-
-    try:
-        print("Scraping What's New page...")
-        items, new_count = scrape_whats_new(driver, history)
-        print(f"Found {len(items)} items ({new_count} new)")
-
-    except Exception as e:
-        print(f"ERROR: Scraping failed: {e}")
-        send_notification("JW-Newsfeed Error", f"Scraping failed: {str(e)[:100]}", error=True)
-        if driver:
-            driver.quit()
-        return
+            log("Starting browser...")
+            with jw_metrics.span('driver_start', locale=locale) as span:
+                driver = start_browser()
+            timings['driver_start'] = span.elapsed
+            if driver is None:
+                return result
 
-    finally:
-        if driver:
-            driver.quit()
+        try:
+            log("Scraping What's New page...")
+            with jw_metrics.span('page_load', locale=locale) as span:
+                html = fetch_whats_new_selenium(driver, config['url'])
+            timings['page_load'] = span.elapsed
+            with jw_metrics.span('parse', profile=True, locale=locale) as span:
+                items, new_count = parse_whats_new(html, history)
+            timings['parse'] = span.elapsed
+            log(f"Found {len(items)} items ({new_count} new)")
+
+        except Exception as e:
+            log(f"ERROR: Scraping failed: {e}")
+            send_notification("JW-Newsfeed Error", f"Scraping failed: {str(e)[:100]}", error=True)
+            return result
+
+        finally:
+            if browser is not None:
+                browser.release(driver)
+            else:
+                driver.quit()
+            timings['browser'] = time.perf_counter() - stage
 
     if not items:
-        print("ERROR: No items found! Feed not updated.")
+        log("ERROR: No items found! Feed not updated.")
         send_notification("JW-Newsfeed Error", "No items found! Feed not updated.", error=True)
-        return
-
-    save_history(history)
-
-    print("Generating RSS feed...")
-    rss = generate_rss_feed(items)
-
-    xml_content = prettify_xml(rss)
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        f.write(xml_content)
+        return result
+
+    result['items'], result['new'] = len(items), new_count
+    jw_metrics.count('items_parsed', len(items))
+    jw_metrics.count('new_items', new_count)
+    if jw_thumbnails.THUMBNAILS_ENABLED:
+        thumbnails = jw_thumbnails.get_store(THUMBNAIL_BASE_URL)
+        with jw_metrics.span('thumbnails', locale=locale) as span:
+            fetched = thumbnails.attach(items, session)
+            # Writes the index only when images were added or pruned
+            thumbnails.save()
+        timings['thumbnails'] = span.elapsed
+        if fetched:
+            log(f"Fetched {fetched} new thumbnail images")
+
+    pages, written = state.get('archive'), []
+    if archive:
+        with jw_metrics.span('archive', locale=locale) as span:
+            items, pages, written = update_archive(config, items, pages)
+        timings['archive'] = span.elapsed
+        jw_metrics.count('archive_pages_written', len(written))
+        if written:
+            log(f"Sealed {len(written)} archive pages")
+
+    # Render only the documents whose items or channel changed since the last run
+    outputs = feed_outputs(config, archive=pages if archive else None)
+    result['files'] = [output.path for output in outputs]
+    if archive:
+        directory = os.path.dirname(config['output_file'])
+        result['files'] += [os.path.join(directory, name)
+                            for fmt in ARCHIVE_FORMATS for name in pages.get(fmt, [])]
+    previous, hashes, stale = state.get('outputs', {}), {}, []
+    for output in outputs:
+        name = os.path.basename(output.path)
+        hashes[name] = output_hash(output, items)
+        if previous.get(name) != hashes[name] or not os.path.exists(output.path):
+            stale.append(output)
+    if not stale and not written:
+        log("Items unchanged since last run. Feeds not updated.")
+        result['status'] = 'unchanged'
+        if validators and any(validators.get(k) != state.get(k) for k in ('etag', 'last_modified')):
+            # The page was re-served with new validators; keep them so the next run can get a 304
+            save_feed_state(dict(state, **validators), config['state_file'])
+            result['state_saved'] = True
+        timings['total'] = time.perf_counter() - started
+        return result
+
+    stage = time.perf_counter()
+    with jw_metrics.span('history_save', locale=locale) as span:
+        save_history(history)
+    timings['history_save'] = span.elapsed
+
+    log(f"Rendering {len(stale)} of {len(outputs)} feeds...")
+    with jw_metrics.span('serialize', profile=True, locale=locale) as span:
+        write_feeds(stale, items)
+    timings['serialize'] = span.elapsed
+    jw_metrics.count('feeds_written', len(stale))
+
+    state = dict(validators, outputs=hashes)
+    if archive:
+        state['archive'] = pages
+    save_feed_state(state, config['state_file'])
+    timings['write'] = time.perf_counter() - stage
+
+    log(f"Feeds saved: {', '.join(os.path.basename(output.path) for output in stale)}")
+    log(f"Total items in feed: {len(items)}")
+    log(f"New items: {new_count}")
+    result['status'] = 'updated'
+    timings['total'] = time.perf_counter() - started
+    return result
+
+
+def update_feeds(configs, workers=MAX_WORKERS, backfill_pages=0, archive=ARCHIVE):
+    """Update several locales' feeds concurrently over one pooled session."""
+    session = jw_http.get_session()
+
+    def run(config):
+        prefix = f"[{config['locale']}] "
+        return update_feed(config, session, log=lambda message: print(prefix + message),
+                           backfill_pages=backfill_pages, archive=archive)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(configs)))) as pool:
+        return list(pool.map(run, configs))
+
+
+def print_timings(results):
+    """Print a per-locale summary of status, counts and stage timings."""
+    print(f"{'locale':<8} {'status':<13} {'items':>5} {'new':>4} {'fetch s':>8} {'parse s':>8} {'write s':>8} {'total s':>8}")
+    for r in results:
+        t = r['timings']
+        cols = ''.join(f" {t[k]:>8.3f}" if k in t else f" {'-':>8}" for k in ('fetch', 'parse', 'write', 'total'))
+        print(f"{r['locale']:<8} {r['status']:<13} {r['items']:>5} {r['new']:>4}{cols}")
+
+
+def finish_metrics(run, results):
+    """Write the run's metrics, marking it failed if any locale errored."""
+    run.gauge('locales', len(results))
+    record = run.finish('error' if any(r['status'] == 'error' for r in results) else 'ok')
+    if 'profile' in record:
+        print(run.profile_summary())
+        print(f"Profile written to: {record['profile']}")
+
+
+def main(argv=None):
+    """Main function to scrape JW.ORG and generate RSS feed."""
+    parser = argparse.ArgumentParser(description="Generate RSS feeds from JW.ORG What's New.")
+    parser.add_argument('--locales', default=LOCALES,
+                        help='comma-separated locales, optionally locale=url (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS,
+                        help='locales fetched concurrently (default: %(default)s)')
+    parser.add_argument('--backfill', action='store_true',
+                        help='walk older What\'s New pages until reaching items already in history')
+    parser.add_argument('--max-pages', type=int, default=BACKFILL_MAX_PAGES,
+                        help='page limit for --backfill (default: %(default)s)')
+    parser.add_argument('--archive', action='store_true', default=ARCHIVE,
+                        help='keep a bounded head feed and page older items into RFC 5005 archive pages')
+    parser.add_argument('--daemon', action='store_true',
+                        help='keep running, polling with an adaptive interval (see jw_watch.py)')
+    parser.add_argument('--min-interval', type=float,
+                        help='daemon: seconds between polls after a change (default: JW_POLL_MIN or 60)')
+    parser.add_argument('--max-interval', type=float,
+                        help='daemon: longest wait while nothing changes (default: JW_POLL_MAX or 3600)')
+    parser.add_argument('--publish', action='store_true',
+                        help='daemon: commit and push the feeds whenever new items appear')
+    parser.add_argument('--no-push', action='store_true', help='daemon: with --publish, commit without pushing')
+    parser.add_argument('--health-port', type=int,
+                        help='daemon: port of the /health and /status endpoint (default: JW_HEALTH_PORT or 8889)')
+    parser.add_argument('--profile', action='store_true',
+                        help='profile the parse and serialize stages with cProfile')
+    parser.add_argument('--http-cache', choices=jw_http.CACHE_MODES,
+                        help='response cache mode; replay runs offline from recorded responses')
+    args = parser.parse_args(argv)
+    if args.http_cache:
+        jw_http.configure_cache(args.http_cache)
 
-    print(f"RSS feed saved to: {OUTPUT_FILE}")
-    print(f"Total items in feed: {len(items)}")
-    print(f"New items: {new_count}")
+    print("Starting JW.ORG RSS Feed Generator...")
+    configs = parse_locales(args.locales)
+    backfill_pages = args.max_pages if args.backfill else 0
+    if args.daemon:
+        import jw_watch
+        return jw_watch.run_daemon(configs, args.min_interval, args.max_interval, args.publish,
+                                   not args.no_push, args.health_port, backfill_pages, args.archive)
+
+    run = jw_metrics.start_run('news_parser', profile=args.profile)
+
+    if len(configs) == 1:
+        results = update_feed(configs[0], backfill_pages=backfill_pages, archive=args.archive)
+        finish_metrics(run, [results])
+        return results
+
+    results = update_feeds(configs, args.workers, backfill_pages, args.archive)
+    print_timings(results)
+    finish_metrics(run, results)
+    return results
 
 
 if __name__ == '__main__':
@@ -0,0 +1,287 @@
+"""
+Bible Reading Plan
+
+Compiles the reading schedule in "book numbers.txt" (one [book number, book
+name, first chapter, last chapter] list per reading) into an in-memory index
+with one entry per day of the year. Lookups by date are a list index, a range
+such as the next 30 days is a slice, and WOL links are built from the book and
+chapter numbers. Passages are grouped into days exactly as in the published
+schedule, bible.txt ("Obadiah/Jonah" is one day's reading), and the plan is
+checked against it. Days after the last reading (December 31, and December 30
+of a common year) are catch-up days, so every date has an entry.
+
+A whole year can be exported as an iCalendar file and an RSS feed in one pass.
+"""
+
+import ast
+import datetime
+import functools
+import os
+import re
+import uuid
+from typing import NamedTuple
+
+from jw_feed_writer import atomic_write, write_rss
+
+# Configuration - use environment variables or defaults
+DATA_DIR = os.environ.get('JW_DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+PLAN_FILE = os.environ.get('JW_READING_PLAN_FILE', os.path.join(DATA_DIR, 'book numbers.txt'))
+SCHEDULE_FILE = os.environ.get('JW_READING_SCHEDULE_FILE', os.path.join(DATA_DIR, 'bible.txt'))
+WOL_BIBLE_URL_TEMPLATE = os.environ.get(
+    'JW_WOL_BIBLE_URL', 'https://wol.jw.org/en/wol/b/r1/lp-e/nwtsty/{book}/{chapter}')
+
+CHAPTER_PATTERN = re.compile(r'\d+(?::\d+)?')
+
+# Title of the days after the last reading; the published schedule ends with it
+CATCH_UP_TITLE = 'Finished!'
+
+# Chapters per book, Genesis (1) to Revelation (66)
+BOOK_CHAPTERS = (
+    50, 40, 27, 36, 34, 24, 21, 4, 31, 24, 22, 25, 29, 36, 10, 13, 10, 42, 150, 31, 12, 8,
+    66, 52, 5, 48, 12, 14, 3, 9, 1, 4, 7, 3, 3, 3, 2, 14, 4,
+    28, 16, 24, 21, 28, 16, 16, 13, 6, 6, 4, 4, 5, 3, 6, 4, 3, 1, 13, 5, 5, 3, 5, 1, 1, 1, 22,
+)
+
+# Stable namespace for calendar event UIDs, so re-imported exports update rather than duplicate
+UID_NAMESPACE = uuid.UUID('6f1c2a1e-3b7d-4c55-9a0e-5d8f1b2c7e41')
+
+
+class Passage(NamedTuple):
+    """Chapters first to last of a book; either end may be "chapter:verse"."""
+
+    book: int
+    name: str
+    first: str
+    last: str
+
+    @property
+    def label(self):
+        if self.first == self.last:
+            return f'{self.name} {self.first}'
+        return f'{self.name} {self.first}-{self.last}'
+
+    @property
+    def first_chapter(self):
+        return int(self.first.split(':')[0])
+
+    @property
+    def last_chapter(self):
+        if ':' in self.first and ':' not in self.last:
+            return self.first_chapter  # "119:64-176" ends at a verse of the same chapter
+        return int(self.last.split(':')[0])
+
+    @property
+    def whole_book(self):
+        return self.first == '1' and self.last_chapter == BOOK_CHAPTERS[self.book - 1]
+
+    @property
+    def url(self):
+        url = WOL_BIBLE_URL_TEMPLATE.format(book=self.book, chapter=self.first_chapter)
+        if ':' in self.first:
+            url += '#s=' + self.first.split(':')[1]  # Scroll to the starting verse
+        return url
+
+    @property
+    def chapters(self):
+        return self.last_chapter - self.first_chapter + 1
+
+
+class Reading(NamedTuple):
+    """One day's reading: one passage, several short ones read together, or none on a catch-up day."""
+
+    passages: tuple
+
+    @property
+    def title(self):
+        return ' / '.join(p.label for p in self.passages) or CATCH_UP_TITLE
+
+    @property
+    def url(self):
+        if not self.passages:
+            return WOL_BIBLE_URL_TEMPLATE.split('/{book}')[0]
+        return self.passages[0].url
+
+    @property
+    def chapters(self):
+        return sum(p.chapters for p in self.passages)
+
+
+def parse_plan_line(line):
+    """Parse one "[1, 'Genesis', '1', '3']" line into (book, name, first, last or None).
+
+    Multi-word names may be split across items ("1", "Samuel"), so the
+    chapters are the trailing numeric items after the last word.
+    """
+    values = ast.literal_eval(line.strip())
+    book, rest = int(values[0]), [str(v) for v in values[1:]]
+    split = len(rest)
+    while split > 1 and CHAPTER_PATTERN.fullmatch(rest[split - 1]):
+        split -= 1
+    name = ' '.join(rest[:split])
+    chapters = rest[split:] or ['1']
+    return book, name, chapters[0], chapters[-1] if len(chapters) > 1 else None
+
+
+def load_passages(path=PLAN_FILE):
+    """Read the plan file into Passages in reading order."""
+    with open(path, encoding='utf-8') as f:
+        rows = [parse_plan_line(line) for line in f if line.strip()]
+    passages = []
+    for i, (book, name, first, last) in enumerate(rows):
+        if last is None:
+            # A lone chapter number covers the rest of the book when the next reading starts a new one
+            next_book = rows[i + 1][0] if i + 1 < len(rows) else None
+            last = str(BOOK_CHAPTERS[book - 1]) if next_book != book and ':' not in first else first
+        passages.append(Passage(book, name, first, last))
+    return passages
+
+
+def load_schedule(path=SCHEDULE_FILE):
+    """Day titles of the published schedule in order, without the closing catch-up line."""
+    with open(path, encoding='utf-8') as f:
+        titles = [line.strip() for line in f if line.strip()]
+    while titles and titles[-1] == CATCH_UP_TITLE:
+        titles.pop()
+    return titles
+
+
+def _same_book(title, name):
+    return title.lower().startswith(name.lower().rstrip('s'))
+
+
+def group_passages(passages, titles):
+    """Group passages into one reading per schedule title ("Nahum/Habakkuk" takes two).
+
+    Raises ValueError if the plan and the schedule disagree.
+    """
+    readings, position = [], 0
+    for day, title in enumerate(titles, 1):
+        parts = title.split('/')
+        group = tuple(passages[position:position + len(parts)])
+        if len(group) < len(parts) or not all(_same_book(part, p.name) for part, p in zip(parts, group)):
+            found = ' / '.join(p.label for p in group) or 'nothing'
+            raise ValueError(f"Reading plan does not match the schedule on day {day}: {title!r} vs {found!r}")
+        readings.append(Reading(group))
+        position += len(parts)
+    if position != len(passages):
+        raise ValueError(f"Reading plan has {len(passages) - position} passages beyond the schedule")
+    return readings
+
+
+def fit_to_days(readings, days):
+    """Fit readings to exactly days entries, leaving every existing day where it is.
+
+    A short plan is padded with catch-up days at the end. A plan longer than
+    the year (only possible without a schedule) combines the shortest
+    neighbouring readings, whole short books first.
+    """
+    readings = list(readings)
+
+    def merge_cost(j):
+        whole_books = all(p.whole_book for p in readings[j].passages + readings[j + 1].passages)
+        return not whole_books, readings[j].chapters + readings[j + 1].chapters, j
+
+    while len(readings) > days:
+        i = min(range(len(readings) - 1), key=merge_cost)
+        readings[i:i + 2] = [Reading(readings[i].passages + readings[i + 1].passages)]
+    readings += [Reading(())] * (days - len(readings))
+    return readings
+
+
+class ReadingPlan:
+    """Day-of-year index over the compiled plan."""
+
+    def __init__(self, readings):
+        self.base = readings
+        self._by_length = {}
+
+    def readings(self, year):
+        """The plan fitted to the given year, indexed by day of year - 1."""
+        days = 366 if _is_leap(year) else 365
+        readings = self._by_length.get(days)
+        if readings is None:
+            readings = self._by_length[days] = fit_to_days(self.base, days)
+        return readings
+
+    def for_date(self, date):
+        """Reading for a date."""
+        return self.readings(date.year)[date.timetuple().tm_yday - 1]
+
+    def between(self, start, days):
+        """(date, reading) pairs for days consecutive dates from start."""
+        result = []
+        date = start
+        while len(result) < days:
+            readings = self.readings(date.year)
+            first = date.timetuple().tm_yday - 1
+            take = min(days - len(result), len(readings) - first)
+            for offset, reading in enumerate(readings[first:first + take]):
+                result.append((date + datetime.timedelta(days=offset), reading))
+            date = datetime.date(date.year + 1, 1, 1)
+        return result
+
+    def export_year(self, year, ics_path=None, rss_path=None, feed_url=None):
+        """Write a year of readings as iCalendar and/or RSS in one pass. Returns the count."""
+        entries = self.between(datetime.date(year, 1, 1), len(self.readings(year)))
+        if ics_path is None:
+            return _write_plan_rss(rss_path, year, iter(entries), feed_url) if rss_path else len(entries)
+        with atomic_write(ics_path) as ics:
+            ics.write('BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//JW-Newsfeed//Reading Plan//EN\r\n'
+                      'CALSCALE:GREGORIAN\r\nX-WR-CALNAME:Bible Reading\r\n')
+            stream = _ics_events(ics, entries)
+            count = _write_plan_rss(rss_path, year, stream, feed_url) if rss_path else sum(1 for _ in stream)
+            ics.write('END:VCALENDAR\r\n')
+        return count
+
+
+def _is_leap(year):
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+def _ics_escape(value):
+    return value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def _ics_events(ics, entries):
+    """Write a VEVENT for each entry as it is consumed, passing the entry on."""
+    stamp = datetime.datetime.now(datetime.UTC).strftime('%Y%m%dT%H%M%SZ')
+    for date, reading in entries:
+        uid = uuid.uuid5(UID_NAMESPACE, date.isoformat())
+        end = date + datetime.timedelta(days=1)
+        ics.write(f'BEGIN:VEVENT\r\nUID:{uid}\r\nDTSTAMP:{stamp}\r\n'
+                  f'DTSTART;VALUE=DATE:{date:%Y%m%d}\r\nDTEND;VALUE=DATE:{end:%Y%m%d}\r\n'
+                  f'SUMMARY:{_ics_escape(reading.title)}\r\nURL:{reading.url}\r\nEND:VEVENT\r\n')
+        yield date, reading
+
+
+def _write_plan_rss(path, year, entries, feed_url):
+    channel = {
+        'title': f'Bible Reading {year}',
+        'link': 'https://wol.jw.org/',
+        'description': f'Daily Bible reading schedule for {year}',
+        'language': 'en',
+        'self_url': feed_url,
+    }
+    items = ({
+        'title': f'{date:%B} {date.day}: {reading.title}',
+        'link': reading.url,
+        'category': 'Bible Reading',
+        'description': reading.title,
+        'pub_date': datetime.datetime.combine(date, datetime.time(), datetime.UTC)
+                    .strftime('%a, %d %b %Y %H:%M:%S +0000'),
+    } for date, reading in entries)
+    return write_rss(path, channel, items)
+
+
+@functools.lru_cache(maxsize=None)
+def load_plan(path=PLAN_FILE, schedule_path=SCHEDULE_FILE):
+    """The compiled plan for a plan file, grouped and checked by the schedule, built once per process.
+
+    Without a schedule file every plan line is one day's reading.
+    """
+    passages = load_passages(path)
+    try:
+        titles = load_schedule(schedule_path)
+    except FileNotFoundError:
+        return ReadingPlan([Reading((p,)) for p in passages])
+    return ReadingPlan(group_passages(passages, titles))
@@ -0,0 +1,250 @@
+"""
+Feed Thumbnails
+
+Replaces the full-size item images in the feeds with small local copies.
+Item images are fetched concurrently, downscaled to the configured widths
+with Pillow and written to a thumbs/ directory next to the feeds, named by a
+hash of the image URL. The feed then points media:thumbnail at the published
+copies and gives their width and height.
+
+An index in thumbs/index.json records every image already processed, so an
+image is only ever fetched once; entries not used by a feed for
+THUMBNAIL_MAX_AGE_DAYS are pruned together with their files. Without Pillow
+the images are still fetched once to read their dimensions, and the feed
+keeps the original URLs with width and height added.
+"""
+
+import datetime
+import hashlib
+import io
+import json
+import logging
+import os
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import jw_http
+import jw_metrics
+
+try:
+    from PIL import Image
+    PILLOW_AVAILABLE = True
+except ImportError:
+    PILLOW_AVAILABLE = False
+
+# Configuration - use environment variables or defaults
+OUTPUT_DIR = os.environ.get('JW_OUTPUT_DIR', os.path.dirname(os.path.abspath(__file__)))
+THUMBNAIL_DIR = os.environ.get('JW_THUMBNAIL_DIR', os.path.join(OUTPUT_DIR, 'thumbs'))
+THUMBNAILS_ENABLED = os.environ.get('JW_THUMBNAILS', 'off').lower() not in ('0', 'off', 'false', 'no')
+# The first width is the one readers are offered first
+THUMBNAIL_WIDTHS = tuple(int(w) for w in os.environ.get('JW_THUMBNAIL_WIDTHS', '320,640').split(','))
+THUMBNAIL_WORKERS = int(os.environ.get('JW_THUMBNAIL_WORKERS', '8'))
+THUMBNAIL_MAX_AGE_DAYS = int(os.environ.get('JW_THUMBNAIL_MAX_AGE_DAYS', '30'))
+JPEG_QUALITY = 82
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def image_size(data):
+    """(width, height) of JPEG or PNG data from its header, or None."""
+    if data[:8] == b'\x89PNG\r\n\x1a\n' and data[12:16] == b'IHDR':
+        return struct.unpack('>II', data[16:24])
+    if data[:2] != b'\xff\xd8':
+        return None
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        length = struct.unpack('>H', data[i + 2:i + 4])[0]
+        # Start-of-frame markers carry the dimensions (C4, C8 and CC are not frames)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack('>HH', data[i + 5:i + 9])
+            return width, height
+        i += 2 + length
+    return None
+
+
+def url_key(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()[:24]
+
+
+def _resize(data, widths):
+    """Downscale image data to each width narrower than it. Returns {width: (jpeg bytes, w, h)}."""
+    with Image.open(io.BytesIO(data)) as image:
+        source_width, source_height = image.size
+        variants = {}
+        for width in sorted(widths, reverse=True):
+            if width >= source_width:
+                continue
+            height = max(1, round(source_height * width / source_width))
+            # draft() lets the JPEG decoder skip detail the smaller size does not need
+            image.draft('RGB', (width, height))
+            resized = image.convert('RGB').resize((width, height), Image.LANCZOS)
+            out = io.BytesIO()
+            resized.save(out, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+            variants[width] = (out.getvalue(), width, height)
+    return variants
+
+
+class ThumbnailStore:
+    """Processed images by URL, with their local variants, in a directory served with the feeds."""
+
+    def __init__(self, root=THUMBNAIL_DIR, base_url=None, widths=THUMBNAIL_WIDTHS,
+                 workers=THUMBNAIL_WORKERS, max_age_days=THUMBNAIL_MAX_AGE_DAYS):
+        self.root = root
+        self.base_url = base_url
+        self.widths = widths
+        self.workers = workers
+        self.max_age_days = max_age_days
+        self.index_path = os.path.join(root, 'index.json')
+        self._lock = threading.Lock()
+        self.dirty = False
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def _public_url(self, name):
+        return self.base_url.rstrip('/') + '/' + name
+
+    def _usable(self, entry):
+        """True if an entry needs no refetch: its variants are on disk, or none could be made."""
+        if not all(os.path.exists(os.path.join(self.root, v['file'])) for v in entry['variants']):
+            return False
+        if entry['variants'] or not (PILLOW_AVAILABLE and self.base_url):
+            return True
+        # Recorded without Pillow; fetch again only if the image is wide enough to downscale
+        return entry['width'] is not None and entry['width'] <= min(self.widths)
+
+    def _process(self, url, session):
+        """Fetch one image and write its variants. Returns the index entry, or None on failure."""
+        try:
+            response = session.get(url, timeout=jw_http.DEFAULT_TIMEOUT)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logging.warning("Could not fetch thumbnail %s: %s", url, e)
+            return None
+        data = response.content
+        jw_metrics.count('thumbnails_fetched')
+        jw_metrics.count('thumbnail_bytes_fetched', len(data))
+        size = image_size(data)
+        entry = {'url': url, 'width': size[0] if size else None, 'height': size[1] if size else None,
+                 'variants': []}
+        if PILLOW_AVAILABLE and self.base_url:
+            key = url_key(url)
+            try:
+                variants = _resize(data, self.widths)
+            except (OSError, ValueError) as e:
+                logging.warning("Could not resize thumbnail %s: %s", url, e)
+                variants = {}
+            os.makedirs(self.root, exist_ok=True)
+            for width in self.widths:
+                if width not in variants:
+                    continue
+                body, w, h = variants[width]
+                name = f'{key}_{width}.jpg'
+                tmp_path = os.path.join(self.root, name + '.tmp')
+                with open(tmp_path, 'wb') as f:
+                    f.write(body)
+                os.replace(tmp_path, os.path.join(self.root, name))
+                entry['variants'].append({'file': name, 'width': w, 'height': h})
+        return entry
+
+    def _cutoff(self):
+        return (datetime.date.today() - datetime.timedelta(days=self.max_age_days)).isoformat()
+
+    def attach(self, items, session=None):
+        """Set item['thumbnails'] on items with an image, fetching only images not seen before.
+
+        Each thumbnail is a dict of url, width and height; local variants come
+        first, and the original image is the fallback. Returns how many
+        images were fetched.
+
+        Usage is recorded on the entries themselves, under the lock, so a
+        save() from another locale sharing the store cannot prune an image
+        these items were just given. last_used is only moved forward for an
+        entry that would otherwise be pruned, so an unchanged run leaves the
+        index alone.
+        """
+        today = datetime.date.today().isoformat()
+        cutoff = self._cutoff()
+        with self._lock:
+            missing = set()
+            for url in {item['image'] for item in items if item.get('image')}:
+                entry = self.entries.get(url)
+                if entry is None or not self._usable(entry):
+                    missing.add(url)
+                elif entry.get('last_used', cutoff) < cutoff:
+                    entry['last_used'] = today
+                    self.dirty = True
+            missing = sorted(missing)
+        if missing:
+            session = session or jw_http.get_session()
+            with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(missing)))) as pool:
+                processed = list(pool.map(lambda url: self._process(url, session), missing))
+            with self._lock:
+                for url, entry in zip(missing, processed):
+                    if entry is not None:
+                        entry['last_used'] = today
+                        self.entries[url] = entry
+                        self.dirty = True
+
+        with self._lock:
+            for item in items:
+                entry = self.entries.get(item.get('image'))
+                if entry is None:
+                    continue
+                thumbs = [{'url': self._public_url(v['file']), 'width': v['width'], 'height': v['height']}
+                          for v in entry['variants']]
+                if not thumbs:
+                    thumbs = [{'url': entry['url'], 'width': entry['width'], 'height': entry['height']}]
+                item['thumbnails'] = thumbs
+        return len(missing)
+
+    def save(self):
+        """Prune entries unused for max_age_days and write the index, only if anything changed.
+
+        Returns True if the index was written.
+        """
+        cutoff = self._cutoff()
+        with self._lock:
+            for url, entry in list(self.entries.items()):
+                if entry.get('last_used', cutoff) >= cutoff:
+                    continue
+                self.dirty = True
+                for variant in entry['variants']:
+                    try:
+                        os.remove(os.path.join(self.root, variant['file']))
+                    except FileNotFoundError:
+                        pass
+                del self.entries[url]
+            if not self.dirty:
+                return False
+            os.makedirs(self.root, exist_ok=True)
+            tmp_path = self.index_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.index_path)
+            self.dirty = False
+            return True
+
+def get_store(base_url):
+    """Return the process-wide thumbnail store, creating it on first use.
+
+    base_url is the published URL of the thumbnail directory.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ThumbnailStore(base_url=base_url)
+        return _store
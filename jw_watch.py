@@ -0,0 +1,332 @@
+"""
+Feed Watcher
+
+Runs the feed generator as a long-lived daemon instead of one process per
+scheduled run. The pooled HTTP session, each locale's history and (once the
+HTTP path has failed) a Chrome session stay warm between polls, so a poll
+that finds nothing new costs one conditional request per locale.
+
+The poll interval adapts: it drops to the minimum after a change, while new
+items tend to arrive in bursts, and backs off exponentially while nothing
+changes, up to the maximum. Feeds are regenerated only when their items
+changed and, with publishing on, committed and pushed only when new items
+appear. A small HTTP endpoint reports health (/health) and status (/status).
+
+    python jw_news_parser.py --daemon --publish
+    curl http://localhost:8889/status
+"""
+
+import datetime
+import http.server
+import json
+import os
+import random
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import jw_http
+import jw_metrics
+import jw_news_parser
+import jw_thumbnails
+
+# Configuration - use environment variables or defaults
+POLL_MIN = float(os.environ.get('JW_POLL_MIN', '60'))  # Seconds between polls after a change
+POLL_MAX = float(os.environ.get('JW_POLL_MAX', '3600'))  # Longest wait while nothing changes
+POLL_BACKOFF = float(os.environ.get('JW_POLL_BACKOFF', '2'))
+POLL_JITTER = 0.1  # Spread polls by up to 10% so several watchers do not line up
+HEALTH_PORT = int(os.environ.get('JW_HEALTH_PORT', '8889'))
+
+
+def _now_iso():
+    return datetime.datetime.now(datetime.UTC).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class AdaptiveInterval:
+    """Poll interval that resets to the minimum after a change and backs off exponentially otherwise."""
+
+    def __init__(self, minimum=POLL_MIN, maximum=POLL_MAX, factor=POLL_BACKOFF, jitter=POLL_JITTER):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.factor = factor
+        self.jitter = jitter
+        self.current = minimum
+
+    def changed(self):
+        self.current = self.minimum
+
+    def unchanged(self):
+        self.current = min(self.current * self.factor, self.maximum)
+
+    def next_delay(self):
+        """Seconds to wait before the next poll."""
+        return self.current * (1 + random.uniform(-self.jitter, self.jitter))
+
+
+class WarmBrowser:
+    """A Chrome session started the first time a poll needs one and kept for later polls."""
+
+    def __init__(self, warm_url):
+        self.warm_url = warm_url
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self._pool is None:
+                import jw_browser  # Selenium is only imported if a poll needs the browser
+                self._pool = jw_browser.DriverPool(1, self.warm_url)
+        return self._pool.acquire()
+
+    def release(self, driver):
+        self._pool.release(driver)
+
+    @property
+    def started(self):
+        return self._pool is not None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+
+
+class Watcher:
+    """Polls every locale's What's New page and keeps the feeds (and optionally gh-pages) current."""
+
+    def __init__(self, configs, interval=None, publish=False, push=True, backfill_pages=0,
+                 archive=jw_news_parser.ARCHIVE, verbose=False):
+        self.configs = configs
+        self.interval = interval or AdaptiveInterval()
+        self.publish = publish
+        self.push = push
+        self.backfill_pages = backfill_pages
+        self.archive = archive
+        self.verbose = verbose
+        self.session = jw_http.get_session()
+        self.browser = WarmBrowser(configs[0]['url'])
+        self.histories = {}
+        self.pool = ThreadPoolExecutor(max_workers=max(1, min(jw_news_parser.MAX_WORKERS, len(configs))))
+        # Files updated since the last publish, in first-updated order
+        self.pending_feeds = {}
+        self.pending_states = {}
+        self.publish_failed = False  # Retry on the next poll, with or without new items
+        self.status = {
+            'started': _now_iso(),
+            'polls': 0,
+            'errors': 0,
+            'changes': 0,
+            'new_items': 0,
+            'publishes': 0,
+            'last_poll': None,
+            'last_success': None,
+            'last_change': None,
+            'last_publish': None,
+            'last_error': None,
+            'interval': self.interval.current,
+            'next_poll': None,
+            'locales': {},
+        }
+        self._last_success = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def log(self, message):
+        print(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} {message}", flush=True)
+
+    def _update(self, config):
+        locale = config['locale']
+        history = self.histories.get(locale)
+        if history is None:
+            history = self.histories[locale] = jw_news_parser.load_history(
+                config['history_file'], config['legacy_history_file'])
+        log = (lambda message: self.log(f"[{locale}] {message}")) if self.verbose else (lambda message: None)
+        # max_age=0: a poll served from the response cache could not see a change
+        return jw_news_parser.update_feed(config, self.session, log=log, backfill_pages=self.backfill_pages,
+                                          archive=self.archive, history=history, browser=self.browser,
+                                          max_age=0)
+
+    def poll(self):
+        """Update every locale once, publish if new items appeared, and adapt the interval. Returns the results."""
+        run = jw_metrics.start_run('news_parser_daemon')
+        results = list(self.pool.map(self._update, self.configs))
+        updated = [r for r in results if r['status'] == 'updated']
+        new_items = sum(r['new'] for r in updated)
+        errors = [r['locale'] for r in results if r['status'] == 'error']
+        for r in updated:
+            config = jw_news_parser.locale_config(r['locale'])
+            self.pending_feeds.update(dict.fromkeys(r['files']))
+            self.pending_states.update(dict.fromkeys(
+                [config['history_file'], config['state_file'], config['item_store_file']]))
+
+        published = self._publish() if self.publish and (new_items or self.publish_failed) else None
+
+        if updated:
+            self.interval.changed()
+        else:
+            self.interval.unchanged()
+        run.gauge('poll_interval_seconds', self.interval.current)
+        run.gauge('browser_warm', int(self.browser.started))
+        jw_news_parser.finish_metrics(run, results)
+
+        now = _now_iso()
+        with self._lock:
+            status = self.status
+            status['polls'] += 1
+            status['last_poll'] = now
+            status['interval'] = self.interval.current
+            status['new_items'] += new_items
+            status['locales'] = {r['locale']: {'status': r['status'], 'items': r['items'], 'new': r['new']}
+                                 for r in results}
+            if updated:
+                status['changes'] += 1
+                status['last_change'] = now
+            if published:
+                status['publishes'] += 1
+                status['last_publish'] = now
+            if errors:
+                status['errors'] += 1
+                status['last_error'] = f"{now} update failed for {', '.join(errors)}"
+            else:
+                status['last_success'] = now
+                self._last_success = time.monotonic()
+
+        summary = ', '.join(f"{r['locale']} {r['status']}" + (f" (+{r['new']} new)" if r['new'] else '')
+                            for r in results)
+        self.log(f"Poll {self.status['polls']}: {summary}; next in {self.interval.current:.0f}s")
+        return results
+
+    def _publish(self):
+        """Commit and push the feeds updated since the last publish. Returns the publish result or None."""
+        import update_and_publish  # Only needed when publishing
+
+        feeds = list(self.pending_feeds)
+        if jw_thumbnails.THUMBNAILS_ENABLED and os.path.isdir(jw_thumbnails.THUMBNAIL_DIR):
+            feeds.append(jw_thumbnails.THUMBNAIL_DIR)
+        try:
+            result = update_and_publish.publish(update_and_publish.SCRIPT_DIR, feeds, list(self.pending_states),
+                                                push=self.push)
+        except update_and_publish.GitError as e:
+            # Keep the files pending; the next poll tries again and pushes what is left unpushed
+            self.log(f"Publish failed: {e}")
+            self.publish_failed = True
+            with self._lock:
+                self.status['last_error'] = f"{_now_iso()} publish failed: {e}"
+            return None
+        self.publish_failed = False
+        self.pending_feeds.clear()
+        self.pending_states.clear()
+        self.log(f"Published: main {result['main_commit'] or 'no changes'}, "
+                 f"{update_and_publish.PAGES_BRANCH} {result['pages_commit'] or 'no changes'}")
+        return result
+
+    def healthy(self):
+        """True until polls have failed for longer than two maximum intervals."""
+        with self._lock:
+            if self._last_success is None:
+                return self.status['errors'] == 0  # Still on the first poll
+            return time.monotonic() - self._last_success <= 2 * self.interval.maximum
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.status, locales=dict(self.status['locales']))
+
+    def run(self, max_polls=None):
+        """Poll until stop() is called (or max_polls polls have run)."""
+        self.log(f"Watching {', '.join(c['locale'] for c in self.configs)} every "
+                 f"{self.interval.minimum:.0f}-{self.interval.maximum:.0f}s")
+        polls = 0
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                # A failed poll must not end the daemon; back off and try again
+                self.interval.unchanged()
+                self.log(f"Poll failed: {e}")
+                with self._lock:
+                    self.status['errors'] += 1
+                    self.status['last_error'] = f"{_now_iso()} {e}"
+            polls += 1
+            if max_polls is not None and polls >= max_polls:
+                break
+            delay = self.interval.next_delay()
+            with self._lock:
+                self.status['next_poll'] = (datetime.datetime.now(datetime.UTC) + datetime.timedelta(seconds=delay)) \
+                    .strftime('%Y-%m-%dT%H:%M:%SZ')
+            self._stop.wait(delay)
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        self.pool.shutdown()
+        self.browser.close()
+
+
+class HealthHandler(http.server.BaseHTTPRequestHandler):
+    """GET /health: 200 or 503 with a one-line verdict; GET /status: the watcher's status as JSON."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        watcher = self.server.watcher
+        path = self.path.split('?', 1)[0]
+        if path == '/health':
+            healthy = watcher.healthy()
+            self._send(200 if healthy else 503, {'status': 'ok' if healthy else 'failing'})
+        elif path == '/status':
+            status = watcher.snapshot()
+            status['healthy'] = watcher.healthy()
+            self._send(200, status)
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def _send(self, code, payload):
+        body = (json.dumps(payload, indent=1) + '\n').encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class HealthServer(http.server.ThreadingHTTPServer):
+    """Serves HealthHandler for a watcher from a background thread."""
+
+    daemon_threads = True
+
+    def __init__(self, watcher, port=HEALTH_PORT, host=''):
+        self.watcher = watcher
+        super().__init__((host, port), HealthHandler)
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+def run_daemon(configs, min_interval=None, max_interval=None, publish=False, push=True, health_port=None,
+               backfill_pages=0, archive=jw_news_parser.ARCHIVE, verbose=False):
+    """Watch until SIGTERM or Ctrl+C. health_port 0 picks a free port; None uses JW_HEALTH_PORT."""
+    interval = AdaptiveInterval(POLL_MIN if min_interval is None else min_interval,
+                                POLL_MAX if max_interval is None else max_interval)
+    watcher = Watcher(configs, interval, publish=publish, push=push, backfill_pages=backfill_pages,
+                      archive=archive, verbose=verbose)
+    signal.signal(signal.SIGTERM, lambda signum, frame: watcher.stop())
+    port = HEALTH_PORT if health_port is None else health_port
+    try:
+        with HealthServer(watcher, port) as health:
+            watcher.log(f"Health endpoint on port {health.server_address[1]}")
+            watcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    watcher.log(f"Stopped after {watcher.status['polls']} polls")
+    return watcher.status
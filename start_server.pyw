@@ -1,14 +1,10 @@
-import http.server
-import socketserver
 import os
 
-os.chdir(r"C:\Users\camst\JW-Newsfeed")
+from jw_feed_server import FeedServer
 
-PORT = 8888
+ROOT_DIR = os.environ.get('JW_OUTPUT_DIR', os.path.dirname(os.path.abspath(__file__)))
 
-class QuietHandler(http.server.SimpleHTTPRequestHandler):
-    def log_message(self, format, *args):
-        pass  # Suppress logging
+PORT = int(os.environ.get('JW_SERVER_PORT', '8888'))
 
-with socketserver.TCPServer(("", PORT), QuietHandler) as httpd:
+with FeedServer(ROOT_DIR, PORT) as httpd:
     httpd.serve_forever()
@@ -2,56 +2,213 @@
 Daily Text Scraper
 
 Scrapes the daily text from wol.jw.org (Watchtower Online Library).
+
+Daily texts are fetched over plain HTTP from the dated daily text pages and
+kept in a local cache keyed by date, loaded once per process, so
+get_daily_text() only touches the network on a cache miss. A range of dates can be prefetched with bounded
+concurrency; each page carries the texts for the day before and after too,
+so a range needs about one request per three days. The browser is only used
+when the HTTP fetch fails.
 """
 
+import argparse
+import datetime
 import json
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.common.exceptions import WebDriverException
-from bs4 import BeautifulSoup
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+
+import jw_http
+import jw_jsonl
+import jw_metrics
 
 try:
-    from webdriver_manager.chrome import ChromeDriverManager
-    USE_WEBDRIVER_MANAGER = True
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
 except ImportError:
-    USE_WEBDRIVER_MANAGER = False
+    HTML_PARSER = 'html.parser'
+
+# Configuration - use environment variables or defaults
+DATA_DIR = os.environ.get('JW_DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+CACHE_FILE = os.environ.get('JW_DAILY_TEXT_CACHE', os.path.join(DATA_DIR, 'daily_text.jsonl'))
+DAILY_TEXT_URL_TEMPLATE = os.environ.get(
+    'JW_DAILY_TEXT_URL', 'https://wol.jw.org/en/wol/dt/r1/lp-e/{year}/{month}/{day}')
+PREFETCH_WORKERS = int(os.environ.get('JW_PREFETCH_WORKERS', '4'))
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def _is_tab_class(value):
+    # The strainer may see the raw class attribute ("tabContent active") rather than a list
+    if not value:
+        return False
+    if isinstance(value, str):
+        value = value.split()
+    return 'tabContent' in value
+
+
+TAB_STRAINER = SoupStrainer('div', class_=_is_tab_class)
+
+
+class DailyTextCache:
+    """Daily text records in an append-only JSON Lines file, indexed by ISO date."""
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        jw_jsonl.load(path, lambda record: self._entries.update({record['date']: record}))
+
+    def __contains__(self, date):
+        return date.isoformat() in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, date):
+        """Return the cached record for a date, or None."""
+        return self._entries.get(date.isoformat())
+
+    def put_many(self, records):
+        """Add records not already cached. Returns how many were new."""
+        with self._lock:
+            new = [r for r in records if r['date'] not in self._entries]
+            if new:
+                jw_jsonl.append(self.path, new)
+                self._entries.update((record['date'], record) for record in new)
+        return len(new)
+
+
+def get_cache():
+    """Return the process-wide daily text cache, loading CACHE_FILE on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DailyTextCache(CACHE_FILE)
+        return _cache
+
+
+def daily_text_url(date):
+    return DAILY_TEXT_URL_TEMPLATE.format(year=date.year, month=date.month, day=date.day)
+
+
+def _text_record(tab):
+    """Date/Script/Notes from one tabContent div, as the browser scraper read them."""
+    header = tab.h2.text.strip() if tab.h2 else ""
+    scripture = tab.p.text.strip() if tab.p else ""
+
+    notes = ""
+    body = tab.find('div', class_='bodyTxt')
+    if body is not None:
+        notes = body.get_text(' ', strip=True)
+    elif tab.p and tab.p.next_sibling:
+        # Get notes (next sibling paragraph)
+        next_elem = tab.p.next_sibling.next_sibling
+        if next_elem and hasattr(next_elem, 'text'):
+            notes = next_elem.text.strip()
+
+    return {'Date': header, 'Script': scripture, 'Notes': notes}
 
 
-def get_daily_text():
-    """Scrape the daily text from wol.jw.org."""
+def parse_daily_texts(html, page_date=None):
+    """Parse every daily text on a page into records keyed by ISO date.
+
+    Tabs without a data-date attribute are only kept if they are the active
+    tab, which is then assigned page_date.
+    """
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=TAB_STRAINER)
+    records = []
+    for tab in soup.find_all('div', class_='tabContent'):
+        date = (tab.get('data-date') or '')[:10]
+        if not date:
+            if page_date is None or 'active' not in tab.get('class', []):
+                continue
+            date = page_date.isoformat()
+        try:
+            record = _text_record(tab)
+        except AttributeError:
+            # Skip items that don't have expected structure
+            continue
+        record['date'] = date
+        records.append(record)
+    return records
+
+
+def fetch_daily_texts(date, session=None):
+    """Fetch and parse the daily text page for a date (and its neighbours)."""
+    with jw_metrics.span('fetch'):
+        html = jw_http.fetch_text(daily_text_url(date), session=session)
+    jw_metrics.count('pages_fetched')
+    with jw_metrics.span('parse', profile=True):
+        return parse_daily_texts(html, page_date=date)
+
+
+def _page_dates(dates):
+    """Pick page dates so each page's yesterday/today/tomorrow tabs cover the missing dates."""
+    pages, covered = [], set()
+    for date in sorted(dates):
+        if date in covered:
+            continue
+        center = date + datetime.timedelta(days=1)
+        pages.append(center)
+        covered.update(center + datetime.timedelta(days=offset) for offset in (-1, 0, 1))
+    return pages
+
+
+def prefetch(start, days, cache=None, workers=PREFETCH_WORKERS, session=None):
+    """Fill the cache for days dates from start. Returns (records added, pages fetched)."""
+    cache = get_cache() if cache is None else cache
+    session = session or jw_http.get_session()
+    wanted = [start + datetime.timedelta(days=i) for i in range(days)]
+    added = fetched = 0
+
+    # First pass relies on neighbour tabs; the second fetches whatever is still missing directly
+    for plan in (_page_dates, sorted):
+        missing = [d for d in wanted if d not in cache]
+        if not missing:
+            break
+        pages = plan(missing)
+
+        def fetch(date):
+            try:
+                return fetch_daily_texts(date, session)
+            except requests.RequestException as e:
+                print(f"Error fetching daily text for {date}: {e}")
+                jw_metrics.count('fetch_errors')
+                return []
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for records in pool.map(fetch, pages):
+                added += cache.put_many(records)
+        fetched += len(pages)
+    jw_metrics.count('texts_cached', added)
+    return added, fetched
+
+
+def get_daily_text_browser():
+    """Scrape today's daily text from wol.jw.org with Chrome."""
+    from selenium.common.exceptions import WebDriverException
+    import jw_browser
+
     driver = None
     text_list = []
 
     try:
-        # Initialize Chrome driver
-        if USE_WEBDRIVER_MANAGER:
-            driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()))
-        else:
-            driver = webdriver.Chrome()
+        with jw_metrics.span('driver_start'):
+            driver = jw_browser.create_driver()
 
-        driver.get('https://wol.jw.org')
+        jw_browser.load_page(driver, 'https://wol.jw.org')
 
         html = driver.page_source
         soup = BeautifulSoup(html, 'html.parser')
 
         for link in soup.find_all("div", {"class": "tabContent active"}):
             try:
-                header = link.h2.text.strip() if link.h2 else ""
-                scripture = link.p.text.strip() if link.p else ""
-
-                # Get notes (next sibling paragraph)
-                notes = ""
-                if link.p and link.p.next_sibling:
-                    next_elem = link.p.next_sibling.next_sibling
-                    if next_elem and hasattr(next_elem, 'text'):
-                        notes = next_elem.text.strip()
-
-                text_dict = {
-                    'Date': header,
-                    'Script': scripture,
-                    'Notes': notes
-                }
-                text_list.append(text_dict)
+                text_list.append(_text_record(link))
             except AttributeError:
                 # Skip items that don't have expected structure
                 continue
@@ -66,9 +223,65 @@ def get_daily_text():
     return text_list
 
 
-if __name__ == '__main__':
-    texts = get_daily_text()
+def get_daily_text(date=None, cache=None, session=None):
+    """Return the daily text for a date (default today) as a list of Date/Script/Notes dicts.
+
+    Served from the cache when possible; a miss fetches the date's page over
+    HTTP and caches every text on it.
+    """
+    date = date or datetime.date.today()
+    cache = get_cache() if cache is None else cache
+    record = cache.get(date)
+    jw_metrics.count('cache_hits' if record is not None else 'cache_misses')
+    if record is None:
+        try:
+            jw_metrics.count('texts_cached', cache.put_many(fetch_daily_texts(date, session)))
+            record = cache.get(date)
+        except requests.RequestException as e:
+            print(f"Error fetching daily text: {e}")
+            jw_metrics.count('fetch_errors')
+    if record is not None:
+        return [{key: record[key] for key in ('Date', 'Script', 'Notes')}]
+    if date == datetime.date.today():
+        with jw_metrics.span('browser'):
+            return get_daily_text_browser()
+    return []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print the daily text from wol.jw.org")
+    parser.add_argument('--date', type=datetime.date.fromisoformat, default=None,
+                        help="date as YYYY-MM-DD (default: today)")
+    parser.add_argument('--prefetch', type=int, default=0, metavar='DAYS',
+                        help="cache this many days starting at --date before printing")
+    parser.add_argument('--workers', type=int, default=PREFETCH_WORKERS)
+    parser.add_argument('--profile', action='store_true', help="profile the parse stage with cProfile")
+    parser.add_argument('--http-cache', choices=jw_http.CACHE_MODES,
+                        help="response cache mode; replay runs offline from recorded responses")
+    args = parser.parse_args(argv)
+    if args.http_cache:
+        jw_http.configure_cache(args.http_cache)
+
+    run = jw_metrics.start_run('daily_text', profile=args.profile)
+    with jw_metrics.span('cache_load'):
+        cache = get_cache()
+    date = args.date or datetime.date.today()
+    if args.prefetch:
+        with jw_metrics.span('prefetch'):
+            added, pages = prefetch(date, args.prefetch, cache, workers=args.workers)
+        print(f"Cached {added} new daily texts from {pages} pages ({len(cache)} in cache)")
+
+    texts = get_daily_text(date, cache)
+    run.gauge('cached_texts', len(cache))
     if texts:
         print(json.dumps(texts, indent=2))
     else:
         print("No daily text found.")
+    record = run.finish('ok' if texts else 'error')
+    if 'profile' in record:
+        print(run.profile_summary())
+        print(f"Profile written to: {record['profile']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,65 +1,206 @@
 """
 JW-Newsfeed Update and Publish Script
 Runs the parser and publishes the feed to GitHub Pages
+
+The parser runs in-process. The gh-pages commit is built straight from the
+feed blobs with git plumbing (hash-object, mktree, commit-tree, update-ref),
+so the working tree never leaves the current branch, and both branches are
+pushed together in one atomic push.
 """
-import subprocess
+import argparse
 import os
+import subprocess
 import sys
 
-# Change to script directory
-os.chdir(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REMOTE = os.environ.get('JW_PUBLISH_REMOTE', 'origin')
+PAGES_BRANCH = os.environ.get('JW_PAGES_BRANCH', 'gh-pages')
+MAIN_MESSAGE = "Auto-update RSS feed"
+PAGES_MESSAGE = "Update RSS feed"
+
+
+class GitError(Exception):
+    """A git command failed."""
+
+
+def git(repo, *args, input=None, check=True):
+    """Run git in repo and return its stripped stdout."""
+    result = subprocess.run(['git', *args], cwd=repo, input=input, capture_output=True, text=True)
+    if check and result.returncode != 0:
+        raise GitError(f"git {' '.join(args)}: {result.stderr.strip()}")
+    return result.stdout.strip()
+
+
+def rev_parse(repo, ref):
+    """Commit id of ref, or None if it does not exist."""
+    return git(repo, 'rev-parse', '--verify', '--quiet', ref + '^{commit}', check=False) or None
+
+
+def is_ancestor(repo, commit, other):
+    """True if commit is reachable from other."""
+    return subprocess.run(['git', 'merge-base', '--is-ancestor', commit, other], cwd=repo).returncode == 0
+
+
+def pages_parent(repo, remote=REMOTE, branch=PAGES_BRANCH):
+    """The commit the next gh-pages commit builds on: the newer of the local and remote-tracking refs."""
+    local = rev_parse(repo, f'refs/heads/{branch}')
+    tracking = rev_parse(repo, f'refs/remotes/{remote}/{branch}')
+    if local and tracking and local != tracking:
+        return tracking if is_ancestor(repo, local, tracking) else local
+    return local or tracking
+
+
+def unpushed(repo, branch, remote=REMOTE):
+    """True if the local branch has commits its remote-tracking ref lacks, e.g. after a failed push."""
+    local = rev_parse(repo, f'refs/heads/{branch}')
+    tracking = rev_parse(repo, f'refs/remotes/{remote}/{branch}')
+    return bool(local) and local != tracking and not (tracking and is_ancestor(repo, local, tracking))
+
+
+def build_tree(repo, directory):
+    """Write a tree object for directory's files (recursively) and return its id."""
+    names, files, entries = sorted(os.listdir(directory)), [], []
+    for name in names:
+        path = os.path.join(directory, name)
+        if os.path.isdir(path):
+            entries.append(f'040000 tree {build_tree(repo, path)}\t{name}\0')
+        elif os.path.isfile(path) and not name.endswith('.tmp'):
+            files.append(name)
+    if files:
+        # One hash-object process for the whole directory rather than one per file
+        blobs = git(repo, 'hash-object', '-w', '--stdin-paths',
+                    input='\n'.join(os.path.join(directory, name) for name in files) + '\n').split('\n')
+        entries += [f'100644 blob {blob}\t{name}\0' for name, blob in zip(files, blobs)]
+    return git(repo, 'mktree', '-z', input=''.join(entries))
+
 
-def run_command(cmd, description):
-    """Run a command and return success status"""
-    print(f"{description}...")
-    result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-    if result.returncode != 0:
-        print(f"  Error: {result.stderr}")
+def build_pages_commit(repo, files, parent, message=PAGES_MESSAGE):
+    """Create a commit whose tree is parent's tree with files replaced at the top level.
+
+    Directories in files replace the subtree of the same name as a whole.
+    Returns the new commit id, or None if the tree would not change.
+    """
+    entries = {}
+    if parent:
+        for line in git(repo, 'ls-tree', '-z', parent).split('\0'):
+            if line:
+                meta, name = line.split('\t', 1)
+                entries[name] = meta
+    for path in files:
+        name = os.path.basename(os.path.normpath(path))
+        if os.path.isdir(path):
+            entries[name] = f'040000 tree {build_tree(repo, path)}'
+        else:
+            blob = git(repo, 'hash-object', '-w', '--', path)
+            entries[name] = f'100644 blob {blob}'
+
+    listing = ''.join(f'{meta}\t{name}\0' for name, meta in sorted(entries.items()))
+    tree = git(repo, 'mktree', '-z', input=listing)
+    if parent and tree == git(repo, 'rev-parse', parent + '^{tree}'):
+        return None
+    args = ['commit-tree', tree, '-m', message]
+    if parent:
+        args += ['-p', parent]
+    return git(repo, *args)
+
+
+def commit_main(repo, paths, message=MAIN_MESSAGE):
+    """Commit changes to paths on the current branch. Returns True if a commit was made."""
+    if not git(repo, 'status', '--porcelain', '--', *paths):
         return False
-    if result.stdout:
-        print(f"  {result.stdout.strip()}")
+    git(repo, 'add', '--', *paths)
+    git(repo, 'commit', '-m', message, '--', *paths)
     return True
 
-def main():
-    # Step 1: Run the parser
+
+def publish(repo, feed_files, state_files=(), remote=REMOTE, branch=PAGES_BRANCH, push=True):
+    """Commit feed and state files on the current branch and the feeds on gh-pages, then push both.
+
+    Returns a dict describing what was committed and pushed.
+    """
+    feed_paths = [os.path.relpath(os.path.abspath(p), repo) for p in feed_files]
+    paths = feed_paths + [os.path.relpath(os.path.abspath(p), repo) for p in state_files if os.path.exists(p)]
+    current = git(repo, 'symbolic-ref', '--short', 'HEAD')
+    result = {'main_commit': None, 'pages_commit': None, 'pushed': []}
+
+    if commit_main(repo, paths):
+        result['main_commit'] = git(repo, 'rev-parse', 'HEAD')
+
+    parent = pages_parent(repo, remote, branch)
+    pages_commit = build_pages_commit(repo, [os.path.join(repo, p) for p in feed_paths], parent)
+    if pages_commit:
+        # Compare-and-swap against the ref's current value so a concurrent update is not overwritten
+        old = rev_parse(repo, f'refs/heads/{branch}') or '0' * 40
+        git(repo, 'update-ref', '-m', PAGES_MESSAGE, f'refs/heads/{branch}', pages_commit, old)
+        result['pages_commit'] = pages_commit
+
+    # Push whatever the remote lacks, so commits left behind by a failed push go out now
+    refspecs = [f'refs/heads/{name}:refs/heads/{name}' for name in (current, branch)
+                if unpushed(repo, name, remote)]
+    if push and refspecs:
+        git(repo, 'push', '--atomic', remote, *refspecs)
+        result['pushed'] = refspecs
+    return result
+
+
+def run_parser(argv=None):
+    """Run the feed generator in-process. Returns (feed files, state files) of locales with anything to commit."""
+    import jw_news_parser
+    import jw_thumbnails
+
+    results = jw_news_parser.main(argv or [])
+    if isinstance(results, dict):
+        results = [results]
+    feeds, states = [], []
+    for result in results:
+        if result['status'] == 'error':
+            raise RuntimeError(f"Parser failed for locale {result['locale']}")
+        config = jw_news_parser.locale_config(result['locale'])
+        if result.get('state_saved'):
+            # Same items under new validators: only the state changed
+            states.append(config['state_file'])
+        if result['status'] != 'updated':
+            continue
+        feeds += result['files']
+        states += [config['history_file'], config['state_file'], config['item_store_file']]
+    if feeds and jw_thumbnails.THUMBNAILS_ENABLED and os.path.isdir(jw_thumbnails.THUMBNAIL_DIR):
+        # Thumbnails are published with the feeds, and committed so later runs never refetch an image
+        feeds.append(jw_thumbnails.THUMBNAIL_DIR)
+    return feeds, states
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Update the feed and publish it to GitHub Pages")
+    parser.add_argument('--no-push', action='store_true', help="commit locally without pushing")
+    parser.add_argument('parser_args', nargs=argparse.REMAINDER,
+                        help="arguments passed on to jw_news_parser.py (after --)")
+    args = parser.parse_args(argv)
+
     print("=" * 50)
     print("JW-Newsfeed Update and Publish")
     print("=" * 50)
 
-    result = subprocess.run([sys.executable, "jw_news_parser.py"], capture_output=True, text=True)
-    print(result.stdout)
-    if result.stderr:
-        print(result.stderr)
-
-    if result.returncode != 0:
-        print("Parser failed!")
+    os.chdir(SCRIPT_DIR)
+    try:
+        feeds, states = run_parser([a for a in args.parser_args if a != '--'])
+    except Exception as e:
+        print(f"Parser failed! {e}")
         return 1
 
-    # Step 2: Check if feed was updated
-    status = subprocess.run(["git", "status", "--porcelain", "jw_feed.xml"], capture_output=True, text=True)
-    if not status.stdout.strip():
+    if not feeds and not states:
         print("No changes to feed.")
         return 0
 
-    # Step 3: Commit to main branch
-    run_command("git add jw_feed.xml history.json", "Staging files")
-    run_command('git commit -m "Auto-update RSS feed"', "Committing to main")
-    run_command("git push origin main", "Pushing to main")
-
-    # Step 4: Update gh-pages branch with just the feed
-    run_command("git checkout gh-pages", "Switching to gh-pages")
-    run_command("git checkout main -- jw_feed.xml", "Getting latest feed")
-    run_command("git add jw_feed.xml", "Staging feed")
-
-    # Check if there are changes to commit
-    status = subprocess.run(["git", "status", "--porcelain"], capture_output=True, text=True)
-    if status.stdout.strip():
-        run_command('git commit -m "Update RSS feed"', "Committing to gh-pages")
-        run_command("git push origin gh-pages", "Pushing to gh-pages")
-    else:
-        print("No changes to commit on gh-pages")
-
-    run_command("git checkout main", "Switching back to main")
+    try:
+        result = publish(SCRIPT_DIR, feeds, states, push=not args.no_push)
+    except GitError as e:
+        print(f"  Error: {e}")
+        return 1
+
+    print(f"Main commit: {result['main_commit'] or 'no changes'}")
+    print(f"{PAGES_BRANCH} commit: {result['pages_commit'] or 'no changes'}")
+    if result['pushed']:
+        print(f"Pushed {', '.join(ref.split(':')[0].removeprefix('refs/heads/') for ref in result['pushed'])}")
 
     print("=" * 50)
     print("Done! Feed published to GitHub Pages")